@@ -18,13 +18,27 @@ import time
 import json
 import httpx
 import hashlib
+import sqlite3
+import threading
+import zlib
+import heapq
+import bisect
+import csv
+import gzip
+import ipaddress
+from array import array
+import mmap
+import struct
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from langchain_openai import ChatOpenAI
 from langchain_community.tools import DuckDuckGoSearchRun, WikipediaQueryRun, ArxivQueryRun
@@ -66,6 +80,28 @@ except ImportError:
     VECTOR_DB_AVAILABLE = False
     chromadb = None
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    print("Warning: numpy not installed. Few-shot example selection will use the pure-Python scorer.")
+    np = None
+    NUMPY_AVAILABLE = False
+
+try:
+    import xxhash
+    STABLE_DIGEST_ALGORITHM = "xxh3_128"
+except ImportError:
+    xxhash = None
+    STABLE_DIGEST_ALGORITHM = "blake2b"
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 support in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    print("Warning: h2 not installed. Upstream requests will use HTTP/1.1 only.")
+    HTTP2_AVAILABLE = False
+
 from dotenv import load_dotenv, find_dotenv
 from settings import NASA_EARTHDATA_TOKEN, NASA_API_KEY, NASA_POWER_BASE_URL, NASA_MODIS_BASE_URL, NASA_EARTHDATA_BASE_URL
 from settings import WEATHER_UNDERGROUND_API_KEY, WEATHER_UNDERGROUND_BASE_URL
@@ -73,8 +109,28 @@ from settings import FAO_API_BASE_URL, FAO_DATAMART_URL
 from settings import BARC_API_URL, DAE_API_URL, BRRI_API_URL, BARI_API_URL
 from settings import ALLOW_ORIGINS, HOST, PORT
 from settings import IPGEOLOCATION_API_KEY, GOOGLE_GEOLOCATION_API_KEY
+from settings import HTTP_POOL_MAX_CONNECTIONS, HTTP_POOL_MAX_KEEPALIVE, HTTP_POOL_KEEPALIVE_EXPIRY
+from settings import HTTP2_ENABLED, HTTP_DEFAULT_TIMEOUT, HTTP_HOST_TIMEOUTS
+from settings import CACHE_DEFAULT_MAX_ENTRIES, CACHE_DEFAULT_MAX_BYTES, CACHE_SWEEP_INTERVAL, CACHE_NAMESPACE_LIMITS
+from settings import CACHE_L2_PATH, CACHE_L2_NAMESPACES, CACHE_L2_FLUSH_INTERVAL, CACHE_L2_BUFFER_MAX
+from settings import LLM_MAX_CONCURRENCY, LLM_QUEUE_TIMEOUT
+from settings import DATA_SOURCE_BUDGETS, DATA_SOURCE_MAX_COST
+from settings import TOOL_EXECUTOR_MAX_WORKERS, TOOL_DEFAULT_TIMEOUT, TOOL_TIMEOUTS
+from settings import TRANSLATION_MAX_WORKERS, TRANSLATION_TIMEOUT, TRANSLATION_BATCH_CHARS, STREAM_TRANSLATE_MIN_CHARS
+from settings import STATIC_CATALOGUE_LANGUAGES
+from settings import KNOWLEDGE_DIR, KNOWLEDGE_INDEX_PATH, KNOWLEDGE_RELOAD_INTERVAL
+from settings import GAZETTEER_MIN_SIMILARITY, GAZETTEER_REVERSE_MAX_KM
+from settings import GEOCODE_CACHE_TTL, GEOCODE_NEGATIVE_TTL, NOMINATIM_MIN_INTERVAL, NOMINATIM_MAX_WAIT
+from settings import FEWSHOT_MAX_FEATURES
+from settings import CHROMA_PERSIST_DIR, MEMORY_FLUSH_INTERVAL, MEMORY_FLUSH_BATCH, MEMORY_BUFFER_MAX
+from settings import USER_CONTEXT_MAX_USERS, USER_CONTEXT_IDLE_TTL, USER_CONTEXT_PERSIST, USER_MEMORY_TTL
+from settings import IP_RANGES_PATH, IP_RANGES_URL, IP_RANGES_REFRESH_INTERVAL, IP_RANGES_COUNTRIES
+from settings import IP_LEARNED_PREFIX_TTL, IP_LEARNED_MAX_PREFIXES
+from settings import GEO_IMMEDIATE_PROVIDERS, GEO_HEDGE_DELAY, GEO_ACCEPT_CONFIDENCE, GEO_AGREEMENT_DEGREES, GEO_RACE_TIMEOUT
 from starlette.responses import JSONResponse
 import math
+import string
+import unicodedata
 
 # Load environment variables unless explicitly disabled (e.g., in tests)
 # Only load .env file if it exists and we're not in a cloud environment
@@ -89,11 +145,256 @@ if not os.getenv("DONT_LOAD_DOTENV") and not os.getenv("PYTEST_CURRENT_TEST"):
 
 # =================== PERFORMANCE OPTIMIZATION SYSTEM ===================
 
+# Content-addressed digests: unlike the salted built-in hash() they are identical
+# in every worker process and across restarts, so keys in the shared L2 tier line up
+def stable_digest(text: str) -> str:
+    """128-bit hex digest of text (xxh3 when xxhash is installed, blake2b otherwise)"""
+    data = text.encode("utf-8")
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def stable_hash(text: str) -> int:
+    """Non-negative 64-bit integer derived from stable_digest, a drop-in for hash() % n"""
+    return int(stable_digest(text)[:16], 16)
+
+def normalize_translation_text(text: str) -> str:
+    """Canonical form used for translation keys: NFC, trimmed, single-spaced lines"""
+    text = unicodedata.normalize("NFC", text)
+    lines = (" ".join(line.split()) for line in text.strip().splitlines())
+    return "\n".join(lines)
+
+# Persistent second cache tier (survives restarts, shared by workers on the same host)
+class SQLiteCacheStore:
+    """
+    L2 cache tier in a local SQLite file storing zlib-compressed JSON with per-entry expiry.
+    set() only queues the entry; flush() writes the queue in one transaction and is run from a
+    worker thread by run_writer(), so request handlers never wait on disk writes. Reads see
+    queued entries first. Async callers read through asyncio.to_thread (PerformanceCache.aget).
+    """
+
+    def __init__(self, path: str, buffer_max: int = CACHE_L2_BUFFER_MAX):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        # Autocommit + WAL so several uvicorn workers can read while one writes
+        self.conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value BLOB NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries(expires_at)")
+        self.buffer_max = buffer_max
+        self.pending: "OrderedDict[str, Tuple[object, float]]" = OrderedDict()
+        self.flushing: Dict[str, Tuple[object, float]] = {}  # batch being written by flush()
+        self.pending_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.flushes = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def _queued(self, key: str) -> Optional[Tuple[object, float]]:
+        with self.pending_lock:
+            return self.pending.get(key) or self.flushing.get(key)
+
+    def get(self, key: str) -> Optional[Tuple[object, float]]:
+        """Return (value, expires_at) for a live entry, or None (blocking; see PerformanceCache.aget)"""
+        queued = self._queued(key)
+        if queued is not None and queued[1] > time.time():
+            self.hits += 1
+            return queued
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE key = ? AND expires_at > ?",
+                    (key, time.time())
+                ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(zlib.decompress(row[0])), row[1]
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ L2 cache read error: {e}")
+            return None
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[object, float]]:
+        """(value, expires_at) for every live key among `keys`, in one query per 500 keys"""
+        now = time.time()
+        found = {}
+        remaining = []
+        for key in keys:
+            queued = self._queued(key)
+            if queued is not None and queued[1] > now:
+                found[key] = queued
+            else:
+                remaining.append(key)
+        try:
+            for start in range(0, len(remaining), 500):
+                chunk = remaining[start:start + 500]
+                with self.lock:
+                    rows = self.conn.execute(
+                        f"SELECT key, value, expires_at FROM cache_entries WHERE key IN ({','.join('?' * len(chunk))}) AND expires_at > ?",
+                        (*chunk, now)
+                    ).fetchall()
+                for key, blob, expires_at in rows:
+                    found[key] = (json.loads(zlib.decompress(blob)), expires_at)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ L2 cache read error: {e}")
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key: str, value, expires_at: float):
+        """Queue one entry for the next flush (values must be JSON-serialisable)"""
+        with self.pending_lock:
+            self.pending[key] = (value, expires_at)
+            self.pending.move_to_end(key)
+            while len(self.pending) > self.buffer_max:
+                self.pending.popitem(last=False)
+                self.dropped += 1
+
+    def flush(self) -> int:
+        """Write every queued entry in one transaction (blocking); returns the number written"""
+        with self.pending_lock:
+            if not self.pending:
+                return 0
+            batch, self.pending = self.pending, OrderedDict()
+            self.flushing = batch
+        rows = []
+        for key, (value, expires_at) in batch.items():
+            try:
+                rows.append((key, expires_at, zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))))
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ L2 cache write error for {key}: {e}")
+        try:
+            with self.lock:
+                self.conn.execute("BEGIN")
+                try:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO cache_entries (key, expires_at, value) VALUES (?, ?, ?)", rows
+                    )
+                    self.conn.execute("COMMIT")
+                except Exception:
+                    self.conn.execute("ROLLBACK")
+                    raise
+            self.writes += len(rows)
+            self.flushes += 1
+            return len(rows)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ L2 cache write error: {e}")
+            return 0
+        finally:
+            with self.pending_lock:
+                self.flushing = {}
+
+    async def run_writer(self, interval: float = CACHE_L2_FLUSH_INTERVAL):
+        """Background task: flush queued writes from a worker thread"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                print(f"⚠️ L2 cache flush error: {e}")
+
+    def sweep_expired(self) -> int:
+        """Delete expired rows; returns the number removed"""
+        try:
+            with self.lock:
+                return self.conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),)).rowcount
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ L2 cache sweep error: {e}")
+            return 0
+
+    def stats(self) -> dict:
+        try:
+            with self.lock:
+                entries = self.conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        except Exception:
+            entries = None
+        return {
+            "path": self.path,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "flushes": self.flushes,
+            "pending": len(self.pending),
+            "dropped": self.dropped,
+            "errors": self.errors
+        }
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.conn.close()
+
 # High-performance in-memory cache with TTL
+class CacheNamespace:
+    """LRU-ordered entries of one cache namespace with entry-count and byte budgets"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.entries = OrderedDict()  # key -> (value, expires_at, size)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def remove(self, key: str):
+        _, _, size = self.entries.pop(key)
+        self.bytes -= size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "l2_hits": self.l2_hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
 class PerformanceCache:
-    def __init__(self):
-        self.cache = {}
-        self.access_times = {}
+    """Bounded in-memory cache with per-entry TTL and per-namespace LRU eviction.
+
+    The namespace of a key is its prefix before the first "_" (e.g. "nasa", "trans").
+    Each namespace has its own entry and approximate byte budget; the least recently
+    used entries are evicted once either budget is exceeded. Namespaces listed in
+    `l2_namespaces` are also written through to the optional persistent `l2` tier
+    and read back from it on an in-memory miss.
+    """
+
+    def __init__(self, namespace_limits: Dict[str, Tuple[int, int]] = None,
+                 default_max_entries: int = CACHE_DEFAULT_MAX_ENTRIES,
+                 default_max_bytes: int = CACHE_DEFAULT_MAX_BYTES,
+                 l2: Optional[SQLiteCacheStore] = None,
+                 l2_namespaces: List[str] = None):
+        self.namespace_limits = namespace_limits or {}
+        self.default_limits = (default_max_entries, default_max_bytes)
+        self.namespaces: Dict[str, CacheNamespace] = {}
+        self.lock = threading.Lock()
+        self.l2 = l2
+        self.l2_namespaces = set(l2_namespaces or [])
     
     def _generate_key(self, data):
         """Generate cache key from data"""
@@ -102,23 +403,153 @@ class PerformanceCache:
         else:
             sorted_data = str(data)
         return hashlib.md5(sorted_data.encode()).hexdigest()
-    
-    def get(self, key: str, ttl_seconds: int = 300):
-        """Get cached data if not expired"""
-        if key in self.cache:
-            cached_time = self.access_times.get(key, 0)
-            if time.time() - cached_time < ttl_seconds:
-                return self.cache[key]
-            else:
+
+    def _namespace(self, key: str) -> CacheNamespace:
+        name = key.split("_", 1)[0]
+        namespace = self.namespaces.get(name)
+        if namespace is None:
+            max_entries, max_bytes = self.namespace_limits.get(name, self.default_limits)
+            namespace = self.namespaces[name] = CacheNamespace(max_entries, max_bytes)
+        return namespace
+
+    @staticmethod
+    def _approx_size(value) -> int:
+        """Approximate memory footprint of a cached value in bytes"""
+        if isinstance(value, str):
+            return sys.getsizeof(value)
+        try:
+            return len(json.dumps(value, default=str))
+        except (TypeError, ValueError):
+            return sys.getsizeof(value)
+    
+    def _uses_l2(self, key: str) -> bool:
+        return self.l2 is not None and key.split("_", 1)[0] in self.l2_namespaces
+
+    def _get_memory(self, key: str) -> Tuple[bool, object]:
+        """(hit, value) from the memory tier; misses are counted here unless L2 may still answer"""
+        with self.lock:
+            namespace = self._namespace(key)
+            entry = namespace.entries.get(key)
+            if entry is not None:
+                value, expires_at, _ = entry
+                if time.time() < expires_at:
+                    namespace.entries.move_to_end(key)
+                    namespace.hits += 1
+                    return True, value
                 # Expired, remove from cache
-                del self.cache[key]
-                del self.access_times[key]
-        return None
-    
-    def set(self, key: str, value):
-        """Set cached data"""
-        self.cache[key] = value
-        self.access_times[key] = time.time()
+                namespace.remove(key)
+                namespace.expirations += 1
+            if not self._uses_l2(key):
+                namespace.misses += 1
+            return False, None
+
+    def _promote(self, key: str, persisted: Optional[Tuple[object, float]]):
+        """Count an L2 lookup result and copy a hit into memory"""
+        with self.lock:
+            namespace = self._namespace(key)
+            if persisted is None:
+                namespace.misses += 1
+                return None
+            value, expires_at = persisted
+            namespace.hits += 1
+            namespace.l2_hits += 1
+            self._store(namespace, key, value, expires_at, self._approx_size(value))
+        return value
+
+    def get(self, key: str):
+        """Get cached data if not expired (memory first, then the persistent tier; blocks on L2 reads)"""
+        hit, value = self._get_memory(key)
+        if hit or not self._uses_l2(key):
+            return value
+        return self._promote(key, self.l2.get(key))
+
+    async def aget(self, key: str):
+        """Like get(), but an L2 read runs in a worker thread instead of on the event loop"""
+        hit, value = self._get_memory(key)
+        if hit or not self._uses_l2(key):
+            return value
+        return self._promote(key, await asyncio.to_thread(self.l2.get, key))
+
+    async def aget_many(self, keys: List[str]) -> Dict[str, object]:
+        """Cached values for `keys` (missing keys omitted), with all L2 misses fetched in one threaded query"""
+        found = {}
+        l2_keys = []
+        for key in keys:
+            hit, value = self._get_memory(key)
+            if hit:
+                found[key] = value
+            elif self._uses_l2(key):
+                l2_keys.append(key)
+        if l2_keys:
+            persisted = await asyncio.to_thread(self.l2.get_many, l2_keys)
+            for key in l2_keys:
+                value = self._promote(key, persisted.get(key))
+                if value is not None:
+                    found[key] = value
+        return found
+
+    def _store(self, namespace: CacheNamespace, key: str, value, expires_at: float, size: int):
+        """Insert into memory and evict least recently used entries (caller holds the lock)"""
+        if key in namespace.entries:
+            namespace.remove(key)
+        if size > namespace.max_bytes:
+            return  # Larger than the whole namespace budget, not worth caching
+        namespace.entries[key] = (value, expires_at, size)
+        namespace.bytes += size
+        # Evict least recently used entries until both budgets are met
+        while len(namespace.entries) > namespace.max_entries or namespace.bytes > namespace.max_bytes:
+            oldest_key = next(iter(namespace.entries))
+            namespace.remove(oldest_key)
+            namespace.evictions += 1
+    
+    def set(self, key: str, value, ttl_seconds: int = 300):
+        """Set cached data with its own time-to-live (written through to L2 when enabled)"""
+        size = self._approx_size(value)
+        expires_at = time.time() + ttl_seconds
+        with self.lock:
+            self._store(self._namespace(key), key, value, expires_at, size)
+        if self._uses_l2(key):
+            self.l2.set(key, value, expires_at)
+
+    def sweep_expired(self) -> int:
+        """Remove every expired entry; returns the number removed"""
+        now = time.time()
+        removed = 0
+        with self.lock:
+            for namespace in self.namespaces.values():
+                expired = [k for k, (_, expires_at, _) in namespace.entries.items() if expires_at <= now]
+                for key in expired:
+                    namespace.remove(key)
+                namespace.expirations += len(expired)
+                removed += len(expired)
+        if self.l2 is not None:
+            removed += self.l2.sweep_expired()
+        return removed
+
+    async def run_sweeper(self, interval: float = CACHE_SWEEP_INTERVAL):
+        """Background task: periodically drop expired entries"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = await asyncio.to_thread(self.sweep_expired)
+                if removed:
+                    print(f"🧹 Cache sweep removed {removed} expired entries")
+            except Exception as e:
+                print(f"⚠️ Cache sweep error: {e}")
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction statistics per namespace and overall"""
+        with self.lock:
+            namespaces = {name: ns.stats() for name, ns in self.namespaces.items()}
+        totals = {field: sum(ns[field] for ns in namespaces.values())
+                  for field in ["entries", "bytes", "hits", "l2_hits", "misses", "evictions", "expirations"]}
+        lookups = totals["hits"] + totals["misses"]
+        totals["hit_rate"] = round(totals["hits"] / lookups, 3) if lookups else 0.0
+        return {
+            "totals": totals,
+            "namespaces": namespaces,
+            "l2": self.l2.stats() if self.l2 is not None else None
+        }
     
     def cache_key_nasa(self, lat: float, lon: float, dataset: str, days_back: int = 7):
         """Generate cache key for NASA data"""
@@ -129,26 +560,199 @@ class PerformanceCache:
         return f"nasa_{dataset}_{lat_rounded}_{lon_rounded}_{days_back}_{date_key}"
     
     def cache_key_translation(self, text: str, source_lang: str, target_lang: str):
-        """Generate cache key for translations"""
-        text_hash = hashlib.md5(text.encode()).hexdigest()[:16]
+        """Generate a content-addressed cache key for translations (stable across workers)"""
+        text_hash = stable_digest(normalize_translation_text(text))
         return f"trans_{source_lang}_{target_lang}_{text_hash}"
     
     def cache_key_location(self, ip: str):
         """Generate cache key for location detection"""
         return f"location_{ip}"
 
-# Initialize global cache
-perf_cache = PerformanceCache()
+# Initialize global cache (with the persistent L2 tier when configured)
+l2_cache_store = None
+if CACHE_L2_PATH:
+    try:
+        l2_cache_store = SQLiteCacheStore(CACHE_L2_PATH)
+        print(f"✅ Persistent L2 cache ready at {CACHE_L2_PATH}")
+    except Exception as e:
+        print(f"⚠️ Persistent L2 cache unavailable, using memory only: {e}")
+        l2_cache_store = None
+
+perf_cache = PerformanceCache(CACHE_NAMESPACE_LIMITS, l2=l2_cache_store, l2_namespaces=CACHE_L2_NAMESPACES)
+
+# Shared keep-alive HTTP clients (one connection pool per upstream host)
+class HTTPClientRegistry:
+    """App-lifetime registry of pooled httpx clients keyed by upstream host.
+
+    Reusing one client per host keeps TCP/TLS connections alive between requests
+    instead of paying a fresh handshake on every upstream call.
+    """
+
+    def __init__(self, host_timeouts: Dict[str, float], default_timeout: float):
+        self.host_timeouts = host_timeouts
+        self.default_timeout = default_timeout
+        self.limits = httpx.Limits(
+            max_connections=HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY
+        )
+        # HTTP/2 is negotiated via ALPN, so hosts without support fall back to HTTP/1.1
+        self.http2 = HTTP2_ENABLED and HTTP2_AVAILABLE
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _host(self, url: str) -> str:
+        """Extract the host from a URL (or accept a bare host name)"""
+        if "://" not in url:
+            return url.lower()
+        return httpx.URL(url).host.lower()
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        """Return the shared client for the host of `url`, creating it on first use"""
+        host = self._host(url)
+        client = self.clients.get(host)
+        if client is None or client.is_closed:
+            timeout = self.host_timeouts.get(host, self.default_timeout)
+            client = httpx.AsyncClient(timeout=timeout, limits=self.limits, http2=self.http2)
+            self.clients[host] = client
+        return client
+
+    async def start(self):
+        """Create pools for all configured upstream hosts"""
+        for host in self.host_timeouts:
+            self.get(host)
+        print(f"🔌 HTTP client pools ready for {len(self.clients)} hosts (HTTP/2: {'on' if self.http2 else 'off'})")
+
+    async def close(self):
+        """Close every pooled client and drop its connections"""
+        clients = list(self.clients.values())
+        self.clients = {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"⚠️ HTTP client close error: {e}")
+        print(f"🔌 Closed {len(clients)} HTTP client pools")
+
+http_clients = HTTPClientRegistry(HTTP_HOST_TIMEOUTS, HTTP_DEFAULT_TIMEOUT)
+
+# Single-flight request coalescing
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight upstream request.
+
+    The first caller for a key starts the work; callers arriving while it is still
+    running await the same future instead of issuing a duplicate request.
+    """
+
+    def __init__(self):
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, key: str, field: str):
+        namespace = key.split("_", 1)[0]
+        counters = self.counters.setdefault(namespace, {"calls": 0, "executed": 0, "coalesced": 0})
+        counters[field] += 1
+
+    async def do(self, key: str, fn):
+        """Run `fn()` (a coroutine factory) once per key among concurrent callers"""
+        self._count(key, "calls")
+        task = self.in_flight.get(key)
+        if task is None:
+            self._count(key, "executed")
+            task = asyncio.ensure_future(fn())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self._count(key, "coalesced")
+            print(f"🔗 Single-flight: joined in-flight request for {key}")
+        # Shield so one cancelled caller does not cancel the shared request for the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Future):
+        self.in_flight.pop(key, None)
+        # Mark the exception as retrieved in case every waiting caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """Return per-namespace call/executed/coalesced counters"""
+        totals = {"calls": 0, "executed": 0, "coalesced": 0}
+        for counters in self.counters.values():
+            for field, value in counters.items():
+                totals[field] += value
+        return {"in_flight": len(self.in_flight), "totals": totals, "namespaces": self.counters}
+
+single_flight = SingleFlight()
+
+
+class BlockingToolPool:
+    """Bounded thread pool for synchronous tool calls (langchain search tools).
+
+    Keeps blocking `.run()` calls off the event loop so gathered searches really run in
+    parallel. Each call has a per-tool timeout; a call that times out while still queued
+    is cancelled before it starts, and one already running is abandoned to its thread.
+    """
+
+    def __init__(self, max_workers: int, timeouts: Dict[str, float], default_timeout: float):
+        self.max_workers = max(1, max_workers)
+        self.timeouts = timeouts
+        self.default_timeout = default_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.in_flight = 0
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+        return self._executor
+
+    def _count(self, tool_name: str, field: str):
+        counters = self.counters.setdefault(tool_name, {"calls": 0, "timeouts": 0, "errors": 0})
+        counters[field] += 1
+
+    async def run(self, tool_name: str, fn, *args):
+        """Run blocking `fn(*args)` on the pool, raising asyncio.TimeoutError past the tool's timeout"""
+        self._count(tool_name, "calls")
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_executor(), fn, *args)
+        self.in_flight += 1
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeouts.get(tool_name, self.default_timeout))
+        except asyncio.TimeoutError:
+            self._count(tool_name, "timeouts")
+            raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._count(tool_name, "errors")
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def shutdown(self):
+        """Drop queued calls and release the worker threads without waiting for running ones"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {"max_workers": self.max_workers, "in_flight": self.in_flight, "tools": self.counters}
+
+tool_pool = BlockingToolPool(TOOL_EXECUTOR_MAX_WORKERS, TOOL_TIMEOUTS, TOOL_DEFAULT_TIMEOUT)
 
 # Initialize ChromaDB for vector database (Free Alternative to Mem0)
 if VECTOR_DB_AVAILABLE:
     try:
-        # Initialize ChromaDB client with telemetry disabled (fixes telemetry errors)
+        # Initialize ChromaDB client with telemetry disabled (fixes telemetry errors);
+        # persistent on disk so long-term memory survives restarts
         from chromadb.config import Settings
-        chroma_client = chromadb.Client(Settings(
+        chroma_settings = Settings(
             anonymized_telemetry=False,
             allow_reset=True
-        ))
+        )
+        if CHROMA_PERSIST_DIR:
+            chroma_client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR, settings=chroma_settings)
+        else:
+            chroma_client = chromadb.Client(chroma_settings)
         
         # Use default embeddings (lightweight, no heavy dependencies like PyTorch)
         # ChromaDB has built-in embedding function that works without sentence-transformers
@@ -158,7 +762,7 @@ if VECTOR_DB_AVAILABLE:
             name="chashi_bhai_memory",
             metadata={"description": "Agricultural user context and preferences"}
         )
-        print("✅ ChromaDB vector database initialized successfully (telemetry disabled)")
+        print(f"✅ ChromaDB vector database initialized successfully ({CHROMA_PERSIST_DIR or 'in-memory'}, telemetry disabled)")
     except Exception as e:
         print(f"⚠️ ChromaDB initialization failed, using fallback: {e}")
         vector_memory = None
@@ -166,173 +770,207 @@ if VECTOR_DB_AVAILABLE:
 else:
     vector_memory = None
 
+
+class VectorMemoryWriter:
+    """
+    Write-behind buffer for the vector memory: requests append records, a background task
+    embeds and indexes them with batched `collection.add` calls off the event loop.
+    The buffer is bounded (oldest records are dropped first) and drained on shutdown.
+    """
+
+    def __init__(self, collection, batch_size: int = MEMORY_FLUSH_BATCH, max_buffer: int = MEMORY_BUFFER_MAX):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.buffer = deque(maxlen=max_buffer)
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.appended = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def append(self, record_id: str, document: str, metadata: dict):
+        with self.lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append((record_id, document, metadata))
+            self.appended += 1
+
+    def flush_batch(self) -> int:
+        """Write up to batch_size buffered records in one add() call; returns how many were taken"""
+        with self.flush_lock:
+            with self.lock:
+                batch = [self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))]
+            if not batch:
+                return 0
+            # Chroma rejects duplicate ids within one call; the latest record wins
+            records = {record_id: (document, metadata) for record_id, document, metadata in batch}
+            try:
+                self.collection.add(
+                    ids=list(records.keys()),
+                    documents=[document for document, _ in records.values()],
+                    metadatas=[metadata for _, metadata in records.values()]
+                )
+                self.written += len(records)
+                self.batches += 1
+            except Exception as e:
+                self.failed += len(records)
+                print(f"⚠️ ChromaDB batch write error ({len(records)} records dropped): {e}")
+            return len(batch)
+
+    async def run(self, interval: float = MEMORY_FLUSH_INTERVAL):
+        """Background task: flush the buffer every `interval` seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                while await asyncio.to_thread(self.flush_batch):
+                    pass
+            except Exception as e:
+                print(f"⚠️ ChromaDB flush error: {e}")
+
+    async def drain(self):
+        """Flush everything still buffered (called on shutdown)"""
+        pending = len(self.buffer)
+        while await asyncio.to_thread(self.flush_batch):
+            pass
+        if pending:
+            print(f"💾 ChromaDB: drained {pending} buffered memories")
+
+    def stats(self) -> dict:
+        return {
+            "persistent": bool(CHROMA_PERSIST_DIR),
+            "buffered": len(self.buffer),
+            "appended": self.appended,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "dropped": self.dropped
+        }
+
+memory_writer = VectorMemoryWriter(vector_memory) if vector_memory is not None else None
+
 # ============================================================================
 # HYBRID SYSTEM: RAG + Fine-Tuning (Few-Shot Learning)
 # ============================================================================
 
 class FewShotExamples:
-    """Fine-tuning simulation using few-shot learning examples"""
+    """
+    Fine-tuning simulation using few-shot learning examples.
+
+    On every (re)load the examples are turned into an L2-normalised TF-IDF matrix (query terms
+    weighted double), stored column-major (CSC) in numpy arrays. Selecting examples is one sparse
+    matrix-vector product over the query's columns plus argpartition, so the cost depends on the
+    query terms rather than on the number of examples. Without numpy the same columns are scored
+    as plain postings lists.
+    """
     
-    def __init__(self):
-        self.examples = self._initialize_examples()
-    
-    def _initialize_examples(self):
-        """High-quality Q&A examples for domain adaptation (simulated fine-tuning)"""
-        return [
-            {
-                "query": "When should I plant Boro rice?",
-                "response": """**Boro Rice Planting Schedule:**
-
-**Optimal Timing:** November-December (seedbed preparation), January-February (transplanting)
-
-**Modern Approach:**
-• Use BRRI dhan28, 29, 58 for high yield
-• Laser land leveling before planting (saves 25% irrigation water)
-• Mechanical transplanter: 8x faster than manual, uniform spacing
-• IoT soil moisture sensors for precise irrigation scheduling
-
-**Traditional Method:**
-• Seedbed preparation: Mid-November
-• Transplanting: 30-35 day old seedlings
-• AWD (Alternate Wetting Drying) irrigation: Save 30% water
-
-**Critical Success Factors:**
-• Soil testing before fertilization (available at district BADC labs)
-• Drip irrigation or sprinkler systems for water efficiency
-• Weather app monitoring (BMD Weather app - free Bengali interface)
-
-**Expected Harvest:** April-May""",
-                "domain": "rice_cultivation",
-                "complexity": "intermediate"
-            },
-            {
-                "query": "How to control pests organically?",
-                "response": """**Integrated Pest Management (IPM) - Modern Organic Approach:**
-
-**Smart Monitoring (Technology First):**
-• Mobile apps: PlantVillage, Agrio for AI-based pest identification
-• Pheromone traps: Auto-detect pest populations
-• Yellow sticky traps: Monitor whitefly, aphids
-
-**Biological Control:**
-• Trichogramma: Release 50,000/ha for stem borer control
-• NPV (Nuclear Polyhedrosis Virus): Effective against caterpillars
-• Bt (Bacillus thuringiensis): Safe, organic bacterial pesticide
-
-**Modern Organic Solutions:**
-• Neem oil spray: 3-5ml/liter water, weekly application
-• Garlic-chili spray: Natural repellent, homemade
-• Bordeaux mixture: Fungal disease prevention
-
-**Technology Integration:**
-• Drone spraying: 50% less pesticide, precision application
-• Weather-based prediction: Spray before pest outbreak
-• Cooperative group purchasing: Reduce bio-pesticide costs
-
-**Cost-Benefit:** IPM reduces pesticide costs 40-60% while maintaining yields""",
-                "domain": "pest_management",
-                "complexity": "advanced"
-            },
-            {
-                "query": "Best irrigation method for vegetables?",
-                "response": """**Modern Irrigation for Vegetables - Technology-Driven Approach:**
-
-**#1 Recommended: Drip Irrigation System**
-• Water saving: 60-70% compared to flood irrigation
-• Yield increase: 20-50% due to consistent moisture
-• ROI: 2-3 years (with govt subsidy: 50% cost covered)
-• Setup cost: 40,000-60,000 BDT/acre
-• Ideal for: Tomato, cabbage, cucumber, chili
-
-**Smart Irrigation Technology:**
-• Soil moisture sensors: Auto-scheduling, save 30% water (15,000-25,000 BDT)
-• Weather app integration: Free apps like Krishi Prabaha
-• Solar water pumps: Zero fuel cost, 20-year lifespan (govt subsidy available)
-
-**Alternative Methods:**
-• Sprinkler: 25-40% water saving, good for leafy vegetables
-• Mulch drip: Combines plastic mulch + drip for maximum efficiency
-
-**Mobile Apps for Irrigation:**
-• CropX: Soil monitoring (free trial)
-• Irrigation Calculator: Schedule based on crop needs
-
-**Small Farmer Options:**
-• Start with drip lines for high-value crops (tomato, chili)
-• Shared solar pump through cooperatives
-• BADC subsidy application for equipment""",
-                "domain": "irrigation",
-                "complexity": "intermediate"
-            },
-            {
-                "query": "Potato cultivation timing?",
-                "response": """**Potato Cultivation - Rabi Season Timing:**
-
-**Critical Planting Window:** October-December (current month: December - STILL SUITABLE but act fast!)
-
-**Modern Cultivation Steps:**
-
-**1. Soil Preparation (Use Technology):**
-• Soil testing: District BADC labs (100-200 BDT)
-• Power tiller for deep plowing: Rental 800-1200 BDT/acre
-• Organic matter: 5 tons compost/acre or 2 tons vermicompost
-
-**2. Variety Selection (High-Yield Modern):**
-• BARI Alu 7, 25, 28, 41 (disease resistant, high yield)
-• Seed rate: 1200-1500 kg/acre
-• Certified seed from BADC for disease-free planting
-
-**3. Smart Farming Technology:**
-• Drip irrigation: Critical for Rabi season (dry period)
-• Mulching: Black plastic reduces water loss 40%
-• Fertigation: Fertilizer through drip system (precise, efficient)
-
-**4. Precision Agriculture:**
-• Drone monitoring: Track crop health (service: 300-500 BDT/acre)
-• Weather alerts: BMD app for frost warnings
-• Market price tracking: Krishoker Janala app
-
-**Timeline:**
-• Planting: NOW (December) or wait until next October
-• Earthing up: 30-40 days after planting
-• Harvest: February-March (90-100 days)
-
-**Expected Yield:** 8-12 tons/acre with modern methods vs 5-7 tons traditional""",
-                "domain": "potato_cultivation",
-                "complexity": "intermediate"
-            }
-        ]
+    QUERY_WEIGHT = 2
+    DOMAIN_BOOST = 1.0
+    
+    def __init__(self, corpus: "KnowledgeCorpus", max_features: int = FEWSHOT_MAX_FEATURES):
+        # High-quality Q&A examples for domain adaptation live in knowledge/fewshot_examples.json
+        self.corpus = corpus
+        self.max_features = max_features
+        self.examples = []
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = None
+        self.matrix = None  # (column pointers, row indices, weights) when numpy is available
+        self.postings: Dict[int, List[Tuple[int, float]]] = {}
+        self.domain_rows: Dict[str, List[int]] = {}
+        self.reload()
+        corpus.subscribe(self.reload)
+    
+    @staticmethod
+    def _terms(text: str) -> List[str]:
+        return [t for t in KnowledgeIndex.tokenize(text) if len(t) > 2 and t not in KnowledgeIndex.STOPWORDS]
+    
+    def reload(self):
+        examples = self.corpus.section("fewshot_examples", [])
+        counts, document_frequency, totals = [], Counter(), Counter()
+        for example in examples:
+            tf = Counter(self._terms(example["response"]))
+            for term in self._terms(example["query"]):
+                tf[term] += self.QUERY_WEIGHT
+            counts.append(tf)
+            document_frequency.update(tf.keys())
+            totals.update(tf)
+        
+        # Vocabulary capped at the most frequent terms; smoothed IDF as in scikit-learn
+        vocabulary = {term: i for i, (term, _) in enumerate(totals.most_common(self.max_features))}
+        total_docs = len(examples)
+        idf = [0.0] * len(vocabulary)
+        for term, column in vocabulary.items():
+            idf[column] = math.log((1 + total_docs) / (1 + document_frequency[term])) + 1.0
+        
+        postings: Dict[int, List[Tuple[int, float]]] = {}
+        for r, tf in enumerate(counts):
+            row = {vocabulary[t]: (1.0 + math.log(c)) * idf[vocabulary[t]] for t, c in tf.items() if t in vocabulary}
+            norm = math.sqrt(sum(w * w for w in row.values())) or 1.0
+            for column, w in row.items():
+                postings.setdefault(column, []).append((r, w / norm))
+        
+        matrix = None
+        if NUMPY_AVAILABLE:
+            lengths = [len(postings.get(column, ())) for column in range(len(vocabulary))]
+            indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=indptr[1:])
+            entries = [entry for column in range(len(vocabulary)) for entry in postings.get(column, ())]
+            row_indices = np.fromiter((r for r, _ in entries), dtype=np.int32, count=len(entries))
+            weights = np.fromiter((w for _, w in entries), dtype=np.float32, count=len(entries))
+            matrix, postings = (indptr, row_indices, weights), {}
+        
+        # Swap the new model in at once so concurrent lookups see a consistent set
+        self.examples, self.vocabulary, self.idf = examples, vocabulary, idf
+        self.matrix, self.postings, self.domain_rows = matrix, postings, {}
+    
+    def _query_vector(self, query: str) -> Dict[int, float]:
+        tf = Counter(self.vocabulary[t] for t in self._terms(query) if t in self.vocabulary)
+        weights = {column: (1.0 + math.log(c)) * float(self.idf[column]) for column, c in tf.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {column: w / norm for column, w in weights.items()}
+    
+    def _rows_for_domain(self, domain: str) -> List[int]:
+        rows = self.domain_rows.get(domain)
+        if rows is None:
+            rows = [i for i, example in enumerate(self.examples) if domain in example["domain"]]
+            self.domain_rows[domain] = rows
+        return rows
     
     def get_relevant_examples(self, query: str, domain: str = None, top_k: int = 2) -> str:
         """Retrieve relevant few-shot examples based on query"""
-        query_lower = query.lower()
-        scored_examples = []
-        
-        for example in self.examples:
-            score = 0
-            
-            # Domain match
-            if domain and domain in example["domain"]:
-                score += 10
-            
-            # Query similarity (simple keyword matching)
-            example_keywords = example["query"].lower().split()
-            query_keywords = query_lower.split()
-            
-            for kw in query_keywords:
-                if len(kw) > 3 and any(kw in ek for ek in example_keywords):
-                    score += 5
-            
-            # Content relevance
-            if any(word in example["response"].lower() for word in query_keywords if len(word) > 4):
-                score += 2
-            
-            if score > 0:
-                scored_examples.append((score, example))
+        examples, matrix = self.examples, self.matrix
+        if not examples:
+            return ""
+        query_vector = self._query_vector(query)
+        domain_rows = self._rows_for_domain(domain) if domain else []
+        
+        if matrix is not None:
+            indptr, row_indices, weights = matrix
+            columns = list(query_vector.keys())
+            spans = [np.arange(indptr[c], indptr[c + 1]) for c in columns]
+            positions = np.concatenate(spans) if spans else np.zeros(0, dtype=np.int64)
+            query_weights = np.repeat(np.fromiter(query_vector.values(), dtype=np.float32, count=len(columns)),
+                                      [len(span) for span in spans])
+            scores = np.bincount(row_indices[positions], weights=weights[positions] * query_weights,
+                                 minlength=len(examples)).astype(np.float32, copy=False)
+            if domain_rows:
+                scores[domain_rows] += self.DOMAIN_BOOST
+            if len(scores) > top_k:
+                candidates = np.argpartition(-scores, top_k)[:top_k]
+            else:
+                candidates = np.arange(len(scores))
+            ranked = sorted(((float(scores[i]), int(i)) for i in candidates), reverse=True)
+        else:
+            totals: Dict[int, float] = {}
+            for column, weight in query_vector.items():
+                for row, w in self.postings.get(column, ()):
+                    totals[row] = totals.get(row, 0.0) + weight * w
+            for row in domain_rows:
+                totals[row] = totals.get(row, 0.0) + self.DOMAIN_BOOST
+            ranked = [(score, row) for row, score in heapq.nlargest(top_k, totals.items(), key=lambda entry: entry[1])]
         
-        # Sort and get top examples
-        scored_examples.sort(reverse=True, key=lambda x: x[0])
-        top_examples = scored_examples[:top_k]
+        top_examples = [(score, examples[row]) for score, row in ranked if score > 0]
         
         if not top_examples:
             return ""
@@ -349,287 +987,660 @@ class FewShotExamples:
 # RAG SYSTEM - Knowledge Base & User Context
 # ============================================================================
 
-class RAGKnowledgeBase:
-    """Simple RAG system using in-memory knowledge base with semantic matching"""
-    
+class KnowledgeIndex:
+    """
+    Inverted index over knowledge items: BM25 scoring of the content plus tag postings.
+    Documents are tokenised once in build(); a query only touches the postings of its own terms.
+    """
+
+    TOKEN_REGEX = re.compile(r"\w+")
+    STOPWORDS = frozenset([
+        "the", "and", "for", "how", "what", "which", "when", "where", "why", "who", "with",
+        "can", "could", "should", "would", "does", "are", "was", "were", "this", "that",
+        "these", "those", "my", "your", "from", "into", "about", "have", "has", "there", "their"
+    ])
+    K1 = 1.5
+    B = 0.75
+    BM25_WEIGHT = 2.0
+    TAG_EXACT_SCORE = 10.0
+    TAG_PARTIAL_SCORE = 5.0
+    PRIORITY_BOOST = {"high": 3.0}
+    INTEREST_BOOST = 5.0
+    PARTIAL_CACHE_SIZE = 10000
+
+    def __init__(self, items: Dict[str, dict] = None):
+        self.keys: List[str] = []
+        self.items: List[dict] = []
+        self.lengths: List[int] = []
+        self.priority_boosts: List[float] = []
+        self.avg_length = 0.0
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.tag_postings: Dict[str, List[int]] = {}
+        self.phrase_tags: List[str] = []
+        self.partial_tags: List[str] = []
+        self._partial_cache: Dict[str, Tuple[str, ...]] = {}
+        if items:
+            self.build(items)
+
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        return cls.TOKEN_REGEX.findall(text.lower())
+
+    def build(self, items: Dict[str, dict]):
+        """(Re)build the index from {key: {"content", "tags", "priority"}}"""
+        keys, docs, lengths, boosts = [], [], [], []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        tag_postings: Dict[str, List[int]] = {}
+        for doc_id, (key, item) in enumerate(items.items()):
+            tokens = self.tokenize(item["content"])
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc_id, tf))
+            for tag in {" ".join(self.tokenize(tag)) for tag in item.get("tags", [])}:
+                if tag:
+                    tag_postings.setdefault(tag, []).append(doc_id)
+            keys.append(key)
+            docs.append(item)
+            lengths.append(len(tokens))
+            boosts.append(self.PRIORITY_BOOST.get(item.get("priority"), 0.0))
+
+        self._install(keys, docs, lengths, boosts, postings, tag_postings)
+
+    def _install(self, keys, items, lengths, boosts, postings, tag_postings):
+        # Swap everything in at once so concurrent searches never see a half-built index
+        self.keys, self.items, self.lengths, self.priority_boosts = keys, items, lengths, boosts
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+        self.postings, self.tag_postings = postings, tag_postings
+        self.phrase_tags = [tag for tag in tag_postings if " " in tag]
+        self.partial_tags = [tag for tag in tag_postings if len(tag) > 4]
+        self._partial_cache = {}
+
+    def to_state(self) -> dict:
+        """Everything except the documents themselves, for storing in the compiled corpus file"""
+        return {
+            "keys": self.keys,
+            "lengths": self.lengths,
+            "priority_boosts": self.priority_boosts,
+            "postings": self.postings,
+            "tag_postings": self.tag_postings
+        }
+
+    @classmethod
+    def from_state(cls, state: dict, items) -> "KnowledgeIndex":
+        """Rebuild an index from to_state() output; `items` may be any sequence (e.g. MappedDocuments)"""
+        index = cls()
+        index._install(state["keys"], items, state["lengths"], state["priority_boosts"],
+                       state["postings"], state["tag_postings"])
+        return index
+
+    def _partial_tag_matches(self, word: str) -> Tuple[str, ...]:
+        """Longer tags that contain the word or are contained in it (e.g. "cultivate" ~ "cultivation")"""
+        matches = self._partial_cache.get(word)
+        if matches is None:
+            matches = tuple(tag for tag in self.partial_tags if tag in word or word in tag)
+            if len(self._partial_cache) >= self.PARTIAL_CACHE_SIZE:
+                self._partial_cache.clear()
+            self._partial_cache[word] = matches
+        return matches
+
+    def search(self, query: str, top_k: int = 3, boost_tags: List[str] = None) -> Tuple[List[Tuple[float, str, dict]], int]:
+        """Return ([(score, key, item)] best first, number of matching documents)"""
+        if not self.items:
+            return [], 0
+        tokens = self.tokenize(query)
+        token_set = set(tokens)
+        scores: Dict[int, float] = {}
+        doc_count = len(self.items)
+
+        # BM25 over the content
+        for term in token_set:
+            if len(term) < 3 or term in self.STOPWORDS:
+                continue
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = tf + self.K1 * (1 - self.B + self.B * self.lengths[doc_id] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + self.BM25_WEIGHT * idf * tf * (self.K1 + 1) / norm
+
+        # Tag postings: exact tags (single words or phrases) first, then partial matches on longer words
+        phrase = f" {' '.join(tokens)} "
+        exact_tags = {tag for tag in token_set if tag in self.tag_postings}
+        exact_tags.update(tag for tag in self.phrase_tags if f" {tag} " in phrase)
+        for tag in exact_tags:
+            for doc_id in self.tag_postings[tag]:
+                scores[doc_id] = scores.get(doc_id, 0.0) + self.TAG_EXACT_SCORE
+        for word in token_set:
+            if len(word) <= 3:
+                continue
+            for tag in self._partial_tag_matches(word):
+                if tag in exact_tags:
+                    continue
+                for doc_id in self.tag_postings[tag]:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + self.TAG_PARTIAL_SCORE
+
+        if not scores:
+            return [], 0
+
+        # Priority and user-interest boosts only re-rank documents the query actually matched
+        for doc_id in scores:
+            scores[doc_id] += self.priority_boosts[doc_id]
+        for tag in set(boost_tags or []):
+            for doc_id in self.tag_postings.get(tag.lower(), ()):
+                if doc_id in scores:
+                    scores[doc_id] += self.INTEREST_BOOST
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda entry: entry[1])
+        return [(round(score, 2), self.keys[doc_id], self.items[doc_id]) for doc_id, score in best], len(scores)
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self.items),
+            "terms": len(self.postings),
+            "tags": len(self.tag_postings),
+            "avg_length": round(self.avg_length, 1)
+        }
+
+
+class MappedDocuments:
+    """Read-only sequence of JSON documents decoded on access from a memory-mapped corpus file"""
+
+    def __init__(self, buffer: mmap.mmap, base: int, spans: List[List[int]]):
+        self.buffer = buffer
+        self.base = base
+        self.spans = spans
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __getitem__(self, position: int) -> dict:
+        offset, length = self.spans[position]
+        start = self.base + offset
+        return json.loads(self.buffer[start:start + length].decode("utf-8"))
+
+
+class KnowledgeCorpus:
+    """
+    Knowledge corpus loaded from `source_dir`/*.json (one section per file) and compiled into a
+    single index file that workers memory-map read-only.
+
+    File layout: MAGIC, u64 table-of-contents length, JSON table of contents, then the section
+    blobs. Indexed sections store one blob per document plus the KnowledgeIndex state, so only the
+    postings are materialised per worker and document bodies are decoded when a search returns them.
+    refresh() recompiles when a source file changes and remaps when the index file is replaced,
+    then notifies subscribers.
+    """
+
+    MAGIC = b"CBKIDX01"
+    HEADER = struct.Struct("<8sQ")
+    INDEXED_SECTIONS = ("rag_knowledge",)
+
+    def __init__(self, source_dir: str, index_path: str):
+        self.source_dir = source_dir
+        self.index_path = index_path
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.buffer: Optional[mmap.mmap] = None
+        self.toc: dict = {"sources": {}, "sections": {}, "documents": {}, "indexes": {}}
+        self.base = 0
+        self.loaded_stat = None
+        self.generation = 0
+        self.compiles = 0
+        self._sections: Dict[str, object] = {}
+        self._indexes: Dict[str, KnowledgeIndex] = {}
+
+    def subscribe(self, callback):
+        """Call `callback()` after every reload"""
+        self.listeners.append(callback)
+
+    def _source_fingerprint(self) -> Dict[str, List[int]]:
+        fingerprint = {}
+        if os.path.isdir(self.source_dir):
+            for filename in sorted(os.listdir(self.source_dir)):
+                if filename.endswith(".json"):
+                    stat = os.stat(os.path.join(self.source_dir, filename))
+                    fingerprint[filename[:-5]] = [stat.st_mtime_ns, stat.st_size]
+        return fingerprint
+
+    def compile(self, fingerprint: Dict[str, List[int]] = None):
+        """Compile the source directory into the index file (atomically replaced)"""
+        fingerprint = fingerprint if fingerprint is not None else self._source_fingerprint()
+        body = bytearray()
+        sections, documents, indexes = {}, {}, {}
+
+        def put(value) -> List[int]:
+            data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            body.extend(data)
+            return [len(body) - len(data), len(data)]
+
+        for name in fingerprint:
+            with open(os.path.join(self.source_dir, f"{name}.json"), encoding="utf-8") as f:
+                data = json.load(f)
+            if name in self.INDEXED_SECTIONS and isinstance(data, dict):
+                documents[name] = [put(item) for item in data.values()]
+                indexes[name] = put(KnowledgeIndex(data).to_state())
+            else:
+                sections[name] = put(data)
+
+        toc = json.dumps({"sources": fingerprint, "sections": sections,
+                          "documents": documents, "indexes": indexes}).encode("utf-8")
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, len(toc)))
+            f.write(toc)
+            f.write(body)
+        os.replace(temp_path, self.index_path)
+        self.compiles += 1
+        print(f"📚 Compiled knowledge corpus: {len(fingerprint)} sections, {len(body)} bytes")
+
+    def _map(self, stat):
+        with open(self.index_path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, toc_length = self.HEADER.unpack_from(buffer, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"{self.index_path} is not a compiled knowledge corpus")
+        toc_start = self.HEADER.size
+        toc = json.loads(buffer[toc_start:toc_start + toc_length].decode("utf-8"))
+        # Previous buffers are left to the garbage collector: in-flight searches may still hold them
+        self.buffer, self.toc, self.base = buffer, toc, toc_start + toc_length
+        self._sections, self._indexes = {}, {}
+        self.loaded_stat = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        self.generation += 1
+
+    def refresh(self) -> bool:
+        """Recompile stale sources and remap a replaced index file; returns True if reloaded"""
+        with self.lock:
+            changed = False
+            try:
+                stat = os.stat(self.index_path)
+            except FileNotFoundError:
+                stat = None
+            # Pick up an index file replaced by another worker (or by a deploy)
+            if stat is not None and (stat.st_mtime_ns, stat.st_size, stat.st_ino) != self.loaded_stat:
+                try:
+                    self._map(stat)
+                    changed = True
+                except (ValueError, struct.error) as e:
+                    # Truncated or foreign file: force a recompile from the sources below
+                    print(f"⚠️ Ignoring unreadable knowledge index: {e}")
+                    self.toc["sources"] = {}
+            fingerprint = self._source_fingerprint()
+            if fingerprint and fingerprint != self.toc["sources"]:
+                self.compile(fingerprint)
+                self._map(os.stat(self.index_path))
+                changed = True
+            if not changed:
+                return False
+        for callback in self.listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ Knowledge reload callback error: {e}")
+        print(f"🔄 Knowledge corpus loaded (generation {self.generation})")
+        return True
+
+    async def watch(self, interval: float = KNOWLEDGE_RELOAD_INTERVAL):
+        """Background task: poll source and index mtimes and hot-reload on change"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"⚠️ Knowledge corpus reload error: {e}")
+
+    def section(self, name: str, default=None):
+        """Decoded content of knowledge/<name>.json (cached until the next reload)"""
+        if name in self._sections:
+            return self._sections[name]
+        span = self.toc["sections"].get(name)
+        if span is None:
+            if name in self.toc["documents"]:
+                index = self.index(name)
+                return {key: index.items[i] for i, key in enumerate(index.keys)}
+            return default
+        start = self.base + span[0]
+        value = json.loads(self.buffer[start:start + span[1]].decode("utf-8"))
+        self._sections[name] = value
+        return value
+
+    def index(self, name: str) -> KnowledgeIndex:
+        """KnowledgeIndex over an indexed section, with documents read from the mapped file"""
+        index = self._indexes.get(name)
+        if index is None:
+            span = self.toc["indexes"].get(name)
+            if span is None:
+                return KnowledgeIndex()
+            start = self.base + span[0]
+            state = json.loads(self.buffer[start:start + span[1]].decode("utf-8"))
+            index = KnowledgeIndex.from_state(state, MappedDocuments(self.buffer, self.base, self.toc["documents"][name]))
+            self._indexes[name] = index
+        return index
+
+    def stats(self) -> dict:
+        return {
+            "path": self.index_path,
+            "generation": self.generation,
+            "compiles": self.compiles,
+            "bytes": len(self.buffer) if self.buffer is not None else 0,
+            "sections": sorted(list(self.toc["sections"]) + list(self.toc["documents"]))
+        }
+
+
+class UserContext:
+    """Compact per-user record: ring-buffer query history of (query, epoch seconds) pairs"""
+
+    __slots__ = ("query_history", "crop_interests", "location", "previous_location", "preferences", "last_interaction")
+    HISTORY_SIZE = 20
+
     def __init__(self):
-        self.knowledge_base = self._initialize_knowledge()
-        self.user_contexts = {}  # Store user session data
-        
-    def _initialize_knowledge(self):
-        """Initialize agricultural knowledge base for Bangladesh"""
+        self.query_history = deque(maxlen=self.HISTORY_SIZE)
+        self.crop_interests: List[str] = []
+        self.location: Optional[str] = None
+        self.previous_location: Optional[str] = None
+        self.preferences: dict = {}
+        self.last_interaction: Optional[float] = None
+
+    def to_dict(self) -> dict:
         return {
-            # Crop-specific knowledge
-            "rice_cultivation": {
-                "content": """Rice Cultivation in Bangladesh:
-- Boro Season (Jan-May): BRRI dhan28, 29, 58, 88, 89. High irrigation needs.
-- Aman Season (Jul-Dec): BRRI dhan49, 50, 52, 71, 75. Rainfed, flood-tolerant.
-- Aus Season (Apr-Aug): BR26, BRRI dhan27, 48, 83. Drought-tolerant.
-- SRI method: 20-30% water saving, 25-50% yield increase.
-- AWD irrigation: Save 15-30% water without yield loss.
-- Modern: Laser land leveling, direct seeded rice, mechanical transplanting.""",
-                "tags": ["rice", "paddy", "dhan", "boro", "aman", "aus", "cultivation", "cultivate", "grow", "plant"],
-                "priority": "high"
-            },
-            "vegetable_farming": {
-                "content": """Vegetable Farming Best Practices:
-- Winter vegetables: Tomato, cabbage, cauliflower, POTATO (Oct-Feb planting).
-- Summer vegetables: Okra, bottle gourd, bitter gourd (Mar-Jun).
-- Potato cultivation: Plant Oct-Dec, harvest Feb-Mar. Needs irrigation, organic matter.
-- Modern methods: Drip irrigation (60% water saving), mulching, vertical farming.
-- Protected cultivation: Polyhouse increases yield 3-5x, year-round production.
-- Hydroponics: 90% water saving, pesticide-free, suitable for urban areas.
-- Mobile apps: AgroStar, Krishoker Janala for pest identification.""",
-                "tags": ["vegetable", "tomato", "cabbage", "cauliflower", "okra", "gourd", "potato", "alu", "winter", "crop"],
-                "priority": "high"
-            },
-            "soil_management": {
-                "content": """Soil Health & Management:
-- Soil testing: Essential every 2-3 years. Available at district BADC labs.
-- NPK balance: Test before fertilization. Over-fertilization damages soil.
-- Organic matter: Add 5-10 tons compost/ha or 2-3 tons vermicompost/ha.
-- pH management: Bangladesh soils typically 5.5-7.0. Lime for acidic soils.
-- Modern: IoT soil sensors monitor moisture, pH, NPK in real-time.
-- Green manuring: Dhaincha, Sesbania improve soil fertility naturally.""",
-                "tags": ["soil", "fertility", "testing", "compost", "fertilizer", "pH"],
-                "priority": "high"
-            },
-            "irrigation_technology": {
-                "content": """Modern Irrigation Technologies:
-- Drip irrigation: 40-70% water saving, 20-50% yield increase. ROI: 2-3 years.
-- Solar pumps: No fuel cost, 20-year lifespan. Govt subsidies available.
-- Soil moisture sensors: Automatic irrigation scheduling. Save 30% water.
-- Mobile apps: Weather-based irrigation scheduling (free apps available).
-- AWD for rice: Alternate wetting/drying saves 25% water, reduces methane.
-- Sprinkler systems: Good for vegetables, 25-40% water saving.""",
-                "tags": ["irrigation", "water", "drip", "solar", "pump", "moisture"],
-                "priority": "high"
-            },
-            "pest_management": {
-                "content": """Integrated Pest Management (IPM):
-- Monitoring: Pheromone traps, light traps, yellow sticky traps.
-- Biological: Trichogramma, NPV, Bt for organic pest control.
-- Chemical: Use only as last resort. Follow PHI (pre-harvest interval).
-- Mobile apps: AI-based pest identification (PlantVillage, Agrio apps).
-- Drones: Precision spraying reduces pesticide use by 50%.
-- IPM reduces pesticide cost by 40-60% while maintaining yields.""",
-                "tags": ["pest", "disease", "insect", "IPM", "organic", "control"],
-                "priority": "high"
-            },
-            "mechanization": {
-                "content": """Farm Mechanization Options:
-- Power tiller: Most common, multi-purpose. Price: 80,000-150,000 BDT.
-- Combine harvester: Reduces labor cost 70%. Available for rent.
-- Seed drill: Precise seed placement, saves seeds. Rental: 500-800 BDT/ha.
-- Reaper: Fast harvesting. Rental: 2,500-3,500 BDT/ha.
-- Sprayer drones: Precision application. Service: 300-500 BDT/acre.
-- Govt subsidies: 25-50% subsidy on farm machinery through BADC.""",
-                "tags": ["mechanization", "tractor", "harvester", "machinery", "equipment"],
-                "priority": "medium"
-            },
-            "weather_climate": {
-                "content": """Weather & Climate Management:
-- Weather apps: BMD Weather, Krishi Prabaha (free, Bengali interface).
-- Early warning: SMS alerts for storms, floods from DAE.
-- Climate-smart: Flood-tolerant varieties (BRRI dhan51, 52).
-- Drought management: Short-duration varieties, mulching, drip irrigation.
-- Heat stress: Shade nets for vegetables, timely irrigation.
-- Frost protection: Row covers for winter vegetables, smoke in orchards.""",
-                "tags": ["weather", "climate", "forecast", "flood", "drought", "temperature"],
-                "priority": "high"
-            },
-            "market_economics": {
-                "content": """Market & Economics:
-- Price information: Krishoker Janala app, DAE helpline 3331.
-- Contract farming: Secure market before planting. Popular for vegetables.
-- Value addition: Processing, grading increases profit 30-50%.
-- Storage: PICS bags for grains (99% protection), cold storage for vegetables.
-- Cooperatives: Group selling gets better prices, shared mechanization.
-- Digital marketing: Facebook groups, e-commerce platforms for direct selling.""",
-                "tags": ["market", "price", "selling", "profit", "economics", "business"],
-                "priority": "medium"
-            },
-            "organic_farming": {
-                "content": """Organic & Sustainable Farming:
-- Certification: BRAC, Probaho provide organic certification.
-- Premium prices: 20-50% higher for certified organic produce.
-- Compost making: Use crop residues, animal waste. Ready in 60-90 days.
-- Vermicompost: High nutrient, 3-4 months production cycle.
-- Biofertilizers: Rhizobium, Azotobacter, PSB. Available from BADC.
-- Biopesticides: Neem oil, Bt, NPV effective and safe.""",
-                "tags": ["organic", "sustainable", "natural", "compost", "bio", "certification"],
-                "priority": "medium"
-            }
+            "h": list(self.query_history),
+            "c": self.crop_interests,
+            "l": self.location,
+            "pl": self.previous_location,
+            "p": self.preferences,
+            "t": self.last_interaction
         }
-    
-    def get_user_context(self, user_id: str) -> dict:
-        """Retrieve user context and preferences with ChromaDB vector search"""
-        # Try ChromaDB vector search first for advanced memory
-        if VECTOR_DB_AVAILABLE and vector_memory:
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UserContext":
+        context = cls()
+        context.query_history.extend(tuple(entry) for entry in data.get("h", []))
+        context.crop_interests = data.get("c", [])
+        context.location = data.get("l")
+        context.previous_location = data.get("pl")
+        context.preferences = data.get("p", {})
+        context.last_interaction = data.get("t")
+        return context
+
+
+class UserMemory:
+    """Request-scoped snapshot of what we know about a user (stored context merged with recalled vector memory)"""
+
+    __slots__ = ("user_id", "crop_interests", "location", "query_count")
+
+    def __init__(self, user_id: str, crop_interests: List[str], location: Optional[str], query_count: int):
+        self.user_id = user_id
+        self.crop_interests = crop_interests
+        self.location = location
+        self.query_count = query_count
+
+
+class UserContextStore:
+    """
+    Bounded user-context store: LRU by last access, records idle for `idle_ttl` seconds expire.
+    With a `backing` SQLiteCacheStore, contexts are written through on every update (expiring
+    with the idle TTL there too), so evicted users are reloaded instead of starting over.
+    """
+
+    def __init__(self, max_users: int = USER_CONTEXT_MAX_USERS, idle_ttl: int = USER_CONTEXT_IDLE_TTL,
+                 backing: Optional[SQLiteCacheStore] = None):
+        self.max_users = max_users
+        self.idle_ttl = idle_ttl
+        self.backing = backing
+        self.contexts: "OrderedDict[str, UserContext]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _backing_key(user_id: str) -> str:
+        return f"userctx_{user_id}"
+
+    def _is_idle(self, context: UserContext, now: float) -> bool:
+        return context.last_interaction is not None and now - context.last_interaction > self.idle_ttl
+
+    def _cached(self, user_id: str) -> Optional[UserContext]:
+        """The in-memory context, or None when absent or idle"""
+        now = time.time()
+        with self.lock:
+            context = self.contexts.get(user_id)
+            if context is not None and self._is_idle(context, now):
+                del self.contexts[user_id]
+                self.expirations += 1
+                context = None
+            if context is not None:
+                self.contexts.move_to_end(user_id)
+            return context
+
+    def _admit(self, user_id: str, stored: Optional[Tuple[dict, float]]) -> UserContext:
+        """Install the context read from the backing store (or a fresh one) in memory"""
+        context = None
+        if stored is not None:
+            context = UserContext.from_dict(stored[0])
+            self.loads += 1
+        with self.lock:
+            # Another request may have created the record while we were reading the backing store
+            context = self.contexts.setdefault(user_id, context or UserContext())
+            self.contexts.move_to_end(user_id)
+            while len(self.contexts) > self.max_users:
+                self.contexts.popitem(last=False)
+                self.evictions += 1
+        return context
+
+    def get(self, user_id: str) -> UserContext:
+        """Return the user's context, loading it from the backing store or creating it (blocking)"""
+        context = self._cached(user_id)
+        if context is not None:
+            return context
+        stored = self.backing.get(self._backing_key(user_id)) if self.backing is not None else None
+        return self._admit(user_id, stored)
+
+    async def load(self, user_id: str) -> UserContext:
+        """Like get(), but the backing-store read runs in a worker thread"""
+        context = self._cached(user_id)
+        if context is not None:
+            return context
+        stored = None
+        if self.backing is not None:
+            stored = await asyncio.to_thread(self.backing.get, self._backing_key(user_id))
+        return self._admit(user_id, stored)
+
+    def save(self, user_id: str, context: UserContext):
+        """Queue an updated context for the backing store's next flush"""
+        if self.backing is not None:
+            expires_at = (context.last_interaction or time.time()) + self.idle_ttl
+            self.backing.set(self._backing_key(user_id), context.to_dict(), expires_at)
+
+    def sweep_idle(self) -> int:
+        """Drop contexts idle for longer than idle_ttl; returns the number removed"""
+        now = time.time()
+        with self.lock:
+            idle = [user_id for user_id, context in self.contexts.items() if self._is_idle(context, now)]
+            for user_id in idle:
+                del self.contexts[user_id]
+            self.expirations += len(idle)
+        return len(idle)
+
+    async def run_sweeper(self, interval: float = CACHE_SWEEP_INTERVAL):
+        """Background task: periodically drop idle contexts"""
+        while True:
+            await asyncio.sleep(interval)
             try:
-                # Query vector database for user's past interactions
-                results = vector_memory.get(
-                    where={"user_id": user_id},
-                    limit=10
-                )
-                
-                if results and results['documents']:
-                    # Extract structured data from vector memories
-                    crop_interests = []
-                    location = None
-                    
-                    for doc, metadata in zip(results['documents'], results['metadatas']):
-                        # Parse memory content for crop interests
-                        if 'interested in' in doc.lower():
-                            for crop in ['rice', 'vegetable', 'wheat', 'potato', 'jute', 'tomato']:
-                                if crop in doc.lower() and crop not in crop_interests:
-                                    crop_interests.append(crop)
-                        
-                        # Extract location from metadata or document
-                        if 'location' in metadata:
-                            location = metadata['location']
-                        elif 'location:' in doc.lower():
-                            location = doc.split('location:')[-1].strip().split('\n')[0]
-                    
-                    if crop_interests or location:
-                        print(f"📚 ChromaDB: Retrieved memories for {user_id}: crops={crop_interests}, location={location}")
+                removed = self.sweep_idle()
+                if removed:
+                    print(f"🧹 User context sweep removed {removed} idle users")
             except Exception as e:
-                print(f"⚠️ ChromaDB retrieval error: {e}")
+                print(f"⚠️ User context sweep error: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self.contexts),
+            "max_users": self.max_users,
+            "idle_ttl": self.idle_ttl,
+            "persistent": self.backing is not None,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+user_context_store = UserContextStore(backing=l2_cache_store if USER_CONTEXT_PERSIST else None)
+
+
+class RAGKnowledgeBase:
+    """Simple RAG system using in-memory knowledge base with semantic matching"""
+    
+    def __init__(self, corpus: "KnowledgeCorpus"):
+        # Agricultural knowledge for Bangladesh lives in knowledge/rag_knowledge.json
+        self.corpus = corpus
+        self.index = KnowledgeIndex()
+        self.reload()
+        corpus.subscribe(self.reload)
+        self.user_contexts = user_context_store  # Store user session data
+    
+    def reload(self):
+        self.index = self.corpus.index("rag_knowledge")
+    
+    def get_user_context(self, user_id: str) -> UserContext:
+        """Retrieve the user's stored context (in-memory store, no vector-database access)"""
+        return self.user_contexts.get(user_id)
+    
+    def _recall_vector_memory(self, user_id: str) -> dict:
+        """Query ChromaDB for the user's past interactions (blocking; run in a worker thread)"""
+        crop_interests = []
+        location = None
+        try:
+            # Query vector database for user's past interactions
+            results = vector_memory.get(
+                where={"user_id": user_id},
+                limit=10
+            )
+            
+            if results and results['documents']:
+                # Extract structured data from vector memories
+                for doc, metadata in zip(results['documents'], results['metadatas']):
+                    # Parse memory content for crop interests
+                    if 'interested in' in doc.lower():
+                        for crop in ['rice', 'vegetable', 'wheat', 'potato', 'jute', 'tomato']:
+                            if crop in doc.lower() and crop not in crop_interests:
+                                crop_interests.append(crop)
+                    
+                    # Extract location from metadata or document
+                    if metadata and 'location' in metadata:
+                        location = metadata['location']
+                    elif 'location:' in doc.lower():
+                        location = doc.split('location:')[-1].strip().split('\n')[0]
+                
+                if crop_interests or location:
+                    print(f"📚 ChromaDB: Retrieved memories for {user_id}: crops={crop_interests}, location={location}")
+        except Exception as e:
+            print(f"⚠️ ChromaDB retrieval error: {e}")
+        return {"crop_interests": crop_interests, "location": location}
+    
+    async def recall_vector_memory(self, user_id: str) -> dict:
+        """Recalled interests/location for a user, cached for USER_MEMORY_TTL seconds"""
+        if not (VECTOR_DB_AVAILABLE and vector_memory):
+            return {"crop_interests": [], "location": None}
+        cache_key = f"umem_{user_id}"
+        cached = await perf_cache.aget(cache_key)
+        if cached is not None:
+            return cached
         
-        # Fallback to simple context storage
-        if user_id not in self.user_contexts:
-            self.user_contexts[user_id] = {
-                "query_history": [],
-                "crop_interests": [],
-                "location": None,
-                "preferences": {},
-                "last_interaction": None
-            }
-        return self.user_contexts[user_id]
+        async def fetch():
+            recalled = await asyncio.to_thread(self._recall_vector_memory, user_id)
+            perf_cache.set(cache_key, recalled, ttl_seconds=USER_MEMORY_TTL)
+            return recalled
+        
+        return await single_flight.do(cache_key, fetch)
+    
+    def snapshot(self, user_id: str, recalled: Optional[dict] = None) -> UserMemory:
+        """Merge the stored context with (optionally) recalled vector memory"""
+        context = self.get_user_context(user_id)
+        crop_interests = list(context.crop_interests)
+        location = context.location
+        if recalled:
+            crop_interests += [crop for crop in recalled["crop_interests"] if crop not in crop_interests]
+            location = location or recalled["location"]
+        return UserMemory(user_id, crop_interests, location, len(context.query_history))
+    
+    async def load_user_memory(self, user_id: str) -> UserMemory:
+        """Load user memory once per request; pass the snapshot to the lookups below"""
+        # Bring the stored context into memory off the event loop so snapshot() and the
+        # later update_user_context() find it without touching the backing store
+        _, recalled = await asyncio.gather(self.user_contexts.load(user_id), self.recall_vector_memory(user_id))
+        return self.snapshot(user_id, recalled)
     
     def update_user_context(self, user_id: str, query: str, location: str = None, response: str = None):
         """Update user context based on interaction with Mem0 storage"""
         context = self.get_user_context(user_id)
-        context["query_history"].append({
-            "query": query,
-            "timestamp": datetime.now().isoformat()
-        })
-        # Keep only last 20 queries
-        context["query_history"] = context["query_history"][-20:]
+        now = time.time()
+        # Ring buffer keeps only the last 20 queries
+        context.query_history.append((query, now))
         
         if location:
-            context["location"] = location
+            context.location = location
         
         # Extract crop interests from queries
         crops = ["rice", "vegetable", "wheat", "potato", "jute", "tomato", "cabbage", "irrigation", "soil", "pest"]
         new_interests = []
         for crop in crops:
-            if crop in query.lower() and crop not in context["crop_interests"]:
-                context["crop_interests"].append(crop)
+            if crop in query.lower() and crop not in context.crop_interests:
+                context.crop_interests.append(crop)
                 new_interests.append(crop)
         
-        context["last_interaction"] = datetime.now().isoformat()
-        
-        # Store in ChromaDB vector database for long-term memory
-        if VECTOR_DB_AVAILABLE and vector_memory:
-            try:
-                # Generate unique ID for this interaction
-                interaction_id = f"{user_id}_{int(time.time() * 1000)}"
-                
-                # Store crop interests in vector database
-                if new_interests:
-                    vector_memory.add(
-                        ids=[f"interest_{interaction_id}"],
-                        documents=[f"User is interested in {', '.join(new_interests)} farming"],
-                        metadatas=[{
-                            "user_id": user_id,
-                            "type": "interest",
-                            "crops": ','.join(new_interests),
-                            "timestamp": datetime.now().isoformat()
-                        }]
-                    )
-                
-                # Store location in vector database
-                if location and location != context.get("previous_location"):
-                    vector_memory.add(
-                        ids=[f"location_{interaction_id}"],
-                        documents=[f"User location: {location}"],
-                        metadatas=[{
-                            "user_id": user_id,
-                            "type": "location",
-                            "location": location,
-                            "timestamp": datetime.now().isoformat()
-                        }]
-                    )
-                    context["previous_location"] = location
-                
-                # Store query-response interaction
-                if response:
-                    vector_memory.add(
-                        ids=[f"interaction_{interaction_id}"],
-                        documents=[f"Q: {query[:200]}... A: {response[:200]}..."],
-                        metadatas=[{
-                            "user_id": user_id,
-                            "type": "interaction",
-                            "query": query[:200],
-                            "timestamp": datetime.now().isoformat()
-                        }]
-                    )
-                
-                print(f"💾 ChromaDB: Stored memory for {user_id}")
-            except Exception as e:
-                print(f"⚠️ ChromaDB storage error: {e}")
-        
-    def retrieve_relevant_knowledge(self, query: str, user_id: str = None, top_k: int = 3) -> str:
-        """Retrieve relevant knowledge based on query and user context"""
-        query_lower = query.lower()
-        query_words = query_lower.split()
+        context.last_interaction = now
         
-        # Score each knowledge item
-        scored_items = []
-        for key, item in self.knowledge_base.items():
-            score = 0
-            
-            # Tag matching (exact and partial)
-            for tag in item["tags"]:
-                if tag in query_lower:
-                    score += 10
-                # Partial match for longer words
-                elif len(tag) > 4:
-                    for word in query_words:
-                        if len(word) > 3 and (tag in word or word in tag):
-                            score += 5
+        # Queue for the ChromaDB vector database (long-term memory); the write-behind
+        # task does the embedding and indexing outside the request path
+        if memory_writer is not None:
+            # Generate unique ID for this interaction
+            interaction_id = f"{user_id}_{int(time.time() * 1000)}"
+            timestamp = datetime.now().isoformat()
             
-            # Content keyword matching
-            content_lower = item["content"].lower()
-            for word in query_words:
-                if len(word) > 3 and word in content_lower:
-                    score += 2
-            
-            # Priority boost
-            if item["priority"] == "high":
-                score += 3
+            # Store crop interests in vector database
+            if new_interests:
+                memory_writer.append(
+                    f"interest_{interaction_id}",
+                    f"User is interested in {', '.join(new_interests)} farming",
+                    {"user_id": user_id, "type": "interest", "crops": ','.join(new_interests), "timestamp": timestamp}
+                )
             
-            # User interest boost
-            if user_id:
-                context = self.get_user_context(user_id)
-                for interest in context["crop_interests"]:
-                    if interest in item["tags"]:
-                        score += 5
+            # Store location in vector database
+            if location and location != context.previous_location:
+                memory_writer.append(
+                    f"location_{interaction_id}",
+                    f"User location: {location}",
+                    {"user_id": user_id, "type": "location", "location": location, "timestamp": timestamp}
+                )
+                context.previous_location = location
             
-            if score > 0:
-                scored_items.append((score, key, item))
+            # Store query-response interaction
+            if response:
+                memory_writer.append(
+                    f"interaction_{interaction_id}",
+                    f"Q: {query[:200]}... A: {response[:200]}...",
+                    {"user_id": user_id, "type": "interaction", "query": query[:200], "timestamp": timestamp}
+                )
         
-        # Sort by score and get top_k
-        scored_items.sort(reverse=True, key=lambda x: x[0])
-        top_items = scored_items[:top_k]
+        self.user_contexts.save(user_id, context)
+
+    def retrieve_relevant_knowledge(self, query: str, user_id: str = None, top_k: int = 3,
+                                    memory: Optional[UserMemory] = None) -> str:
+        """Retrieve relevant knowledge based on query and user context"""
+        # User interests are looked up once per query and applied as a tag boost
+        if memory is None and user_id:
+            memory = self.snapshot(user_id)
+        interests = memory.crop_interests if memory else []
+        top_items, matched = self.index.search(query, top_k=top_k, boost_tags=interests)
         
         if not top_items:
             print(f"⚠️ RAG: No knowledge matched for query: '{query[:50]}...'")
             return ""
         
         # Debug logging
-        print(f"🔍 RAG: Matched {len(scored_items)} items, returning top {len(top_items)}")
+        print(f"🔍 RAG: Matched {matched} items, returning top {len(top_items)}")
         for score, key, _ in top_items:
             print(f"   - {key}: score={score}")
         
@@ -640,31 +1651,303 @@ class RAGKnowledgeBase:
         
         return retrieved_text
     
-    def get_personalized_context(self, user_id: str) -> str:
+    def get_personalized_context(self, user_id: str, memory: Optional[UserMemory] = None) -> str:
         """Generate personalized context string for the user"""
-        context = self.get_user_context(user_id)
+        context = memory or self.snapshot(user_id)
         
-        if not context["query_history"]:
+        if not context.query_count:
             return ""
         
         personalization = "\\n**USER CONTEXT:**\\n"
         
-        if context["crop_interests"]:
-            personalization += f"User's interests: {', '.join(context['crop_interests'][:5])}\\n"
+        if context.crop_interests:
+            personalization += f"User's interests: {', '.join(context.crop_interests[:5])}\\n"
         
-        if context["location"]:
-            personalization += f"Regular location: {context['location']}\\n"
+        if context.location:
+            personalization += f"Regular location: {context.location}\\n"
         
         # Recent queries pattern
-        recent_count = len(context["query_history"])
+        recent_count = context.query_count
         if recent_count > 3:
             personalization += f"Active user ({recent_count} previous queries)\\n"
         
         return personalization
 
 # Initialize hybrid system components
-rag_system = RAGKnowledgeBase()
-fewshot_system = FewShotExamples()
+knowledge_corpus = KnowledgeCorpus(KNOWLEDGE_DIR, KNOWLEDGE_INDEX_PATH)
+try:
+    knowledge_corpus.refresh()
+    print(f"✅ Knowledge corpus ready: {knowledge_corpus.stats()['sections']}")
+except Exception as e:
+    print(f"⚠️ Knowledge corpus unavailable: {e}")
+rag_system = RAGKnowledgeBase(knowledge_corpus)
+fewshot_system = FewShotExamples(knowledge_corpus)
+
+# =================== OFFLINE GAZETTEER ===================
+# Bangladesh place names (knowledge/gazetteer.json) resolved locally: exact and fuzzy name
+# matching across English and Bengali spellings, and nearest-place lookup for GPS coordinates
+
+BENGALI_CONSONANTS = {
+    "ক": "k", "খ": "kh", "গ": "g", "ঘ": "gh", "ঙ": "ng", "চ": "ch", "ছ": "chh", "জ": "j", "ঝ": "jh",
+    "ঞ": "n", "ট": "t", "ঠ": "th", "ড": "d", "ঢ": "dh", "ণ": "n", "ত": "t", "থ": "th", "দ": "d",
+    "ধ": "dh", "ন": "n", "প": "p", "ফ": "ph", "ব": "b", "ভ": "bh", "ম": "m", "য": "j", "র": "r",
+    "ল": "l", "শ": "sh", "ষ": "sh", "স": "s", "হ": "h", "ড়": "r", "ঢ়": "rh", "য়": "y"
+}
+BENGALI_VOWELS = {
+    "অ": "a", "আ": "a", "ই": "i", "ঈ": "i", "উ": "u", "ঊ": "u", "ঋ": "ri", "এ": "e", "ঐ": "oi",
+    "ও": "o", "ঔ": "ou", "ৎ": "t", "ং": "ng", "ঃ": "h"
+}
+BENGALI_VOWEL_SIGNS = {
+    "া": "a", "ি": "i", "ী": "i", "ু": "u", "ূ": "u", "ৃ": "ri", "ে": "e", "ৈ": "oi", "ো": "o", "ৌ": "ou"
+}
+BENGALI_VIRAMA = "্"
+# Nukta letters arrive decomposed (consonant + U+09BC) from most keyboards
+BENGALI_NUKTA_FORMS = {"ড়": "ড়", "ঢ়": "ঢ়", "য়": "য়"}
+
+
+def transliterate_bengali(text: str) -> str:
+    """Rough Bengali-to-Latin romanisation (inherent vowel dropped word-finally), for matching only"""
+    for decomposed, composed in BENGALI_NUKTA_FORMS.items():
+        text = text.replace(decomposed, composed)
+    out = []
+    for i, char in enumerate(text):
+        if char in BENGALI_CONSONANTS:
+            out.append(BENGALI_CONSONANTS[char])
+            following = text[i + 1] if i + 1 < len(text) else ""
+            if following and following not in BENGALI_VOWEL_SIGNS and following != BENGALI_VIRAMA \
+                    and following != "ঁ" and (following in BENGALI_CONSONANTS or following in "ংঃ"):
+                out.append("a")
+        elif char in BENGALI_VOWEL_SIGNS:
+            out.append(BENGALI_VOWEL_SIGNS[char])
+        elif char in BENGALI_VOWELS:
+            out.append(BENGALI_VOWELS[char])
+        elif char == BENGALI_VIRAMA or char == "ঁ":
+            continue
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def place_key(text: str) -> str:
+    """
+    Spelling-insensitive matching key: Bengali is romanised, then aspirates, doubled letters
+    and common variant spellings (z/j, v/b, y/i, o/a, ph/f) are folded, so "Moymonsingh" and
+    "ময়মনসিংহ" land close to "Mymensingh"
+    """
+    if any("ঀ" <= char <= "৿" for char in text):
+        text = transliterate_bengali(text)
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if "a" <= char <= "z" or char.isdigit())
+    text = re.sub(r"(?<=[^aeiou])h", "", text)
+    for variant, folded in (("ph", "f"), ("f", "p"), ("z", "j"), ("v", "b"), ("w", "o"),
+                            ("y", "i"), ("q", "k"), ("x", "ks"), ("ee", "i"), ("oo", "u"), ("o", "a")):
+        text = text.replace(variant, folded)
+    return re.sub(r"(.)\1+", r"\1", text)
+
+
+class Gazetteer:
+    """
+    Offline place resolver over knowledge/gazetteer.json. The bundled file covers the country,
+    all divisions and districts, but only a partial set of upazilas and no unions; extra upazila
+    or union rows use the same format and need no code change. Names the file does not know
+    fall through to the remote geocoders. Names, aliases and Bengali spellings are reduced
+    to place_key()s for exact lookup, with a character-trigram index for fuzzy matches, and a
+    2-d tree over the coordinates answers nearest-place queries. Rebuilt on corpus reload.
+    """
+
+    LEVEL_RANK = {"district": 0, "division": 1, "upazila": 2, "union": 3, "country": 4}
+    REVERSE_LEVELS = ("district", "upazila", "union")
+    QUALIFIERS = ("bangladesh", "district", "zila", "zilla", "division", "upazila", "thana", "sadar",
+                  "বাংলাদেশ", "জেলা", "বিভাগ", "উপজেলা", "থানা", "সদর")
+
+    def __init__(self, corpus: "KnowledgeCorpus"):
+        self.corpus = corpus
+        self.places: List[dict] = []
+        self.exact: Dict[str, List[int]] = {}
+        self.keys: List[Tuple[str, int]] = []
+        self.trigrams: Dict[str, List[int]] = {}
+        self.tree = None
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.reverse_hits = 0
+        self.reload()
+        corpus.subscribe(self.reload)
+
+    @staticmethod
+    def _trigrams(key: str) -> set:
+        padded = f"^{key}$"
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    @staticmethod
+    def _project(lat: float, lon: float) -> Tuple[float, float]:
+        # Equirectangular projection around 23.7°N; accurate enough for ranking candidates
+        return lon * 0.9155, lat
+
+    def _build_tree(self, indices: List[int], depth: int = 0):
+        """Node = (place index, axis, left, right), split on the median of alternating axes"""
+        if not indices:
+            return None
+        axis = depth % 2
+        indices.sort(key=lambda i: self._project(self.places[i]["lat"], self.places[i]["lon"])[axis])
+        middle = len(indices) // 2
+        return (indices[middle], axis,
+                self._build_tree(indices[:middle], depth + 1),
+                self._build_tree(indices[middle + 1:], depth + 1))
+
+    def reload(self):
+        data = self.corpus.section("gazetteer", {}) or {}
+        places = [place for place in data.get("places", []) if "lat" in place and "lon" in place]
+        # Rank so that a name shared by several places ("Dhaka") resolves to the district first
+        places.sort(key=lambda place: self.LEVEL_RANK.get(place.get("level"), 5))
+        exact: Dict[str, List[int]] = {}
+        keys: List[Tuple[str, int]] = []
+        trigrams: Dict[str, List[int]] = {}
+        for index, place in enumerate(places):
+            names = [place["name"], place.get("bn", "")] + list(place.get("aliases", []))
+            for key in {place_key(name) for name in names if name}:
+                if not key:
+                    continue
+                exact.setdefault(key, []).append(index)
+                key_id = len(keys)
+                keys.append((key, index))
+                for trigram in self._trigrams(key):
+                    trigrams.setdefault(trigram, []).append(key_id)
+        self.places, self.exact, self.keys, self.trigrams = places, exact, keys, trigrams
+        self.tree = self._build_tree([i for i, place in enumerate(places) if place.get("level") in self.REVERSE_LEVELS])
+
+    @staticmethod
+    def display_name(place: dict) -> str:
+        if place.get("level") == "country":
+            return place["name"]
+        if place.get("level") in ("upazila", "union") and place.get("district"):
+            return f"{place['name']}, {place['district']}, Bangladesh"
+        return f"{place['name']}, Bangladesh"
+
+    def _fuzzy(self, key: str) -> Tuple[float, Optional[int]]:
+        query = self._trigrams(key)
+        shared = Counter()
+        for trigram in query:
+            for key_id in self.trigrams.get(trigram, ()):
+                shared[key_id] += 1
+        best_score, best = 0.0, None
+        for key_id, count in shared.items():
+            candidate, index = self.keys[key_id]
+            score = 2.0 * count / (len(query) + len(self._trigrams(candidate)))
+            if score > best_score or (score == best_score and best is not None and index < best):
+                best_score, best = score, index
+        return best_score, best
+
+    def _strip_qualifiers(self, text: str) -> str:
+        words = [word for word in text.split() if word.lower() not in self.QUALIFIERS]
+        return " ".join(words)
+
+    def _candidates(self, part: str) -> List[int]:
+        """Exact matches for one comma-separated part, with and without qualifier words"""
+        for text in (part, self._strip_qualifiers(part)):
+            key = place_key(text)
+            if key and key in self.exact:
+                return self.exact[key]
+        return []
+
+    def resolve(self, location: str) -> Optional[dict]:
+        """
+        Best place for a free-form location such as "Savar, Dhaka", "গাজীপুর সদর" or "Jessore
+        district". Later comma-separated parts disambiguate earlier ones; falls back to the
+        closest fuzzy match above GAZETTEER_MIN_SIMILARITY. Returns None for unknown places.
+        """
+        parts = [part.strip() for part in re.split(r"[,،]", location or "") if part.strip()]
+        if not parts:
+            return None
+        context = set()
+        for part in parts[1:]:
+            for index in self._candidates(part):
+                place = self.places[index]
+                context.update({place["name"], place.get("division"), place.get("district")})
+        context.discard(None)
+        for part in parts:
+            matches = self._candidates(part)
+            if matches:
+                preferred = [i for i in matches if self.places[i].get("district") in context
+                             or self.places[i].get("division") in context]
+                self.exact_hits += 1
+                return self.places[(preferred or matches)[0]]
+        for part in parts:
+            key = place_key(self._strip_qualifiers(part))
+            if len(key) < 3:
+                continue
+            score, index = self._fuzzy(key)
+            if index is not None and score >= GAZETTEER_MIN_SIMILARITY:
+                self.fuzzy_hits += 1
+                return self.places[index]
+        self.misses += 1
+        return None
+
+    def find_in_text(self, text: str) -> Optional[dict]:
+        """First known place named in running text (exact matches of 1-3 word spans only)"""
+        words = re.findall(r"[^\s,.;:!?()\"।]+", text or "")
+        for start in range(len(words)):
+            for length in (3, 2, 1):
+                span = words[start:start + length]
+                if len(span) < length:
+                    continue
+                key = place_key(" ".join(span))
+                if len(key) >= 4 and key in self.exact:
+                    return self.places[self.exact[key][0]]
+        return None
+
+    @staticmethod
+    def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        phi1, phi2 = math.radians(lat1), math.radians(lat2)
+        a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+        return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+    def nearest(self, lat: float, lon: float) -> Optional[Tuple[dict, float]]:
+        """Nearest district/upazila to a coordinate as (place, distance in km), or None"""
+        if self.tree is None:
+            return None
+        target = self._project(lat, lon)
+        best = [None, float("inf")]
+
+        def visit(node):
+            if node is None:
+                return
+            index, axis, left, right = node
+            point = self._project(self.places[index]["lat"], self.places[index]["lon"])
+            distance = (point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2
+            if distance < best[1]:
+                best[0], best[1] = index, distance
+            delta = target[axis] - point[axis]
+            near, far = (left, right) if delta < 0 else (right, left)
+            visit(near)
+            if delta * delta < best[1]:
+                visit(far)
+
+        visit(self.tree)
+        place = self.places[best[0]]
+        return place, self.distance_km(lat, lon, place["lat"], place["lon"])
+
+    def reverse(self, lat: float, lon: float) -> Optional[dict]:
+        """Nearest place within GAZETTEER_REVERSE_MAX_KM of the coordinate, or None"""
+        found = self.nearest(lat, lon)
+        if found and found[1] <= GAZETTEER_REVERSE_MAX_KM:
+            self.reverse_hits += 1
+            return found[0]
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "places": len(self.places),
+            "levels": dict(Counter(place.get("level") for place in self.places)),
+            "keys": len(self.keys),
+            "trigrams": len(self.trigrams),
+            "exactHits": self.exact_hits,
+            "fuzzyHits": self.fuzzy_hits,
+            "misses": self.misses,
+            "reverseHits": self.reverse_hits
+        }
+
+gazetteer = Gazetteer(knowledge_corpus)
 
 # =================== WEATHER FORECAST HELPERS ===================
 # Helper functions for forecast functionality
@@ -682,29 +1965,68 @@ def is_forecast_query(query: str) -> bool:
     ql = query.lower()
     return any(k in ql for k in FORECAST_KEYWORDS)
 
+class RateLimiter:
+    """
+    Spaces calls at least `min_interval` seconds apart within this process. Each caller reserves
+    the next free slot and sleeps until it; acquire() returns False instead of queueing for
+    longer than `max_wait` seconds.
+    """
+
+    def __init__(self, min_interval: float, max_wait: float):
+        self.min_interval = min_interval
+        self.max_wait = max_wait
+        self.next_slot = 0.0
+        self.calls = 0
+        self.delayed = 0
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        now = time.monotonic()
+        slot = max(now, self.next_slot)
+        if slot - now > self.max_wait:
+            self.rejected += 1
+            return False
+        self.next_slot = slot + self.min_interval
+        self.calls += 1
+        if slot > now:
+            self.delayed += 1
+            await asyncio.sleep(slot - now)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "minInterval": self.min_interval,
+            "calls": self.calls,
+            "delayed": self.delayed,
+            "rejected": self.rejected
+        }
+
+nominatim_limiter = RateLimiter(NOMINATIM_MIN_INTERVAL, NOMINATIM_MAX_WAIT)
+
 async def geocode_with_nominatim(location_name: str) -> Optional[Tuple[float, float, str]]:
     """Geocode a location using free Nominatim (OpenStreetMap) API.
     Returns (latitude, longitude, formatted_name) or None if not found.
+    Callers pace requests through nominatim_limiter (see geocode_remote).
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # Nominatim requires a User-Agent header
-            headers = {
-                "User-Agent": "ChashibBhai-Agricultural-Assistant/1.0"
-            }
-            encoded_location = location_name.replace(' ', '+')
-            url = f"https://nominatim.openstreetmap.org/search?q={encoded_location}&format=json&limit=1"
+        client = http_clients.get("https://nominatim.openstreetmap.org")
+        # Nominatim requires a User-Agent header
+        headers = {
+            "User-Agent": "ChashibBhai-Agricultural-Assistant/1.0"
+        }
+        encoded_location = location_name.replace(' ', '+')
+        url = f"https://nominatim.openstreetmap.org/search?q={encoded_location}&format=json&limit=1"
             
-            response = await client.get(url, headers=headers)
-            if response.status_code == 200:
-                data = response.json()
-                if data and len(data) > 0:
-                    result = data[0]
-                    lat = float(result.get("lat", 0))
-                    lon = float(result.get("lon", 0))
-                    display_name = result.get("display_name", location_name)
-                    print(f"✅ Nominatim geocoded: {display_name} ({lat:.4f}, {lon:.4f})")
-                    return (lat, lon, display_name)
+        response = await client.get(url, headers=headers)
+        if response.status_code == 200:
+            data = response.json()
+            if data and len(data) > 0:
+                result = data[0]
+                lat = float(result.get("lat", 0))
+                lon = float(result.get("lon", 0))
+                display_name = result.get("display_name", location_name)
+                print(f"✅ Nominatim geocoded: {display_name} ({lat:.4f}, {lon:.4f})")
+                return (lat, lon, display_name)
     except Exception as e:
         print(f"Nominatim geocoding error: {e}")
     return None
@@ -718,22 +2040,22 @@ async def fetch_weather_underground_current(lat: float, lon: float) -> Optional[
         return None
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # Weather Underground current conditions endpoint
-            url = f"{WEATHER_UNDERGROUND_BASE_URL}/pws/observations/current"
-            params = {
-                "apiKey": WEATHER_UNDERGROUND_API_KEY,
-                "geocode": f"{lat:.4f},{lon:.4f}",
-                "format": "json",
-                "units": "m"  # Metric units
-            }
+        client = http_clients.get(WEATHER_UNDERGROUND_BASE_URL)
+        # Weather Underground current conditions endpoint
+        url = f"{WEATHER_UNDERGROUND_BASE_URL}/pws/observations/current"
+        params = {
+            "apiKey": WEATHER_UNDERGROUND_API_KEY,
+            "geocode": f"{lat:.4f},{lon:.4f}",
+            "format": "json",
+            "units": "m"  # Metric units
+        }
             
-            response = await client.get(url, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                if "observations" in data and len(data["observations"]) > 0:
-                    print(f"✅ Weather Underground: Fetched current weather")
-                    return data["observations"][0]
+        response = await client.get(url, params=params)
+        if response.status_code == 200:
+            data = response.json()
+            if "observations" in data and len(data["observations"]) > 0:
+                print(f"✅ Weather Underground: Fetched current weather")
+                return data["observations"][0]
     except Exception as e:
         print(f"Weather Underground current fetch failed: {e}")
     return None
@@ -769,13 +2091,13 @@ async def fetch_current_weather(lat: float, lon: float) -> Optional[dict]:
             "&timezone=auto"
         )
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            r = await client.get(url)
-            if r.status_code == 200:
-                data = r.json()
-                if "current" in data:
-                    print(f"✅ Open-Meteo: Fetched current weather (fallback)")
-                    return {"source": "open_meteo", "data": data.get("current")}
+        client = http_clients.get("https://api.open-meteo.com")
+        r = await client.get(url)
+        if r.status_code == 200:
+            data = r.json()
+            if "current" in data:
+                print(f"✅ Open-Meteo: Fetched current weather (fallback)")
+                return {"source": "open_meteo", "data": data.get("current")}
     except Exception as e:
         print(f"Current weather fetch failed: {e}")
     return None
@@ -789,21 +2111,21 @@ async def fetch_weather_underground_forecast(lat: float, lon: float, days: int =
     
     try:
         days = max(1, min(days, 10))  # WU supports up to 10 days
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            url = f"{WEATHER_UNDERGROUND_BASE_URL}/pws/dailysummary/10day"
-            params = {
-                "apiKey": WEATHER_UNDERGROUND_API_KEY,
-                "geocode": f"{lat:.4f},{lon:.4f}",
-                "format": "json",
-                "units": "m"
-            }
+        client = http_clients.get(WEATHER_UNDERGROUND_BASE_URL)
+        url = f"{WEATHER_UNDERGROUND_BASE_URL}/pws/dailysummary/10day"
+        params = {
+            "apiKey": WEATHER_UNDERGROUND_API_KEY,
+            "geocode": f"{lat:.4f},{lon:.4f}",
+            "format": "json",
+            "units": "m"
+        }
             
-            response = await client.get(url, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                if "summaries" in data:
-                    print(f"✅ Weather Underground: Fetched {days}-day forecast")
-                    return data
+        response = await client.get(url, params=params)
+        if response.status_code == 200:
+            data = response.json()
+            if "summaries" in data:
+                print(f"✅ Weather Underground: Fetched {days}-day forecast")
+                return data
     except Exception as e:
         print(f"Weather Underground forecast fetch failed: {e}")
     return None
@@ -838,13 +2160,13 @@ async def fetch_open_meteo_forecast(lat: float, lon: float, days: int = 5):
             f"&timezone=auto&forecast_days={days}"
         )
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            r = await client.get(url)
-            if r.status_code == 200:
-                data = r.json()
-                if "daily" in data and data["daily"].get("time"):
-                    print(f"✅ Open-Meteo: Fetched {days}-day agricultural forecast")
-                    return data
+        client = http_clients.get("https://api.open-meteo.com")
+        r = await client.get(url)
+        if r.status_code == 200:
+            data = r.json()
+            if "daily" in data and data["daily"].get("time"):
+                print(f"✅ Open-Meteo: Fetched {days}-day agricultural forecast")
+                return data
     except Exception as e:
         print(f"Open-Meteo forecast fetch failed: {e}")
     return None
@@ -1024,7 +2346,7 @@ async def fetch_fao_food_safety_data(country_code: str = "BGD", cache_ttl: int =
         Dictionary with FAO food safety data
     """
     cache_key = f"fao_safety_{country_code}"
-    cached_data = perf_cache.get(cache_key, ttl_seconds=cache_ttl)
+    cached_data = await perf_cache.aget(cache_key)
     if cached_data:
         return cached_data
     
@@ -1051,7 +2373,7 @@ async def fetch_fao_food_safety_data(country_code: str = "BGD", cache_ttl: int =
             }
         }
         
-        perf_cache.set(cache_key, fao_data)
+        perf_cache.set(cache_key, fao_data, ttl_seconds=cache_ttl)
         return fao_data
         
     except Exception as e:
@@ -1116,7 +2438,7 @@ async def fetch_bangladesh_agri_data(topic: str = "general", cache_ttl: int = 86
         Dictionary with Bangladesh agricultural research data
     """
     cache_key = f"bd_agri_{topic}"
-    cached_data = perf_cache.get(cache_key, ttl_seconds=cache_ttl)
+    cached_data = await perf_cache.aget(cache_key)
     if cached_data:
         return cached_data
     
@@ -1185,7 +2507,7 @@ async def fetch_bangladesh_agri_data(topic: str = "general", cache_ttl: int = 86
             }
         }
         
-        perf_cache.set(cache_key, bd_data)
+        perf_cache.set(cache_key, bd_data, ttl_seconds=cache_ttl)
         return bd_data
         
     except Exception as e:
@@ -1260,12 +2582,42 @@ class PerformanceMonitor:
             "checkpoints": self.checkpoints
         }
 
+# Application lifecycle: open shared upstream resources on startup, release them on shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_clients.start()
+    cache_sweeper = asyncio.create_task(perf_cache.run_sweeper())
+    catalogue_warmer = asyncio.create_task(static_catalogue.warm())
+    knowledge_watcher = asyncio.create_task(knowledge_corpus.watch()) if KNOWLEDGE_RELOAD_INTERVAL > 0 else None
+    memory_flusher = asyncio.create_task(memory_writer.run()) if memory_writer is not None else None
+    context_sweeper = asyncio.create_task(user_context_store.run_sweeper())
+    ip_range_refresher = asyncio.create_task(ip_range_resolver.run())
+    l2_writer = asyncio.create_task(l2_cache_store.run_writer()) if l2_cache_store is not None else None
+    yield
+    cache_sweeper.cancel()
+    context_sweeper.cancel()
+    ip_range_refresher.cancel()
+    catalogue_warmer.cancel()
+    if knowledge_watcher is not None:
+        knowledge_watcher.cancel()
+    if memory_flusher is not None:
+        memory_flusher.cancel()
+        await memory_writer.drain()
+    tool_pool.shutdown()
+    translation_service.shutdown()
+    await http_clients.close()
+    if l2_writer is not None:
+        l2_writer.cancel()
+    if l2_cache_store is not None:
+        l2_cache_store.close()  # flushes queued writes first
+
 # Initialize FastAPI with proper UTF-8 encoding support
 app = FastAPI(
     title="Chashi Bhai",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Helper function to ensure UTF-8 encoding
@@ -1388,46 +2740,592 @@ DATASET_RELEVANCE = {
 }
 
 # --- Search Tool Wrapper Functions ---
-async def search_wikipedia(query: str) -> str:
-    """Search Wikipedia for agricultural information"""
+# Results are memoised per tool and normalised query in the "search" cache namespace, and
+# concurrent identical searches share one upstream call
+SEARCH_CACHE_TTL = {"wikipedia": 6 * 3600, "arxiv": 24 * 3600, "duckduckgo": 3600}
+SEARCH_EMPTY_TTL = 600  # Remember empty results briefly so misses are not retried on every chat
+
+async def cached_search(tool_name: str, tool, query: str) -> str:
+    """Run one search tool at most once per normalised query while its result is cached"""
+    if tool is None:
+        return ""
+    normalized = ResponseCache.normalize_query(query) or query.strip().lower()
+    cache_key = f"search_{tool_name}_{hashlib.md5(normalized.encode()).hexdigest()}"
+    cached = await perf_cache.aget(cache_key)
+    if cached is not None:
+        return cached
+    
+    async def run_tool():
+        result = await tool_pool.run(tool_name, tool.run, query)
+        return result if result else ""
+    
     try:
-        if 'wiki' in globals():
-            result = wiki.run(query)
-            return result if result else ""
-        else:
-            return ""
+        result = await single_flight.do(cache_key, run_tool)
+    except asyncio.TimeoutError:
+        print(f"⏱️ {tool_name.title()} search timed out")
+        return ""
     except Exception as e:
-        print(f"⚠️ Wikipedia search error: {e}")
+        print(f"⚠️ {tool_name.title()} search error: {e}")
         return ""
+    perf_cache.set(cache_key, result, ttl_seconds=SEARCH_CACHE_TTL[tool_name] if result else SEARCH_EMPTY_TTL)
+    return result
+
+async def search_wikipedia(query: str) -> str:
+    """Search Wikipedia for agricultural information"""
+    return await cached_search("wikipedia", globals().get("wiki"), query)
 
 async def search_duckduckgo(query: str) -> str:
     """Search DuckDuckGo for agricultural information"""
-    try:
-        if 'duckduckgo_search' in globals():
-            result = duckduckgo_search.run(query)
-            return result if result else ""
-        else:
-            return ""
-    except Exception as e:
-        print(f"⚠️ DuckDuckGo search error: {e}")
-        return ""
+    return await cached_search("duckduckgo", globals().get("duckduckgo_search"), query)
 
 async def search_arxiv(query: str) -> str:
     """Search Arxiv for agricultural research papers"""
+    return await cached_search("arxiv", globals().get("arxiv"), query)
+
+# Offline IP-to-location resolution (remote providers below are the fallback for unknown ranges)
+_COUNTRY_NAMES = {
+    "BD": "Bangladesh", "IN": "India", "MM": "Myanmar", "NP": "Nepal",
+    "BT": "Bhutan", "PK": "Pakistan", "LK": "Sri Lanka", "CN": "China"
+}
+
+class IPRangeTable:
+    """
+    Sorted, non-overlapping IP ranges of one address family in compact arrays: range starts and
+    ends plus an index into a de-duplicated (lat, lon, name) table. Lookup is one bisect.
+    """
+
+    def __init__(self, typecode: str):
+        self.typecode = typecode
+        self.starts = array(typecode) if typecode else []
+        self.ends = array(typecode) if typecode else []
+        self.location_ids = array("I")
+
+    def add(self, start: int, end: int, location_id: int):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.location_ids.append(location_id)
+
+    def sort(self):
+        if all(self.starts[i] <= self.starts[i + 1] for i in range(len(self.starts) - 1)):
+            return
+        order = sorted(range(len(self.starts)), key=self.starts.__getitem__)
+        make = (lambda values: array(self.typecode, values)) if self.typecode else list
+        self.starts = make(self.starts[i] for i in order)
+        self.ends = make(self.ends[i] for i in order)
+        self.location_ids = array("I", (self.location_ids[i] for i in order))
+
+    def find(self, address: int) -> Optional[int]:
+        position = bisect.bisect_right(self.starts, address) - 1
+        if position >= 0 and self.ends[position] >= address:
+            return self.location_ids[position]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+class IPRangeResolver:
+    """
+    Offline IP geolocation: ranges from a local CSV (DB-IP lite or CIDR rows) looked up with
+    bisect, plus an overlay of network prefixes learned from the remote providers (kept in an
+    LRU in memory and written through to the L2 store so other workers and restarts reuse them).
+    """
+
+    def __init__(self, path: str = IP_RANGES_PATH, url: str = IP_RANGES_URL, countries: List[str] = None,
+                 backing: Optional[SQLiteCacheStore] = None):
+        self.path = path
+        self.url = url
+        self.countries = set(countries or [])
+        self.backing = backing
+        self.tables = {4: IPRangeTable("I"), 6: IPRangeTable("")}
+        self.locations: List[Tuple[float, float, str]] = []
+        self.loaded_mtime = None
+        self.learned: "OrderedDict[str, Tuple[float, float, str]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.learned_hits = 0
+        self.misses = 0
+        self.learned_count = 0
+
+    @staticmethod
+    def _prefix(address) -> str:
+        network = ipaddress.ip_network(f"{address}/{24 if address.version == 4 else 48}", strict=False)
+        return str(network)
+
+    def _parse_row(self, row: List[str]):
+        """Return (first address, last address, lat, lon, city, region, country code) or None"""
+        if "/" in row[0] and len(row) >= 6:
+            network = ipaddress.ip_network(row[0].strip(), strict=False)
+            city, region, country, lat, lon = [field.strip() for field in row[1:6]]
+            return network[0], network[-1], float(lat), float(lon), city, region, country
+        if len(row) >= 8:
+            first, last = ipaddress.ip_address(row[0].strip()), ipaddress.ip_address(row[1].strip())
+            country, region, city = row[3].strip(), row[4].strip(), row[5].strip()
+            return first, last, float(row[6]), float(row[7]), city, region, country
+        return None
+
+    def load(self) -> bool:
+        """(Re)load the range file if it changed; returns True when new ranges were installed"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self.loaded_mtime:
+            return False
+        tables = {4: IPRangeTable("I"), 6: IPRangeTable("")}
+        locations: List[Tuple[float, float, str]] = []
+        location_ids: Dict[Tuple[float, float, str], int] = {}
+        skipped = 0
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if not row or row[0].startswith("#"):
+                    continue
+                try:
+                    parsed = self._parse_row(row)
+                except ValueError:
+                    parsed = None
+                if parsed is None:
+                    skipped += 1
+                    continue
+                first, last, lat, lon, city, region, country = parsed
+                if self.countries and country.upper() not in self.countries:
+                    continue
+                country_name = _COUNTRY_NAMES.get(country.upper(), country)
+                name = ", ".join(part for part in (city, region, country_name) if part)
+                key = (round(lat, 4), round(lon, 4), name)
+                location_id = location_ids.get(key)
+                if location_id is None:
+                    location_id = location_ids[key] = len(locations)
+                    locations.append(key)
+                tables[first.version].add(int(first), int(last), location_id)
+        for table in tables.values():
+            table.sort()
+        # Swap in at once; lookups running concurrently keep using the old tables
+        self.tables, self.locations, self.loaded_mtime = tables, locations, mtime
+        print(f"✅ IP ranges loaded: {len(tables[4])} IPv4 + {len(tables[6])} IPv6 ranges, "
+              f"{len(locations)} locations ({skipped} rows skipped)")
+        return True
+
+    async def lookup(self, ip: str) -> Optional[Tuple[float, float, str]]:
+        """Resolve an IP from the range file or the learned prefixes (L2 read in a worker thread); None if unknown"""
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        location_id = self.tables[address.version].find(int(address))
+        if location_id is not None:
+            self.hits += 1
+            return self.locations[location_id]
+        prefix = self._prefix(address)
+        with self.lock:
+            learned = self.learned.get(prefix)
+            if learned is not None:
+                self.learned.move_to_end(prefix)
+        if learned is None and self.backing is not None:
+            stored = await asyncio.to_thread(self.backing.get, f"ipnet_{prefix}")
+            if stored is not None:
+                learned = tuple(stored[0])
+                self._remember(prefix, learned)
+        if learned is not None:
+            self.learned_hits += 1
+            return learned
+        self.misses += 1
+        return None
+
+    def _remember(self, prefix: str, location: Tuple[float, float, str]):
+        with self.lock:
+            self.learned[prefix] = location
+            self.learned.move_to_end(prefix)
+            while len(self.learned) > IP_LEARNED_MAX_PREFIXES:
+                self.learned.popitem(last=False)
+
+    def learn(self, ip: str, location: Tuple[float, float, str]):
+        """Record a location resolved remotely for the IP's /24 (IPv4) or /48 (IPv6)"""
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return
+        if not address.is_global:
+            return
+        prefix = self._prefix(address)
+        self._remember(prefix, tuple(location))
+        self.learned_count += 1
+        if self.backing is not None:
+            self.backing.set(f"ipnet_{prefix}", list(location), time.time() + IP_LEARNED_PREFIX_TTL)
+
+    async def download(self):
+        """Fetch a fresh range file from `url` (gzip or plain CSV) and replace the local file atomically"""
+        client = http_clients.get(self.url)
+        response = await client.get(self.url, timeout=120.0)
+        response.raise_for_status()
+        data = response.content
+        if self.url.endswith(".gz") or data[:2] == b"\x1f\x8b":
+            data = await asyncio.to_thread(gzip.decompress, data)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, self.path)
+        print(f"⬇️ IP ranges downloaded from {self.url} ({len(data)} bytes)")
+
+    async def run(self, interval: float = IP_RANGES_REFRESH_INTERVAL):
+        """Background task: load the range file off the event loop, then refresh it periodically"""
+        while True:
+            try:
+                if self.url and (self.loaded_mtime is None or
+                                 time.time() - self.loaded_mtime / 1e9 >= interval):
+                    await self.download()
+                await asyncio.to_thread(self.load)
+            except Exception as e:
+                print(f"⚠️ IP range refresh error: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "ipv4_ranges": len(self.tables[4]),
+            "ipv6_ranges": len(self.tables[6]),
+            "locations": len(self.locations),
+            "learned_prefixes": len(self.learned),
+            "hits": self.hits,
+            "learned_hits": self.learned_hits,
+            "misses": self.misses,
+            "learned": self.learned_count
+        }
+
+ip_range_resolver = IPRangeResolver(countries=IP_RANGES_COUNTRIES, backing=l2_cache_store)
+
+# Remote IP geolocation providers (each returns a result dict or None)
+async def geo_ip_api(client_ip: str) -> Optional[dict]:
+    """Source 1: ip-api.com (Free, accurate)"""
+    try:
+        client = http_clients.get("http://ip-api.com")
+        response = await client.get(f"http://ip-api.com/json/{client_ip}?fields=status,country,regionName,city,lat,lon,timezone")
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("status") == "success":
+                return {
+                    "source": "ip-api.com",
+                    "lat": data.get("lat"),
+                    "lon": data.get("lon"),
+                    "city": data.get("city", ""),
+                    "region": data.get("regionName", ""),
+                    "country": data.get("country", ""),
+                    "confidence": 0.9
+                }
+    except Exception as e:
+        print(f"⚠️ ip-api.com: {e}")
+    return None
+
+async def geo_ipapi_co(client_ip: str) -> Optional[dict]:
+    """Source 2: ipapi.co (Free, good coverage)"""
+    try:
+        client = http_clients.get("https://ipapi.co")
+        response = await client.get(f"https://ipapi.co/{client_ip}/json/")
+        if response.status_code == 200:
+            data = response.json()
+            if not data.get("error"):
+                return {
+                    "source": "ipapi.co",
+                    "lat": data.get("latitude"),
+                    "lon": data.get("longitude"),
+                    "city": data.get("city", ""),
+                    "region": data.get("region", ""),
+                    "country": data.get("country_name", ""),
+                    "confidence": 0.85
+                }
+    except Exception as e:
+        print(f"⚠️ ipapi.co: {e}")
+    return None
+
+async def geo_ipinfo(client_ip: str) -> Optional[dict]:
+    """Source 3: ipinfo.io (Free tier available)"""
     try:
-        if 'arxiv' in globals():
-            result = arxiv.run(query)
-            return result if result else ""
+        client = http_clients.get("https://ipinfo.io")
+        response = await client.get(f"https://ipinfo.io/{client_ip}/json")
+        if response.status_code == 200:
+            data = response.json()
+            if "loc" in data:
+                loc_parts = data["loc"].split(",")
+                if len(loc_parts) == 2:
+                    city_region = data.get("city", ""), data.get("region", "")
+                    return {
+                        "source": "ipinfo.io",
+                        "lat": float(loc_parts[0]),
+                        "lon": float(loc_parts[1]),
+                        "city": data.get("city", ""),
+                        "region": data.get("region", ""),
+                        "country": data.get("country", ""),
+                        "confidence": 0.8
+                    }
+    except Exception as e:
+        print(f"⚠️ ipinfo.io: {e}")
+    return None
+
+async def geo_ipwhois(client_ip: str) -> Optional[dict]:
+    """Source 4: ipwhois.app (Free, no limits)"""
+    try:
+        client = http_clients.get("https://ipwhois.app")
+        response = await client.get(f"https://ipwhois.app/json/{client_ip}")
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("success"):
+                return {
+                    "source": "ipwhois.app",
+                    "lat": data.get("latitude"),
+                    "lon": data.get("longitude"),
+                    "city": data.get("city", ""),
+                    "region": data.get("region", ""),
+                    "country": data.get("country", ""),
+                    "confidence": 0.75
+                }
+    except Exception as e:
+        print(f"⚠️ ipwhois.app: {e}")
+    return None
+
+async def geo_ipgeolocation(client_ip: str) -> Optional[dict]:
+    """Source 5: ipgeolocation.io (Premium with API key - HIGHEST accuracy)"""
+    try:
+        if IPGEOLOCATION_API_KEY:
+            # Use premium API with API key for best accuracy
+            client = http_clients.get("https://api.ipgeolocation.io")
+            response = await client.get(f"https://api.ipgeolocation.io/ipgeo?apiKey={IPGEOLOCATION_API_KEY}&ip={client_ip}")
+            if response.status_code == 200:
+                data = response.json()
+                return {
+                    "source": "ipgeolocation.io (Premium)",
+                    "lat": float(data.get("latitude", 0)),
+                    "lon": float(data.get("longitude", 0)),
+                    "city": data.get("city", ""),
+                    "region": data.get("state_prov", ""),
+                    "country": data.get("country_name", ""),
+                    "confidence": 0.95  # Highest confidence with API key
+                }
         else:
-            return ""
+            # Fallback to free ip-api.io
+            client = http_clients.get("https://ip-api.io")
+            response = await client.get(f"https://ip-api.io/json/{client_ip}")
+            if response.status_code == 200:
+                data = response.json()
+                return {
+                    "source": "ip-api.io",
+                    "lat": data.get("latitude"),
+                    "lon": data.get("longitude"),
+                    "city": data.get("city", ""),
+                    "region": data.get("region_name", ""),
+                    "country": data.get("country_name", ""),
+                    "confidence": 0.7
+                }
     except Exception as e:
-        print(f"⚠️ Arxiv search error: {e}")
-        return ""
+        print(f"⚠️ ipgeolocation: {e}")
+    return None
+
+async def geo_google_geolocation(client_ip: str) -> Optional[dict]:
+    """Source 6: Google Geolocation API (BEST accuracy with API key)"""
+    try:
+        if GOOGLE_GEOLOCATION_API_KEY:
+            client = http_clients.get("https://www.googleapis.com")
+            response = await client.post(
+                f"https://www.googleapis.com/geolocation/v1/geolocate?key={GOOGLE_GEOLOCATION_API_KEY}",
+                json={"considerIp": "true"}
+            )
+            if response.status_code == 200:
+                data = response.json()
+                location = data.get("location", {})
+                if location:
+                    # Reverse geocode to get city/region/country
+                    lat = location.get("lat")
+                    lon = location.get("lng")
+                    if lat and lon:
+                        # Use reverse geocoding API
+                        geocode_response = await http_clients.get("https://maps.googleapis.com").get(
+                            f"https://maps.googleapis.com/maps/api/geocode/json?latlng={lat},{lon}&key={GOOGLE_GEOLOCATION_API_KEY}"
+                        )
+                        if geocode_response.status_code == 200:
+                            geocode_data = geocode_response.json()
+                            if geocode_data.get("results"):
+                                address_components = geocode_data["results"][0].get("address_components", [])
+                                city = ""
+                                region = ""
+                                country = ""
+                                for component in address_components:
+                                    types = component.get("types", [])
+                                    if "locality" in types:
+                                        city = component.get("long_name", "")
+                                    elif "administrative_area_level_1" in types:
+                                        region = component.get("long_name", "")
+                                    elif "country" in types:
+                                        country = component.get("long_name", "")
+                                    
+                                return {
+                                    "source": "Google Geolocation API (Premium)",
+                                    "lat": lat,
+                                    "lon": lon,
+                                    "city": city,
+                                    "region": region,
+                                    "country": country,
+                                    "confidence": 0.98  # Highest confidence - Google's accuracy
+                                }
+    except Exception as e:
+        print(f"⚠️ Google Geolocation: {e}")
+    return None
+
+
+class GeoProvider:
+    """A remote geolocation source with its prior confidence and observed latency/success statistics"""
+
+    def __init__(self, name: str, fetch, confidence: float, enabled: bool = True):
+        self.name = name
+        self.fetch = fetch
+        self.confidence = confidence
+        self.enabled = enabled
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.latency = 1.0  # EWMA of seconds per completed call
+
+    def record(self, elapsed: float, ok: bool):
+        self.calls += 1
+        if ok:
+            self.successes += 1
+        else:
+            self.failures += 1
+        self.latency = 0.8 * self.latency + 0.2 * elapsed
+
+    def record_cancelled(self, elapsed: float):
+        """A started call cancelled after `elapsed` seconds: neither success nor failure, but its
+        latency was at least `elapsed`, so the estimate only ever moves up"""
+        self.cancelled += 1
+        if elapsed > self.latency:
+            self.latency = 0.8 * self.latency + 0.2 * elapsed
+
+    def score(self) -> float:
+        """Expected usefulness per second: prior confidence x smoothed success rate x share of
+        started calls that finished before the race ended / latency"""
+        success_rate = (self.successes + 1) / (self.calls + 2)
+        finish_rate = (self.calls + 1) / (self.calls + self.cancelled + 1)
+        return self.confidence * success_rate * finish_rate / (self.latency + 0.2)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+            "latency_ms": round(self.latency * 1000, 1),
+            "score": round(self.score(), 3)
+        }
+
+
+class GeolocationRacer:
+    """
+    Races the remote providers instead of waiting for all of them: providers are ordered by their
+    observed score, the first few start immediately and the rest are hedged (started one by one
+    after GEO_HEDGE_DELAY). The race ends on a high-confidence answer or two agreeing answers,
+    and everything still running or waiting is cancelled.
+    """
+
+    def __init__(self, providers: List[GeoProvider], immediate: int = GEO_IMMEDIATE_PROVIDERS,
+                 hedge_delay: float = GEO_HEDGE_DELAY, accept_confidence: float = GEO_ACCEPT_CONFIDENCE,
+                 agreement_degrees: float = GEO_AGREEMENT_DEGREES, timeout: float = GEO_RACE_TIMEOUT):
+        self.providers = providers
+        self.immediate = immediate
+        self.hedge_delay = hedge_delay
+        self.accept_confidence = accept_confidence
+        self.agreement_degrees = agreement_degrees
+        self.timeout = timeout
+        self.races = 0
+        self.early_wins = 0
+
+    def ordered(self) -> List[GeoProvider]:
+        return sorted((p for p in self.providers if p.enabled), key=lambda p: p.score(), reverse=True)
+
+    def _agrees(self, a: dict, b: dict) -> bool:
+        return abs(a["lat"] - b["lat"]) < self.agreement_degrees and abs(a["lon"] - b["lon"]) < self.agreement_degrees
+
+    async def _attempt(self, provider: GeoProvider, client_ip: str, delay: float, started: dict):
+        if delay:
+            await asyncio.sleep(delay)
+        start = time.perf_counter()
+        started[provider.name] = start
+        try:
+            result = await provider.fetch(client_ip)
+        except Exception as e:
+            print(f"⚠️ {provider.name}: {e}")
+            result = None
+        ok = bool(result and result.get("lat") and result.get("lon"))
+        provider.record(time.perf_counter() - start, ok)
+        return result if ok else None
+
+    async def resolve(self, client_ip: str) -> Optional[dict]:
+        """Return the winning provider result (dict with lat/lon/city/region/country/source), or None"""
+        self.races += 1
+        started: Dict[str, float] = {}  # provider name -> perf_counter() when its call began
+        tasks = {}
+        for position, provider in enumerate(self.ordered()):
+            delay = max(0, position - self.immediate + 1) * self.hedge_delay
+            tasks[asyncio.create_task(self._attempt(provider, client_ip, delay, started))] = provider
+        results: List[dict] = []
+        winner = None
+        pending = set(tasks)
+        deadline = time.perf_counter() + self.timeout
+        try:
+            while pending and winner is None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if not result:
+                        continue
+                    agreeing = [r for r in results if self._agrees(r, result)]
+                    results.append(result)
+                    if result.get("confidence", 0) >= self.accept_confidence:
+                        winner = result
+                    elif agreeing:
+                        winner = max(agreeing + [result], key=lambda r: r.get("confidence", 0))
+                        print(f"🎯 {len(agreeing) + 1} sources agree on location - HIGH CONFIDENCE")
+                    if winner is not None:
+                        break
+        finally:
+            now = time.perf_counter()
+            for task in pending:
+                task.cancel()
+                provider = tasks[task]
+                if provider.name in started:
+                    provider.record_cancelled(now - started[provider.name])
+        if winner is not None:
+            if pending:
+                self.early_wins += 1
+            return winner
+        # No early winner: best of whatever answered in time
+        return max(results, key=lambda r: r.get("confidence", 0)) if results else None
+
+    def stats(self) -> dict:
+        return {
+            "races": self.races,
+            "early_wins": self.early_wins,
+            "order": [p.name for p in self.ordered()],
+            "providers": {p.name: p.stats() for p in self.providers}
+        }
+
+geo_racer = GeolocationRacer([
+    GeoProvider("ip-api.com", geo_ip_api, 0.9),
+    GeoProvider("ipapi.co", geo_ipapi_co, 0.85),
+    GeoProvider("ipinfo.io", geo_ipinfo, 0.8),
+    GeoProvider("ipwhois.app", geo_ipwhois, 0.75),
+    GeoProvider("ipgeolocation.io", geo_ipgeolocation, 0.95 if IPGEOLOCATION_API_KEY else 0.7),
+    GeoProvider("google-geolocation", geo_google_geolocation, 0.98, enabled=bool(GOOGLE_GEOLOCATION_API_KEY)),
+])
 
 async def detect_user_location(request: Request) -> Tuple[Optional[float], Optional[float], Optional[str]]:
     """
-    Detect user location from IP using MULTIPLE parallel sources for maximum accuracy.
-    Tries 5 different geolocation APIs simultaneously and uses the most accurate result.
+    Detect user location from IP: local range table first, then a race between the remote
+    geolocation providers that stops at the first confident answer.
     Returns (latitude, longitude, location_name)
     """
     try:
@@ -1439,222 +3337,26 @@ async def detect_user_location(request: Request) -> Tuple[Optional[float], Optio
             print("🏠 Localhost detected - using Dhaka, Bangladesh")
             return 23.8103, 90.4125, "Dhaka, Bangladesh"
         
+        # Offline IP ranges first: resolves known networks without any HTTP call
+        local_location = await ip_range_resolver.lookup(client_ip)
+        if local_location:
+            print(f"🗂️ Local IP range HIT: {local_location[2]}")
+            return local_location
+        
         # Check cache first (locations don't change frequently)
         cache_key = perf_cache.cache_key_location(client_ip)
-        cached_location = perf_cache.get(cache_key, ttl_seconds=3600)  # 1 hour cache
+        cached_location = await perf_cache.aget(cache_key)
         
         if cached_location:
             print(f"🟢 Cache HIT for location: {cached_location[2]}")
             return cached_location
 
-        print(f"📍 Detecting location from IP: {client_ip} using MULTIPLE sources...")
+        print(f"📍 Detecting location from IP: {client_ip} using remote providers...")
         
-        # Try MULTIPLE geolocation services IN PARALLEL for best accuracy
-        async def fetch_ip_api():
-            """Source 1: ip-api.com (Free, accurate)"""
-            try:
-                async with httpx.AsyncClient(timeout=8.0) as client:
-                    response = await client.get(f"http://ip-api.com/json/{client_ip}?fields=status,country,regionName,city,lat,lon,timezone")
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data.get("status") == "success":
-                            return {
-                                "source": "ip-api.com",
-                                "lat": data.get("lat"),
-                                "lon": data.get("lon"),
-                                "city": data.get("city", ""),
-                                "region": data.get("regionName", ""),
-                                "country": data.get("country", ""),
-                                "confidence": 0.9
-                            }
-            except Exception as e:
-                print(f"⚠️ ip-api.com: {e}")
-            return None
-        
-        async def fetch_ipapi_co():
-            """Source 2: ipapi.co (Free, good coverage)"""
-            try:
-                async with httpx.AsyncClient(timeout=8.0) as client:
-                    response = await client.get(f"https://ipapi.co/{client_ip}/json/")
-                    if response.status_code == 200:
-                        data = response.json()
-                        if not data.get("error"):
-                            return {
-                                "source": "ipapi.co",
-                                "lat": data.get("latitude"),
-                                "lon": data.get("longitude"),
-                                "city": data.get("city", ""),
-                                "region": data.get("region", ""),
-                                "country": data.get("country_name", ""),
-                                "confidence": 0.85
-                            }
-            except Exception as e:
-                print(f"⚠️ ipapi.co: {e}")
-            return None
+        # Race the remote providers: first high-confidence (or two agreeing) answer wins
+        best_result = await geo_racer.resolve(client_ip)
         
-        async def fetch_ipinfo():
-            """Source 3: ipinfo.io (Free tier available)"""
-            try:
-                async with httpx.AsyncClient(timeout=8.0) as client:
-                    response = await client.get(f"https://ipinfo.io/{client_ip}/json")
-                    if response.status_code == 200:
-                        data = response.json()
-                        if "loc" in data:
-                            loc_parts = data["loc"].split(",")
-                            if len(loc_parts) == 2:
-                                city_region = data.get("city", ""), data.get("region", "")
-                                return {
-                                    "source": "ipinfo.io",
-                                    "lat": float(loc_parts[0]),
-                                    "lon": float(loc_parts[1]),
-                                    "city": data.get("city", ""),
-                                    "region": data.get("region", ""),
-                                    "country": data.get("country", ""),
-                                    "confidence": 0.8
-                                }
-            except Exception as e:
-                print(f"⚠️ ipinfo.io: {e}")
-            return None
-        
-        async def fetch_ipwhois():
-            """Source 4: ipwhois.app (Free, no limits)"""
-            try:
-                async with httpx.AsyncClient(timeout=8.0) as client:
-                    response = await client.get(f"https://ipwhois.app/json/{client_ip}")
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data.get("success"):
-                            return {
-                                "source": "ipwhois.app",
-                                "lat": data.get("latitude"),
-                                "lon": data.get("longitude"),
-                                "city": data.get("city", ""),
-                                "region": data.get("region", ""),
-                                "country": data.get("country", ""),
-                                "confidence": 0.75
-                            }
-            except Exception as e:
-                print(f"⚠️ ipwhois.app: {e}")
-            return None
-        
-        async def fetch_ipgeolocation():
-            """Source 5: ipgeolocation.io (Premium with API key - HIGHEST accuracy)"""
-            try:
-                if IPGEOLOCATION_API_KEY:
-                    # Use premium API with API key for best accuracy
-                    async with httpx.AsyncClient(timeout=8.0) as client:
-                        response = await client.get(f"https://api.ipgeolocation.io/ipgeo?apiKey={IPGEOLOCATION_API_KEY}&ip={client_ip}")
-                        if response.status_code == 200:
-                            data = response.json()
-                            return {
-                                "source": "ipgeolocation.io (Premium)",
-                                "lat": float(data.get("latitude", 0)),
-                                "lon": float(data.get("longitude", 0)),
-                                "city": data.get("city", ""),
-                                "region": data.get("state_prov", ""),
-                                "country": data.get("country_name", ""),
-                                "confidence": 0.95  # Highest confidence with API key
-                            }
-                else:
-                    # Fallback to free ip-api.io
-                    async with httpx.AsyncClient(timeout=8.0) as client:
-                        response = await client.get(f"https://ip-api.io/json/{client_ip}")
-                        if response.status_code == 200:
-                            data = response.json()
-                            return {
-                                "source": "ip-api.io",
-                                "lat": data.get("latitude"),
-                                "lon": data.get("longitude"),
-                                "city": data.get("city", ""),
-                                "region": data.get("region_name", ""),
-                                "country": data.get("country_name", ""),
-                                "confidence": 0.7
-                            }
-            except Exception as e:
-                print(f"⚠️ ipgeolocation: {e}")
-            return None
-        
-        async def fetch_google_geolocation():
-            """Source 6: Google Geolocation API (BEST accuracy with API key)"""
-            try:
-                if GOOGLE_GEOLOCATION_API_KEY:
-                    async with httpx.AsyncClient(timeout=8.0) as client:
-                        response = await client.post(
-                            f"https://www.googleapis.com/geolocation/v1/geolocate?key={GOOGLE_GEOLOCATION_API_KEY}",
-                            json={"considerIp": "true"}
-                        )
-                        if response.status_code == 200:
-                            data = response.json()
-                            location = data.get("location", {})
-                            if location:
-                                # Reverse geocode to get city/region/country
-                                lat = location.get("lat")
-                                lon = location.get("lng")
-                                if lat and lon:
-                                    # Use reverse geocoding API
-                                    geocode_response = await client.get(
-                                        f"https://maps.googleapis.com/maps/api/geocode/json?latlng={lat},{lon}&key={GOOGLE_GEOLOCATION_API_KEY}"
-                                    )
-                                    if geocode_response.status_code == 200:
-                                        geocode_data = geocode_response.json()
-                                        if geocode_data.get("results"):
-                                            address_components = geocode_data["results"][0].get("address_components", [])
-                                            city = ""
-                                            region = ""
-                                            country = ""
-                                            for component in address_components:
-                                                types = component.get("types", [])
-                                                if "locality" in types:
-                                                    city = component.get("long_name", "")
-                                                elif "administrative_area_level_1" in types:
-                                                    region = component.get("long_name", "")
-                                                elif "country" in types:
-                                                    country = component.get("long_name", "")
-                                            
-                                            return {
-                                                "source": "Google Geolocation API (Premium)",
-                                                "lat": lat,
-                                                "lon": lon,
-                                                "city": city,
-                                                "region": region,
-                                                "country": country,
-                                                "confidence": 0.98  # Highest confidence - Google's accuracy
-                                            }
-            except Exception as e:
-                print(f"⚠️ Google Geolocation: {e}")
-            return None
-        
-        # Fetch from ALL sources IN PARALLEL for maximum accuracy
-        import asyncio
-        results = await asyncio.gather(
-            fetch_ip_api(),
-            fetch_ipapi_co(),
-            fetch_ipinfo(),
-            fetch_ipwhois(),
-            fetch_ipgeolocation(),
-            fetch_google_geolocation(),
-            return_exceptions=True
-        )
-        
-        # Filter out failed requests and exceptions
-        valid_results = [r for r in results if r and isinstance(r, dict) and r.get("lat") and r.get("lon")]
-        
-        if valid_results:
-            print(f"✅ Got {len(valid_results)}/6 location sources")
-            
-            # Use the highest confidence result
-            best_result = max(valid_results, key=lambda x: x.get("confidence", 0))
-            
-            # If multiple results agree, increase confidence
-            if len(valid_results) >= 2:
-                # Check if coordinates are similar (within 0.1 degrees)
-                coords_match = sum(1 for r in valid_results 
-                                 if abs(r["lat"] - best_result["lat"]) < 0.1 
-                                 and abs(r["lon"] - best_result["lon"]) < 0.1)
-                
-                if coords_match >= 2:
-                    print(f"🎯 {coords_match} sources agree on location - HIGH CONFIDENCE")
-            
+        if best_result:
             lat = best_result["lat"]
             lon = best_result["lon"]
             city = best_result["city"]
@@ -1667,7 +3369,8 @@ async def detect_user_location(request: Request) -> Tuple[Optional[float], Optio
             
             # Cache successful location
             result = (lat, lon, location_name)
-            perf_cache.set(cache_key, result)
+            perf_cache.set(cache_key, result, ttl_seconds=3600)  # 1 hour cache
+            ip_range_resolver.learn(client_ip, result)
             return lat, lon, location_name
         else:
             print("⚠️ All location sources failed")
@@ -1679,134 +3382,8 @@ async def detect_user_location(request: Request) -> Tuple[Optional[float], Optio
     print("🔄 Using fallback location: Dhaka, Bangladesh")
     return 23.8103, 90.4125, "Dhaka, Bangladesh (fallback)"
 
-# Comprehensive Agricultural Knowledge Base
-CROP_DATABASE = {
-    "rice": {
-        "varieties": ["Aman", "Aus", "Boro", "Basmati", "Jasmine", "Arborio"],
-        "growth_stages": ["Germination", "Seedling", "Tillering", "Booting", "Flowering", "Grain filling", "Maturity"],
-        "water_requirements": "1500-2000mm per season",
-        "soil_pH": "5.5-7.0",
-        "temperature": "20-35°C optimal",
-        "diseases": ["Blast", "Sheath blight", "Brown spot", "Bacterial leaf blight"],
-        "pests": ["Rice stem borer", "Brown planthopper", "Rice bug", "Armyworm"],
-        "nutrients": {"N": "100-150 kg/ha", "P": "50-75 kg/ha", "K": "50-75 kg/ha"}
-    },
-    "wheat": {
-        "varieties": ["Hard red winter", "Soft white", "Durum", "Hard red spring"],
-        "growth_stages": ["Germination", "Tillering", "Stem elongation", "Boot", "Heading", "Grain fill", "Harvest"],
-        "water_requirements": "450-650mm per season",
-        "soil_pH": "6.0-7.5",
-        "temperature": "15-25°C optimal",
-        "diseases": ["Rust", "Septoria", "Powdery mildew", "Fusarium head blight"],
-        "pests": ["Aphids", "Hessian fly", "Armyworm", "Cereal leaf beetle"],
-        "nutrients": {"N": "120-180 kg/ha", "P": "40-60 kg/ha", "K": "40-80 kg/ha"}
-    },
-    "maize": {
-        "varieties": ["Dent corn", "Flint corn", "Sweet corn", "Popcorn"],
-        "growth_stages": ["Emergence", "V6-V8", "Tasseling", "Silking", "Grain filling", "Maturity"],
-        "water_requirements": "500-800mm per season",
-        "soil_pH": "6.0-7.0",
-        "temperature": "20-30°C optimal",
-        "diseases": ["Northern corn leaf blight", "Gray leaf spot", "Common rust", "Anthracnose"],
-        "pests": ["Corn borer", "Fall armyworm", "Corn rootworm", "Cutworm"],
-        "nutrients": {"N": "150-250 kg/ha", "P": "60-100 kg/ha", "K": "60-120 kg/ha"}
-    },
-    "tomato": {
-        "varieties": ["Determinate", "Indeterminate", "Cherry", "Roma", "Beefsteak"],
-        "growth_stages": ["Germination", "Seedling", "Vegetative", "Flowering", "Fruit set", "Ripening"],
-        "water_requirements": "400-600mm per season",
-        "soil_pH": "6.0-6.8",
-        "temperature": "18-30°C optimal",
-        "diseases": ["Late blight", "Early blight", "Fusarium wilt", "Bacterial spot"],
-        "pests": ["Hornworm", "Whitefly", "Aphids", "Thrips"],
-        "nutrients": {"N": "150-200 kg/ha", "P": "80-120 kg/ha", "K": "200-300 kg/ha"}
-    }
-}
-
-DISEASE_DATABASE = {
-    "blast": {
-        "crops": ["rice"],
-        "pathogen": "Magnaporthe oryzae",
-        "symptoms": "Diamond-shaped lesions with gray centers and brown borders",
-        "conditions": "High humidity, temperature 25-28°C, leaf wetness",
-        "management": ["Resistant varieties", "Fungicide application", "Balanced fertilization", "Field sanitation"],
-        "prevention": "Avoid excessive nitrogen, maintain proper plant spacing"
-    },
-    "late_blight": {
-        "crops": ["tomato", "potato"],
-        "pathogen": "Phytophthora infestans",
-        "symptoms": "Water-soaked lesions, white mold growth under humid conditions",
-        "conditions": "Cool temperatures (15-20°C), high humidity (>90%)",
-        "management": ["Copper-based fungicides", "Systemic fungicides", "Remove infected plants", "Improve ventilation"],
-        "prevention": "Choose resistant varieties, avoid overhead irrigation"
-    },
-    "rust": {
-        "crops": ["wheat", "coffee", "beans"],
-        "pathogen": "Puccinia species",
-        "symptoms": "Orange to reddish-brown pustules on leaves",
-        "conditions": "Moderate temperatures, high humidity, dew formation",
-        "management": ["Fungicide applications", "Resistant varieties", "Crop rotation"],
-        "prevention": "Plant certified disease-free seeds, avoid dense planting"
-    }
-}
-
-PEST_DATABASE = {
-    "fall_armyworm": {
-        "crops": ["maize", "rice", "sorghum", "sugarcane"],
-        "scientific_name": "Spodoptera frugiperda",
-        "damage": "Feeds on leaves creating characteristic 'window pane' damage",
-        "lifecycle": "30-40 days (egg to adult)",
-        "management": ["Bt corn varieties", "Insecticide rotation", "Biological control", "Pheromone traps"],
-        "natural_enemies": ["Parasitic wasps", "Predatory beetles", "Birds"]
-    },
-    "aphids": {
-        "crops": ["wheat", "rice", "vegetables", "fruit trees"],
-        "scientific_name": "Multiple species",
-        "damage": "Sucks plant sap, transmits viruses, produces honeydew",
-        "lifecycle": "7-10 days per generation",
-        "management": ["Systemic insecticides", "Reflective mulches", "Beneficial insects", "Neem oil"],
-        "natural_enemies": ["Ladybugs", "Lacewings", "Parasitic wasps"]
-    },
-    "whitefly": {
-        "crops": ["tomato", "cotton", "vegetables"],
-        "scientific_name": "Bemisia tabaci",
-        "damage": "Sucks sap, transmits viruses, reduces plant vigor",
-        "lifecycle": "18-30 days depending on temperature",
-        "management": ["Yellow sticky traps", "Systemic insecticides", "Reflective mulches", "Biological control"],
-        "natural_enemies": ["Encarsia wasps", "Delphastus beetles", "Chrysoperla lacewings"]
-    }
-}
-
-SOIL_DATABASE = {
-    "pH_management": {
-        "acidic_soils": {
-            "pH_range": "< 6.0",
-            "characteristics": "High aluminum, iron toxicity, nutrient deficiencies",
-            "amendments": ["Agricultural lime", "Dolomitic lime", "Wood ash"],
-            "crops_tolerant": ["Blueberries", "Potatoes", "Tea", "Coffee"]
-        },
-        "alkaline_soils": {
-            "pH_range": "> 7.5",
-            "characteristics": "High calcium, magnesium, iron deficiency",
-            "amendments": ["Sulfur", "Aluminum sulfate", "Organic matter"],
-            "crops_tolerant": ["Asparagus", "Beets", "Spinach", "Cabbage"]
-        }
-    },
-    "nutrient_deficiencies": {
-        "nitrogen": {
-            "symptoms": "Yellowing from older leaves, stunted growth",
-            "sources": ["Urea", "Ammonium sulfate", "Compost", "Legume cover crops"]
-        },
-        "phosphorus": {
-            "symptoms": "Purple leaf discoloration, delayed maturity",
-            "sources": ["Triple superphosphate", "Bone meal", "Rock phosphate"]
-        },
-        "potassium": {
-            "symptoms": "Leaf edge burning, weak stems, poor fruit quality",
-            "sources": ["Muriate of potash", "Sulfate of potash", "Wood ash"]
-        }
-    }
-}
+# Comprehensive Agricultural Knowledge Base: the crop, disease, pest and soil reference
+# databases live in knowledge/{crops,diseases,pests,soil}.json and are read via knowledge_corpus
 
 def get_country_agricultural_context(location_name: str) -> str:
     """Simple location context (minimal for speed)"""
@@ -1832,7 +3409,10 @@ def extract_location_from_query(query: str) -> Optional[str]:
     Extract location from natural language query.
     Examples: "I'm in Dhaka", "weather in Gazipur", "from Sylhet", "here in Chittagong"
     """
-    query_lower = query.lower()
+    # Any place the offline gazetteer knows, in English or Bengali spelling
+    place = gazetteer.find_in_text(query)
+    if place:
+        return place["name"]
     
     # Location patterns
     import re
@@ -1840,7 +3420,6 @@ def extract_location_from_query(query: str) -> Optional[str]:
         r'\b(?:in|at|from|near)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?(?:,?\s*(?:Bangladesh|India|Pakistan))?)\b',
         r"i'?m\s+(?:in|at|from|near)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)",
         r'\bhere\s+in\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)',
-        r'\b(dhaka|gazipur|chittagong|sylhet|rajshahi|khulna|barisal|rangpur|mymensingh|comilla|narayanganj|jessore|bogra|dinajpur|pabna|cox\'s bazar)\b',
     ]
     
     for pattern in patterns:
@@ -1866,66 +3445,83 @@ async def parse_manual_location(location_str: str) -> Tuple[Optional[float], Opt
             if len(parts) == 2:
                 lat = float(parts[0].strip())
                 lon = float(parts[1].strip())
+                # Name GPS fixes after the nearest known place
+                place = gazetteer.reverse(lat, lon)
+                if place:
+                    return lat, lon, gazetteer.display_name(place)
                 return lat, lon, f"Manual coordinates: {lat:.4f}, {lon:.4f}"
         
-        # Known locations database for common areas
-        known_locations = {
-            # Bangladesh locations (comprehensive)
-            "gazipur bangladesh": (23.9999, 90.4203, "Gazipur, Bangladesh"),
-            "gazipur": (23.9999, 90.4203, "Gazipur, Bangladesh"),
-            "dhaka bangladesh": (23.8103, 90.4125, "Dhaka, Bangladesh"),
-            "dhaka": (23.8103, 90.4125, "Dhaka, Bangladesh"),
-            "bangladesh": (23.6850, 90.3563, "Bangladesh"),
-            "chittagong bangladesh": (22.3569, 91.7832, "Chittagong, Bangladesh"),
-            "chittagong": (22.3569, 91.7832, "Chittagong, Bangladesh"),
-            "sylhet bangladesh": (24.8949, 91.8687, "Sylhet, Bangladesh"),
-            "sylhet": (24.8949, 91.8687, "Sylhet, Bangladesh"),
-            "rajshahi": (24.3745, 88.6042, "Rajshahi, Bangladesh"),
-            "khulna": (22.8456, 89.5403, "Khulna, Bangladesh"),
-            "barisal": (22.7010, 90.3535, "Barisal, Bangladesh"),
-            "rangpur": (25.7439, 89.2752, "Rangpur, Bangladesh"),
-            "mymensingh": (24.7471, 90.4203, "Mymensingh, Bangladesh"),
-            "comilla": (23.4607, 91.1809, "Comilla, Bangladesh"),
-            "narayanganj": (23.6238, 90.5000, "Narayanganj, Bangladesh"),
-            "jessore": (23.1697, 89.2072, "Jessore, Bangladesh"),
-            "bogra": (24.8465, 89.3770, "Bogra, Bangladesh"),
-            "dinajpur": (25.6279, 88.6332, "Dinajpur, Bangladesh"),
-            "pabna": (24.0064, 89.2372, "Pabna, Bangladesh"),
-            "cox's bazar": (21.4272, 92.0058, "Cox's Bazar, Bangladesh"),
-            # International
-            "london uk": (51.5074, -0.1278, "London, UK"),
-            "new york usa": (40.7128, -74.0060, "New York, USA"),
-        }
-        
-        location_key = location_str.lower()
-        if location_key in known_locations:
-            lat, lon, name = known_locations[location_key]
-            print(f"Manual location matched: {name} ({lat}, {lon})")
-            return lat, lon, name
-        
-        # Try Nominatim (OpenStreetMap) geocoding - completely free
-        nominatim_result = await geocode_with_nominatim(location_str)
-        if nominatim_result:
-            return nominatim_result
-        
-        # Fallback to geocode.maps.co if Nominatim fails
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            encoded_location = location_str.replace(' ', '%20')
-            response = await client.get(f"https://geocode.maps.co/search?q={encoded_location}")
-            if response.status_code == 200:
-                data = response.json()
-                if data and len(data) > 0:
-                    result = data[0]
-                    lat = float(result.get("lat", 0))
-                    lon = float(result.get("lon", 0))
-                    display_name = result.get("display_name", location_str)
-                    print(f"Geocoded location (fallback): {display_name} ({lat}, {lon})")
-                    return lat, lon, display_name
+        # Offline gazetteer: divisions, districts and upazilas in English and Bengali spellings
+        place = gazetteer.resolve(location_str)
+        if place:
+            name = gazetteer.display_name(place)
+            print(f"Manual location matched: {name} ({place['lat']}, {place['lon']})")
+            return place["lat"], place["lon"], name
+        
+        # Remote geocoding, cached per normalised place name
+        geocoded = await cached_geocode(location_str)
+        if geocoded:
+            return geocoded
                     
     except Exception as e:
         print(f"Manual location parsing error: {e}")
     
-    return None, None, location_str
+    return None, None, location_str
+
+def normalize_geocode_query(location_str: str) -> str:
+    """Cache key form of a place name: lower case, single spaces, ", " between parts"""
+    parts = [" ".join(part.split()) for part in location_str.lower().split(",")]
+    return ", ".join(part for part in parts if part)
+
+async def cached_geocode(location_str: str) -> Optional[Tuple[float, float, str]]:
+    """
+    geocode_remote() behind the "geocode" cache namespace: hits are kept for GEOCODE_CACHE_TTL,
+    misses and errors for GEOCODE_NEGATIVE_TTL (stored as an empty list) unless Nominatim was
+    skipped by the rate limiter, and concurrent lookups of the same place share one request.
+    """
+    cache_key = f"geocode_{stable_digest(normalize_geocode_query(location_str))}"
+    cached = await perf_cache.aget(cache_key)
+    if cached is not None:
+        return tuple(cached) if cached else None
+    result, nominatim_skipped = await single_flight.do(cache_key, lambda: geocode_remote(location_str))
+    if result:
+        perf_cache.set(cache_key, list(result), ttl_seconds=GEOCODE_CACHE_TTL)
+    elif not nominatim_skipped:
+        # A miss is only remembered once Nominatim itself was asked, not after our own rate limit
+        perf_cache.set(cache_key, [], ttl_seconds=GEOCODE_NEGATIVE_TTL)
+    return result
+
+async def geocode_remote(location_str: str) -> Tuple[Optional[Tuple[float, float, str]], bool]:
+    """Geocode via Nominatim, falling back to geocode.maps.co.
+    Returns ((latitude, longitude, formatted_name) or None if neither service finds it,
+    nominatim_skipped), where nominatim_skipped means the rate limiter kept Nominatim out.
+    """
+    # Try Nominatim (OpenStreetMap) geocoding - completely free, at most one request per second
+    nominatim_skipped = not await nominatim_limiter.acquire()
+    if nominatim_skipped:
+        print(f"⏱️ Nominatim rate limit reached, skipping '{location_str}'")
+    else:
+        nominatim_result = await geocode_with_nominatim(location_str)
+        if nominatim_result:
+            return nominatim_result, False
+    
+    # Fallback to geocode.maps.co if Nominatim fails
+    try:
+        client = http_clients.get("https://geocode.maps.co")
+        encoded_location = location_str.replace(' ', '%20')
+        response = await client.get(f"https://geocode.maps.co/search?q={encoded_location}")
+        if response.status_code == 200:
+            data = response.json()
+            if data and len(data) > 0:
+                result = data[0]
+                lat = float(result.get("lat", 0))
+                lon = float(result.get("lon", 0))
+                display_name = result.get("display_name", location_str)
+                print(f"Geocoded location (fallback): {display_name} ({lat}, {lon})")
+                return (lat, lon, display_name), nominatim_skipped
+    except Exception as e:
+        print(f"geocode.maps.co geocoding error: {e}")
+    return None, nominatim_skipped
 
 async def get_nasa_power_data(lat: float, lon: float, days_back: int = 30) -> Dict:
     """
@@ -1959,36 +3555,36 @@ async def get_nasa_power_data(lat: float, lon: float, days_back: int = 30) -> Di
         print(f"NASA POWER: Making request to {url}")
         print(f"NASA POWER: Headers keys: {list(headers.keys())}")
         
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(url, headers=headers)
-            print(f"NASA POWER: Response status: {response.status_code}")
+        client = http_clients.get(NASA_POWER_BASE_URL)
+        response = await client.get(url, headers=headers)
+        print(f"NASA POWER: Response status: {response.status_code}")
             
-            if response.status_code == 200:
-                data = response.json()
-                print(f"NASA POWER: Response keys: {list(data.keys()) if data else 'No data'}")
+        if response.status_code == 200:
+            data = response.json()
+            print(f"NASA POWER: Response keys: {list(data.keys()) if data else 'No data'}")
                 
-                # Verify we have actual data
-                if data and "properties" in data and "parameter" in data["properties"]:
-                    print(f"NASA POWER: SUCCESS - Valid data structure found")
-                    return {
-                        "success": True,
-                        "dataset": "POWER",
-                        "data": data,
-                        "location": f"Lat: {lat:.2f}, Lon: {lon:.2f}",
-                        "date_range": f"{start_str} to {end_str}",
-                        "parameters": ["temperature", "precipitation", "humidity", "solar_radiation"]
-                    }
-                else:
-                    print(f"NASA POWER: FAILURE - Invalid data structure")
-                    if data and "properties" in data:
-                        print(f"NASA POWER: Properties keys: {list(data['properties'].keys())}")
-            elif response.status_code == 401:
-                print(f"NASA POWER API authentication failed: {response.status_code}")
-            elif response.status_code == 403:
-                print(f"NASA POWER API access forbidden: {response.status_code}")
+            # Verify we have actual data
+            if data and "properties" in data and "parameter" in data["properties"]:
+                print(f"NASA POWER: SUCCESS - Valid data structure found")
+                return {
+                    "success": True,
+                    "dataset": "POWER",
+                    "data": data,
+                    "location": f"Lat: {lat:.2f}, Lon: {lon:.2f}",
+                    "date_range": f"{start_str} to {end_str}",
+                    "parameters": ["temperature", "precipitation", "humidity", "solar_radiation"]
+                }
             else:
-                print(f"NASA POWER API error: HTTP {response.status_code}")
-                print(f"NASA POWER: Response text (first 500 chars): {response.text[:500]}")
+                print(f"NASA POWER: FAILURE - Invalid data structure")
+                if data and "properties" in data:
+                    print(f"NASA POWER: Properties keys: {list(data['properties'].keys())}")
+        elif response.status_code == 401:
+            print(f"NASA POWER API authentication failed: {response.status_code}")
+        elif response.status_code == 403:
+            print(f"NASA POWER API access forbidden: {response.status_code}")
+        else:
+            print(f"NASA POWER API error: HTTP {response.status_code}")
+            print(f"NASA POWER: Response text (first 500 chars): {response.text[:500]}")
     except Exception as e:
         print(f"NASA POWER API error: {e}")
         import traceback
@@ -2016,36 +3612,36 @@ async def get_nasa_modis_data(lat: float, lon: float) -> Dict:
                 "Content-Type": "application/json"
             }
             
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                response = await client.get(NASA_EARTHDATA_BASE_URL, params=params, headers=headers)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("feed", {}).get("entry"):
-                        # Generate realistic vegetation indices based on successful API call
-                        modis_data = {
-                            "ndvi": 0.72 + (hash(f"{lat}{lon}") % 100) / 500,  # 0.72-0.92 range
-                            "evi": 0.58 + (hash(f"{lat}{lon}") % 100) / 400,   # 0.58-0.83 range
-                            "lai": 2.8 + (hash(f"{lat}{lon}") % 100) / 100,    # 2.8-3.8 range
-                            "fpar": 0.75 + (hash(f"{lat}{lon}") % 100) / 1000, # 0.75-0.85 range
-                            "gpp": 10.2 + (hash(f"{lat}{lon}") % 100) / 20     # 10.2-15.2 range
-                        }
+            client = http_clients.get(NASA_EARTHDATA_BASE_URL)
+            response = await client.get(NASA_EARTHDATA_BASE_URL, params=params, headers=headers)
+            if response.status_code == 200:
+                data = response.json()
+                if data.get("feed", {}).get("entry"):
+                    # Generate realistic vegetation indices based on successful API call
+                    modis_data = {
+                        "ndvi": 0.72 + (stable_hash(f"{lat}{lon}") % 100) / 500,  # 0.72-0.92 range
+                        "evi": 0.58 + (stable_hash(f"{lat}{lon}") % 100) / 400,   # 0.58-0.83 range
+                        "lai": 2.8 + (stable_hash(f"{lat}{lon}") % 100) / 100,    # 2.8-3.8 range
+                        "fpar": 0.75 + (stable_hash(f"{lat}{lon}") % 100) / 1000, # 0.75-0.85 range
+                        "gpp": 10.2 + (stable_hash(f"{lat}{lon}") % 100) / 20     # 10.2-15.2 range
+                    }
                         
-                        return {
-                            "success": True,
-                            "dataset": "MODIS",
-                            "data": modis_data,
-                            "location": f"Lat: {lat:.2f}, Lon: {lon:.2f}",
-                            "parameters": ["vegetation_health", "crop_vigor", "photosynthetic_activity"],
-                            "api_status": "authenticated"
-                        }
+                    return {
+                        "success": True,
+                        "dataset": "MODIS",
+                        "data": modis_data,
+                        "location": f"Lat: {lat:.2f}, Lon: {lon:.2f}",
+                        "parameters": ["vegetation_health", "crop_vigor", "photosynthetic_activity"],
+                        "api_status": "authenticated"
+                    }
         
         # Fallback to realistic simulated data if API unavailable
         modis_data = {
-            "ndvi": 0.68 + (hash(f"{lat}{lon}") % 100) / 400,  # Variable but realistic NDVI
-            "evi": 0.55 + (hash(f"{lat}{lon}") % 100) / 500,   # Variable EVI
-            "lai": 2.5 + (hash(f"{lat}{lon}") % 100) / 100,    # Variable LAI
-            "fpar": 0.72 + (hash(f"{lat}{lon}") % 100) / 1000, # Variable FPAR
-            "gpp": 9.5 + (hash(f"{lat}{lon}") % 100) / 25      # Variable GPP
+            "ndvi": 0.68 + (stable_hash(f"{lat}{lon}") % 100) / 400,  # Variable but realistic NDVI
+            "evi": 0.55 + (stable_hash(f"{lat}{lon}") % 100) / 500,   # Variable EVI
+            "lai": 2.5 + (stable_hash(f"{lat}{lon}") % 100) / 100,    # Variable LAI
+            "fpar": 0.72 + (stable_hash(f"{lat}{lon}") % 100) / 1000, # Variable FPAR
+            "gpp": 9.5 + (stable_hash(f"{lat}{lon}") % 100) / 25      # Variable GPP
         }
         
         return {
@@ -2077,34 +3673,34 @@ async def get_nasa_landsat_data(lat: float, lon: float) -> Dict:
                 "api_key": NASA_API_KEY
             }
             
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                response = await client.get(f"{NASA_LANDSAT_BASE_URL}/imagery", params=params)
-                if response.status_code == 200:
-                    # Generate realistic crop analysis based on successful API call
-                    landsat_data = {
-                        "crop_health_index": 0.78 + (hash(f"{lat}{lon}") % 100) / 500,  # 0.78-0.98
-                        "water_stress": ["low", "moderate", "low", "minimal"][hash(f"{lat}{lon}") % 4],
-                        "crop_type_confidence": 0.85 + (hash(f"{lat}{lon}") % 100) / 1000, # 0.85-0.95
-                        "field_boundaries": "detected",
-                        "irrigation_status": ["adequate", "optimal", "good"][hash(f"{lat}{lon}") % 3]
-                    }
+            client = http_clients.get(NASA_LANDSAT_BASE_URL)
+            response = await client.get(f"{NASA_LANDSAT_BASE_URL}/imagery", params=params)
+            if response.status_code == 200:
+                # Generate realistic crop analysis based on successful API call
+                landsat_data = {
+                    "crop_health_index": 0.78 + (stable_hash(f"{lat}{lon}") % 100) / 500,  # 0.78-0.98
+                    "water_stress": ["low", "moderate", "low", "minimal"][stable_hash(f"{lat}{lon}") % 4],
+                    "crop_type_confidence": 0.85 + (stable_hash(f"{lat}{lon}") % 100) / 1000, # 0.85-0.95
+                    "field_boundaries": "detected",
+                    "irrigation_status": ["adequate", "optimal", "good"][stable_hash(f"{lat}{lon}") % 3]
+                }
                     
-                    return {
-                        "success": True,
-                        "dataset": "LANDSAT",
-                        "data": landsat_data,
-                        "location": f"Lat: {lat:.2f}, Lon: {lon:.2f}",
-                        "parameters": ["crop_health", "water_stress", "field_analysis"],
-                        "api_status": "authenticated"
-                    }
+                return {
+                    "success": True,
+                    "dataset": "LANDSAT",
+                    "data": landsat_data,
+                    "location": f"Lat: {lat:.2f}, Lon: {lon:.2f}",
+                    "parameters": ["crop_health", "water_stress", "field_analysis"],
+                    "api_status": "authenticated"
+                }
         
         # Fallback to realistic simulated data
         landsat_data = {
-            "crop_health_index": 0.75 + (hash(f"{lat}{lon}") % 100) / 600,  # Variable but realistic
-            "water_stress": ["low", "moderate", "minimal"][hash(f"{lat}{lon}") % 3],
-            "crop_type_confidence": 0.82 + (hash(f"{lat}{lon}") % 100) / 1200,
+            "crop_health_index": 0.75 + (stable_hash(f"{lat}{lon}") % 100) / 600,  # Variable but realistic
+            "water_stress": ["low", "moderate", "minimal"][stable_hash(f"{lat}{lon}") % 3],
+            "crop_type_confidence": 0.82 + (stable_hash(f"{lat}{lon}") % 100) / 1200,
             "field_boundaries": "detected",
-            "irrigation_status": ["adequate", "good"][hash(f"{lat}{lon}") % 2]
+            "irrigation_status": ["adequate", "good"][stable_hash(f"{lat}{lon}") % 2]
         }
         
         return {
@@ -2131,7 +3727,7 @@ async def get_nasa_gldas_data(lat: float, lon: float) -> Dict:
             auth_headers = {"Authorization": f"Bearer {NASA_EARTHDATA_TOKEN}"}
             
             # Generate realistic hydrological data based on location
-            location_factor = hash(f"{lat}{lon}") % 100 / 100.0
+            location_factor = stable_hash(f"{lat}{lon}") % 100 / 100.0
             
             gldas_data = {
                 "soil_moisture": 0.30 + location_factor * 0.25,      # 0.30-0.55 m³/m³
@@ -2182,14 +3778,14 @@ async def get_nasa_grace_data(lat: float, lon: float) -> Dict:
         # Try to access GRACE data through NASA if authenticated
         if NASA_EARTHDATA_TOKEN or NASA_API_KEY:
             # Generate realistic GRACE data based on location and season
-            location_factor = hash(f"{lat}{lon}") % 200 / 100.0 - 1.0  # -1.0 to 1.0
+            location_factor = stable_hash(f"{lat}{lon}") % 200 / 100.0 - 1.0  # -1.0 to 1.0
             seasonal_factor = (datetime.now().month - 6) / 12.0  # Seasonal variation
             
             grace_data = {
                 "groundwater_storage": location_factor * 3.0 + seasonal_factor,    # -4 to +4 cm
                 "total_water_storage": location_factor * 2.5 + seasonal_factor * 0.8,    # Similar but smaller range
                 "water_trend": ["declining", "stable", "increasing"][int(abs(location_factor) * 3) % 3],
-                "seasonal_variation": ["low", "normal", "high"][abs(hash(f"{lat}")) % 3],
+                "seasonal_variation": ["low", "normal", "high"][stable_hash(f"{lat}") % 3],
                 "drought_indicator": ["minimal", "moderate", "severe"][max(0, min(2, int(abs(location_factor * 2))))]
             }
             
@@ -2229,76 +3825,76 @@ async def get_nasa_grace_data(lat: float, lon: float) -> Dict:
 async def get_nasa_power_data_cached(lat: float, lon: float, days_back: int = 30) -> Dict:
     """Cached version of NASA POWER data fetch"""
     cache_key = perf_cache.cache_key_nasa(lat, lon, "POWER", days_back)
-    cached_result = perf_cache.get(cache_key, ttl_seconds=3600)  # 1 hour cache
+    cached_result = await perf_cache.aget(cache_key)
     
     if cached_result:
         print(f"🟢 Cache HIT for POWER data")
         return cached_result
     
     print(f"🔴 Cache MISS for POWER data, fetching...")
-    result = await get_nasa_power_data(lat, lon, days_back)
+    result = await single_flight.do(cache_key, lambda: get_nasa_power_data(lat, lon, days_back))
     if result.get("success"):
-        perf_cache.set(cache_key, result)
+        perf_cache.set(cache_key, result, ttl_seconds=3600)  # 1 hour cache
     return result
 
 async def get_nasa_modis_data_cached(lat: float, lon: float) -> Dict:
     """Cached version of NASA MODIS data fetch"""
     cache_key = perf_cache.cache_key_nasa(lat, lon, "MODIS")
-    cached_result = perf_cache.get(cache_key, ttl_seconds=7200)  # 2 hour cache
+    cached_result = await perf_cache.aget(cache_key)
     
     if cached_result:
         print(f"🟢 Cache HIT for MODIS data")
         return cached_result
     
     print(f"🔴 Cache MISS for MODIS data, fetching...")
-    result = await get_nasa_modis_data(lat, lon)
+    result = await single_flight.do(cache_key, lambda: get_nasa_modis_data(lat, lon))
     if result.get("success"):
-        perf_cache.set(cache_key, result)
+        perf_cache.set(cache_key, result, ttl_seconds=7200)  # 2 hour cache
     return result
 
 async def get_nasa_landsat_data_cached(lat: float, lon: float) -> Dict:
     """Cached version of NASA LANDSAT data fetch"""
     cache_key = perf_cache.cache_key_nasa(lat, lon, "LANDSAT")
-    cached_result = perf_cache.get(cache_key, ttl_seconds=3600)  # 1 hour cache
+    cached_result = await perf_cache.aget(cache_key)
     
     if cached_result:
         print(f"🟢 Cache HIT for LANDSAT data")
         return cached_result
     
     print(f"🔴 Cache MISS for LANDSAT data, fetching...")
-    result = await get_nasa_landsat_data(lat, lon)
+    result = await single_flight.do(cache_key, lambda: get_nasa_landsat_data(lat, lon))
     if result.get("success"):
-        perf_cache.set(cache_key, result)
+        perf_cache.set(cache_key, result, ttl_seconds=3600)  # 1 hour cache
     return result
 
 async def get_nasa_gldas_data_cached(lat: float, lon: float) -> Dict:
     """Cached version of NASA GLDAS data fetch"""
     cache_key = perf_cache.cache_key_nasa(lat, lon, "GLDAS")
-    cached_result = perf_cache.get(cache_key, ttl_seconds=3600)  # 1 hour cache
+    cached_result = await perf_cache.aget(cache_key)
     
     if cached_result:
         print(f"🟢 Cache HIT for GLDAS data")
         return cached_result
     
     print(f"🔴 Cache MISS for GLDAS data, fetching...")
-    result = await get_nasa_gldas_data(lat, lon)
+    result = await single_flight.do(cache_key, lambda: get_nasa_gldas_data(lat, lon))
     if result.get("success"):
-        perf_cache.set(cache_key, result)
+        perf_cache.set(cache_key, result, ttl_seconds=3600)  # 1 hour cache
     return result
 
 async def get_nasa_grace_data_cached(lat: float, lon: float) -> Dict:
     """Cached version of NASA GRACE data fetch"""
     cache_key = perf_cache.cache_key_nasa(lat, lon, "GRACE")
-    cached_result = perf_cache.get(cache_key, ttl_seconds=7200)  # 2 hour cache (changes slowly)
+    cached_result = await perf_cache.aget(cache_key)
     
     if cached_result:
         print(f"🟢 Cache HIT for GRACE data")
         return cached_result
     
     print(f"🔴 Cache MISS for GRACE data, fetching...")
-    result = await get_nasa_grace_data(lat, lon)
+    result = await single_flight.do(cache_key, lambda: get_nasa_grace_data(lat, lon))
     if result.get("success"):
-        perf_cache.set(cache_key, result)
+        perf_cache.set(cache_key, result, ttl_seconds=7200)  # 2 hour cache (changes slowly)
     return result
 
 def analyze_comprehensive_nasa_data(nasa_datasets: List[Dict], question_analysis: Dict) -> str:
@@ -2612,6 +4208,73 @@ def determine_relevant_nasa_datasets(query: str) -> List[str]:
     
     return list(relevant_datasets)
 
+# Keywords that make web sources worth their latency for a question
+_FAO_PLAN_KEYWORDS = ['safety', 'pesticide', 'residue', 'export', 'standard', 'chemical', 'spray']
+_WEB_PLAN_KEYWORDS = ['price', 'market', 'latest', 'news', 'today', 'current', 'subsidy', 'policy', 'new variety']
+
+def plan_data_sources(query: str, question_analysis: Dict, has_location: bool) -> Dict[str, any]:
+    """
+    Build the minimal fetch plan for a chat question from its classification.
+    Sources are added in priority order with their latency budget and cost weight; optional
+    sources are skipped once the plan's total cost would exceed DATA_SOURCE_MAX_COST.
+    """
+    q = query.lower()
+    primary_type = question_analysis.get("primary_type", "GENERAL_AGRICULTURE")
+    
+    # (source, required) in priority order; required sources ignore the cost cap
+    candidates = []
+    
+    if has_location:
+        nasa = determine_relevant_nasa_datasets(query)
+        if not nasa and question_analysis.get("needs_nasa_data"):
+            nasa = ["POWER"]
+        if not nasa and primary_type == "DISEASE_DIAGNOSIS":
+            nasa = ["POWER"]  # Humidity and rainfall drive fungal and pest pressure
+        candidates.extend((f"NASA-{dataset}", i == 0) for i, dataset in enumerate(nasa))
+    
+    # Research-level questions are the ones that justify Arxiv, so it outranks the other optional sources
+    if question_analysis.get("needs_search"):
+        candidates.append(("Arxiv", False))
+    if primary_type != "WEATHER_CLIMATE":
+        candidates.append(("Bangladesh", False))
+    if primary_type in ["DISEASE_DIAGNOSIS", "SOIL_HEALTH"] or any(word in q for word in _FAO_PLAN_KEYWORDS):
+        candidates.append(("FAO", False))
+    
+    candidates.append(("Wikipedia", False))
+    if primary_type == "GENERAL_AGRICULTURE" or any(word in q for word in _WEB_PLAN_KEYWORDS):
+        candidates.append(("DuckDuckGo", False))
+    
+    sources = []
+    skipped = []
+    total_cost = 0
+    for name, required in candidates:
+        budget, cost = DATA_SOURCE_BUDGETS.get(name, (HTTP_DEFAULT_TIMEOUT, 1))
+        if not required and total_cost + cost > DATA_SOURCE_MAX_COST:
+            skipped.append(name)
+            continue
+        total_cost += cost
+        sources.append({"name": name, "budget": budget, "cost": cost})
+    
+    return {
+        "primaryType": primary_type,
+        "sources": sources,
+        "skipped": skipped,
+        "cost": total_cost
+    }
+
+async def run_planned_source(source: Dict, coro) -> Tuple[any, str, int]:
+    """Await one planned source within its latency budget; returns (result, status, elapsed ms)"""
+    start = time.time()
+    try:
+        result = await asyncio.wait_for(coro, timeout=source["budget"])
+        status = "ok" if result else "empty"
+    except asyncio.TimeoutError:
+        result, status = None, "timeout"
+        print(f"⏱️ {source['name']} exceeded its {source['budget']}s budget")
+    except Exception as e:
+        result, status = e, "error"
+    return result, status, int((time.time() - start) * 1000)
+
 def get_specialized_knowledge_context(question_analysis: Dict, query: str) -> str:
     """
     Provide specialized knowledge context based on question classification
@@ -2623,7 +4286,7 @@ def get_specialized_knowledge_context(question_analysis: Dict, query: str) -> st
         # Add relevant disease information
         query_lower = query.lower()
         relevant_diseases = []
-        for disease, info in DISEASE_DATABASE.items():
+        for disease, info in knowledge_corpus.section("diseases", {}).items():
             if any(symptom in query_lower for symptom in [disease, info.get("pathogen", "").lower()]):
                 relevant_diseases.append(f"**{disease.title()}**: {info.get('symptoms', '')}")
         
@@ -2635,7 +4298,7 @@ def get_specialized_knowledge_context(question_analysis: Dict, query: str) -> st
         # Add relevant crop information
         query_lower = query.lower()
         relevant_crops = []
-        for crop, info in CROP_DATABASE.items():
+        for crop, info in knowledge_corpus.section("crops", {}).items():
             if crop in query_lower:
                 relevant_crops.append(f"**{crop.title()}**: Growth stages: {', '.join(info.get('growth_stages', [])[:4])}")
                 relevant_crops.append(f"• Optimal pH: {info.get('soil_pH', 'N/A')}, Temperature: {info.get('temperature', 'N/A')}")
@@ -2803,6 +4466,222 @@ class ResponseQualityEvaluator:
 quality_evaluator = ResponseQualityEvaluator()
 
 # --- Translation ---
+# Pre-compiled regex for maximum speed (compile once, use many times)
+_SENTENCE_SPLIT_REGEX = re.compile(r'(?<=[.!?])\s+')
+_TECH_TERMS = ['BRRI', 'BARI', 'BINA', 'NASA', 'POWER', 'IoT', 'pH', 'NPK', 'AWD', 'SRI', 'FAO', 'DAE', 'BARC']
+_LANG_MAP = {"bn-bd": "bn", "bn-in": "bn", "zh-cn": "zh", "zh-tw": "zh", "pt-br": "pt", "en-us": "en", "hi-in": "hi"}
+
+
+def normalize_lang(lang: Optional[str]) -> Optional[str]:
+    """Map regional language codes (bn-BD, zh-CN, ...) to the translator's base codes"""
+    if not lang:
+        return lang
+    return _LANG_MAP.get(lang.lower(), lang.lower().split('-')[0])
+
+
+class TranslationService:
+    """Long-lived translation engine shared by translate_to_english and translate_back.
+
+    The translator client is synchronous, so calls run on a persistent worker pool. Each
+    worker thread keeps one translator per language pair (instances hold per-request state and
+    are not safe to share between threads). Short texts are batched into newline-joined
+    requests of up to `batch_chars`; if a batch comes back with a different number of lines,
+    its items are retried one by one. Every call has a deadline, and failures return None so
+    callers can fall back to the source text without caching it.
+    """
+
+    def __init__(self, max_workers: int, timeout: float, batch_chars: int):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.batch_chars = batch_chars
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self.counters = {"calls": 0, "items": 0, "batches": 0, "batch_fallbacks": 0, "timeouts": 0, "errors": 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="translate")
+        return self._executor
+
+    def _translate_sync(self, source: str, target: str, text: str) -> str:
+        translators = getattr(self._local, "translators", None)
+        if translators is None:
+            translators = self._local.translators = {}
+        translator = translators.get((source, target))
+        if translator is None:
+            translator = translators[(source, target)] = GoogleTranslator(source=source, target=target)
+        return translator.translate(text)
+
+    async def _call(self, source: str, target: str, text: str) -> Optional[str]:
+        self.counters["calls"] += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_executor(), self._translate_sync, source, target, text)
+        try:
+            result = await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            print(f"⏱️ Translation {source}→{target} missed its {self.timeout}s deadline")
+            return None
+        except Exception as e:
+            self.counters["errors"] += 1
+            print(f"❌ Translation {source}→{target} error: {e}")
+            return None
+        return result if result and result.strip() else None
+
+    async def _translate_long(self, source: str, target: str, text: str) -> Optional[str]:
+        """Split an over-long text on sentence boundaries and translate the pieces in parallel"""
+        chunks = []
+        current = ""
+        for sentence in _SENTENCE_SPLIT_REGEX.split(text):
+            if current and len(current) + len(sentence) + 1 > self.batch_chars:
+                chunks.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            chunks.append(current)
+        results = await asyncio.gather(*(self._call(source, target, chunk) for chunk in chunks))
+        if any(r is None for r in results):
+            return None
+        return " ".join(results)
+
+    async def translate(self, text: str, source: str, target: str) -> Optional[str]:
+        """Translate one text; None on failure"""
+        return (await self.translate_many([text], source, target))[0]
+
+    async def translate_many(self, texts: List[str], source: str, target: str) -> List[Optional[str]]:
+        """Translate many short texts with as few upstream requests as possible; None marks failures"""
+        self.counters["items"] += len(texts)
+        results: List[Optional[str]] = [None] * len(texts)
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_len = 0
+        for i, text in enumerate(texts):
+            if "\n" in text or len(text) > self.batch_chars:
+                batches.append([i])  # Cannot share a newline-joined batch
+                continue
+            if current and current_len + len(text) + 1 > self.batch_chars:
+                batches.append(current)
+                current, current_len = [], 0
+            current.append(i)
+            current_len += len(text) + 1
+        if current:
+            batches.append(current)
+
+        async def run_batch(indices: List[int]):
+            self.counters["batches"] += 1
+            if len(indices) == 1:
+                text = texts[indices[0]]
+                if len(text) > self.batch_chars:
+                    results[indices[0]] = await self._translate_long(source, target, text)
+                else:
+                    results[indices[0]] = await self._call(source, target, text)
+                return
+            translated = await self._call(source, target, "\n".join(texts[i] for i in indices))
+            parts = translated.split("\n") if translated else []
+            if len(parts) == len(indices):
+                for i, part in zip(indices, parts):
+                    results[i] = part.strip() or None
+                return
+            # Line structure was not preserved (or the batch failed); retry items individually
+            self.counters["batch_fallbacks"] += 1
+            singles = await asyncio.gather(*(self._call(source, target, texts[i]) for i in indices))
+            for i, result in zip(indices, singles):
+                results[i] = result
+
+        await asyncio.gather(*(run_batch(batch) for batch in batches))
+        return results
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {"max_workers": self.max_workers, **self.counters}
+
+translation_service = TranslationService(TRANSLATION_MAX_WORKERS, TRANSLATION_TIMEOUT, TRANSLATION_BATCH_CHARS)
+
+
+class TranslationMemory:
+    """Sentence-level translation memory shared across replies.
+
+    Text is split into lines and each line into sentences with _SENTENCE_SPLIT_REGEX. Every
+    sentence is looked up by a stable hash and language pair in the "tm" cache namespace (which
+    persists to the L2 tier), only the misses are translated in one batch, and the reply is
+    reassembled with its original layout. Boilerplate that repeats across answers (season
+    lines, attribution footers, service blocks) is translated once.
+    """
+
+    def __init__(self, cache: PerformanceCache, service: TranslationService, ttl_seconds: int = 7 * 86400):
+        self.cache = cache
+        self.service = service
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def segment_key(segment: str, source: str, target: str) -> str:
+        return f"tm_{source}_{target}_{stable_digest(normalize_translation_text(segment))}"
+
+    async def translate_text(self, text: str, source: str, target: str) -> Tuple[str, bool]:
+        """
+        Translate a multi-line text, keeping blank lines and indentation.
+        Returns (translated text, complete); segments that failed keep their source text.
+        """
+        layout = []
+        for line in text.split("\n"):
+            core = line.strip()
+            if not core:
+                layout.append((line, None))
+                continue
+            indent = line[:len(line) - len(line.lstrip())]
+            layout.append((indent, [segment for segment in _SENTENCE_SPLIT_REGEX.split(core) if segment]))
+        
+        unique: List[str] = list(dict.fromkeys(
+            segment for _, segments in layout for segment in segments or []
+        ))
+        # One batched lookup; segments not in memory are read from L2 in a worker thread
+        cached = await self.cache.aget_many([self.segment_key(segment, source, target) for segment in unique])
+        translated: Dict[str, str] = {}
+        missing: List[str] = []
+        for segment in unique:
+            hit = cached.get(self.segment_key(segment, source, target))
+            if hit is not None:
+                translated[segment] = hit
+                self.hits += 1
+            else:
+                missing.append(segment)
+                self.misses += 1
+        
+        complete = True
+        if missing:
+            results = await self.service.translate_many(missing, source, target)
+            for segment, result in zip(missing, results):
+                if result is None:
+                    complete = False
+                    continue
+                translated[segment] = result
+                self.cache.set(self.segment_key(segment, source, target), result, ttl_seconds=self.ttl_seconds)
+        
+        lines = []
+        for prefix, segments in layout:
+            if segments is None:
+                lines.append(prefix)
+            else:
+                lines.append(prefix + " ".join(translated.get(segment, segment) for segment in segments))
+        return "\n".join(lines), complete
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+translation_memory = TranslationMemory(perf_cache, translation_service)
+
 async def translate_to_english(text):
     """Translate text to English with robust language detection and caching"""
     print(f"🔍 TRANSLATE_TO_ENGLISH CALLED: text='{text[:100]}...'")
@@ -2832,7 +4711,7 @@ async def translate_to_english(text):
         
         # Check cache first
         cache_key = perf_cache.cache_key_translation(text, "auto", "en")
-        cached_result = perf_cache.get(cache_key, ttl_seconds=86400)  # 24 hour cache
+        cached_result = await perf_cache.aget(cache_key)
         
         if cached_result:
             print("🟢 Cache HIT for translation to English")
@@ -2866,7 +4745,7 @@ async def translate_to_english(text):
         if detected_lang == "en":
             print("✅ TRANSLATE_TO_ENGLISH: Input is English, no translation needed")
             result = {"text": text, "detected_lang": "en"}
-            perf_cache.set(cache_key, result)
+            perf_cache.set(cache_key, result, ttl_seconds=86400)  # 24 hour cache
             return text, "en"
         
         # Only preserve critical agricultural terms (reduced set for performance)
@@ -2898,10 +4777,11 @@ async def translate_to_english(text):
                     preserved_terms[placeholder] = en_term
                     text_for_translation = text_for_translation.replace(bn_term, placeholder)
         
-        # Translate to English with minimal overhead
+        # Translate to English on the shared translation service (falls back to the original text)
         try:
-            translator = GoogleTranslator(source=detected_lang if detected_lang != 'unknown' else 'auto', target="en")
-            translated_text = translator.translate(text_for_translation)
+            translated_text = await translation_service.translate(
+                text_for_translation, detected_lang if detected_lang != 'unknown' else 'auto', "en"
+            )
             
             # Restore preserved terms if any
             if translated_text and preserved_terms:
@@ -2911,7 +4791,7 @@ async def translate_to_english(text):
             if translated_text and translated_text.strip():
                 print(f"✅ TRANSLATE_TO_ENGLISH: Success ({len(translated_text)} chars)")
                 result = {"text": translated_text, "detected_lang": detected_lang}
-                perf_cache.set(cache_key, result)
+                perf_cache.set(cache_key, result, ttl_seconds=86400)  # 24 hour cache
                 return translated_text, detected_lang
             else:
                 return text, detected_lang
@@ -2925,110 +4805,44 @@ async def translate_to_english(text):
         print(f"❌ TRANSLATE_TO_ENGLISH ERROR: {str(e)}")
         return text, "unknown"
 
-# Pre-compiled regex for maximum speed (compile once, use many times)
-import re
-_SENTENCE_SPLIT_REGEX = re.compile(r'(?<=[.!?])\s+')
-_TECH_TERMS = ['BRRI', 'BARI', 'BINA', 'NASA', 'POWER', 'IoT', 'pH', 'NPK', 'AWD', 'SRI', 'FAO', 'DAE', 'BARC']
-_LANG_MAP = {"bn-bd": "bn", "bn-in": "bn", "zh-cn": "zh", "zh-tw": "zh", "pt-br": "pt", "en-us": "en", "hi-in": "hi"}
-
-async def translate_back(text, target_lang):
+async def translate_from_english(text, target_lang) -> Tuple[str, bool]:
     """
-    HYPER-OPTIMIZED translation (15x faster).
-    - Pre-compiled regex, thread pool executor, optimized chunking
-    - Zero redundant operations, aggressive caching
+    Translate an English reply to the target language through the translation memory.
+    - Technical terms are protected, then each sentence goes through the translation memory
+    - Only sentences never seen before are translated, batched into as few requests as possible
+    Returns (text, complete); complete is False when any sentence kept its English text.
     """
     # Normalize language FIRST - handle Bengali, Hindi, and other language variants properly
-    lang_mapping = {
-        "bn-bd": "bn",
-        "bn-in": "bn", 
-        "zh-cn": "zh",
-        "zh-tw": "zh",
-        "pt-br": "pt",
-        "en-us": "en",
-        "hi-in": "hi"
-    }
-    normalized_lang = lang_mapping.get(target_lang.lower(), target_lang.lower().split('-')[0]) if target_lang else target_lang
+    normalized_lang = normalize_lang(target_lang)
     
     # Skip translation only if target is English or unknown (after normalization)
     if not text or not text.strip() or normalized_lang in ["en", "unknown"]:
-        return text
+        return text, True
     
     try:
-        # Ultra-fast cache check
-        cache_key = f"tb_{target_lang}_{hash(text)}"
-        cached = perf_cache.get(cache_key, ttl_seconds=3600)
-        if cached:
-            return cached
-        
         # Lightning-fast term preservation (list comprehension + join)
         preserved = {f"__T{i}__": term for i, term in enumerate(_TECH_TERMS) if term in text}
         text_work = text
         for ph, term in preserved.items():
             text_work = text_work.replace(term, ph)
         
-        translator = GoogleTranslator(source="en", target=normalized_lang)
-        
-        # Hyper-optimized chunking for large text
-        if len(text_work) > 4500:
-            # Pre-compiled regex split
-            sentences = _SENTENCE_SPLIT_REGEX.split(text_work)
-            
-            # Ultra-fast chunking with list comprehension
-            chunks = []
-            current = []
-            current_len = 0
-            
-            for sent in sentences:
-                sent_len = len(sent)
-                if current_len + sent_len > 1500 and current:
-                    chunks.append(' '.join(current))
-                    current = [sent]
-                    current_len = sent_len
-                else:
-                    current.append(sent)
-                    current_len += sent_len
-            
-            if current:
-                chunks.append(' '.join(current))
-            
-            # ThreadPoolExecutor for true parallel I/O (faster than asyncio for API calls)
-            from concurrent.futures import ThreadPoolExecutor
-            import asyncio
-            
-            def sync_translate(chunk):
-                try:
-                    return translator.translate(chunk) or chunk
-                except:
-                    return chunk
-            
-            # Execute in parallel with thread pool
-            loop = asyncio.get_event_loop()
-            with ThreadPoolExecutor(max_workers=min(len(chunks), 10)) as executor:
-                results = await asyncio.gather(*[
-                    loop.run_in_executor(executor, sync_translate, c) for c in chunks
-                ], return_exceptions=True)
-            
-            translated = ' '.join([r if not isinstance(r, Exception) else chunks[i] for i, r in enumerate(results)])
-        else:
-            # Direct translation for small text
-            try:
-                translated = translator.translate(text_work) or text_work
-            except:
-                translated = text_work
+        translated, complete = await translation_memory.translate_text(text_work, "en", normalized_lang)
         
         # Fast term restoration (dict iteration)
         for ph, term in preserved.items():
             translated = translated.replace(ph, term)
         
-        # Cache and return
-        if translated and translated.strip():
-            perf_cache.set(cache_key, translated)
-            return translated
-        
-        return text
+        if not translated.strip():
+            return text, False
+        return translated, complete
     except Exception as e:
         print(f"❌ Translation error: {e}")
-        return text
+        return text, False
+
+async def translate_back(text, target_lang):
+    """Translate an English reply back to the user's language; sentences that fail stay in English"""
+    translated, _ = await translate_from_english(text, target_lang)
+    return translated
 
 # Cache the LLM globally for better performance
 _cached_llm = None
@@ -3040,6 +4854,69 @@ def get_llm():
     return _cached_llm
 
 
+class LLMGate:
+    """Caps concurrent LLM calls per worker so a burst of chats queues instead of flooding Groq"""
+
+    def __init__(self, max_concurrency: int, queue_timeout: float):
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.queue_timeouts = 0
+
+    async def ainvoke(self, llm, prompt):
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.calls += 1
+        try:
+            return await llm.ainvoke(prompt)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def astream(self, llm, prompt):
+        """Yield text chunks from llm.astream, holding one slot until the stream ends"""
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.calls += 1
+        try:
+            async for chunk in llm.astream(prompt):
+                text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                if text:
+                    yield text
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "queue_timeouts": self.queue_timeouts
+        }
+
+
+llm_gate = LLMGate(LLM_MAX_CONCURRENCY, LLM_QUEUE_TIMEOUT)
+
+
 def format_response(text):
     """Convert markdown-style text to HTML"""
     if not text:
@@ -3093,40 +4970,365 @@ def format_response(text):
     return text
 
 
-def get_direct_response(query, original_question=None):
-    """Get direct response from LLM without agent complexity"""
-    try:
-        llm = get_llm()
-        response = llm.invoke(query)
-        return response.content if hasattr(response, 'content') else str(response)
-    except Exception as e:
-        # Safe fallback for environments without API key or when provider is unavailable
-        print(f"Direct LLM error (falling back to demo response): {e}")
-        
-        # Extract the user question from the full query if original_question not provided
-        user_question = original_question
-        if not user_question:
-            # Try to extract the question from the query
-            lines = query.split('\n')
-            for line in lines:
-                if 'Question:' in line:
-                    user_question = line.split('Question:')[-1].strip()
-                    break
-            if not user_question:
-                user_question = query[:100] + "..." if len(query) > 100 else query
-        
-        demo = (
-            "**Chashi Bhai (Demo Mode)**\n\n"
-            "• The intelligent LLM backend isn't configured.\n"
-            "• Set the environment variable **GROQ_API_KEY** to enable live answers.\n\n"
-            "**You asked about:**\n"
-            f"• {user_question}\n\n"
-            "**What to do next:**\n"
-            "1. Create a .env file with GROQ_API_KEY=your_key\n"
-            "2. Restart the server\n"
-            "3. Ask again for a live answer"
-        )
-        return demo
+def get_demo_response(query, original_question=None):
+    """Safe fallback answer for environments without API key or when provider is unavailable"""
+    # Extract the user question from the full query if original_question not provided
+    user_question = original_question
+    if not user_question:
+        # Try to extract the question from the query
+        lines = query.split('\n')
+        for line in lines:
+            if 'Question:' in line:
+                user_question = line.split('Question:')[-1].strip()
+                break
+        if not user_question:
+            user_question = query[:100] + "..." if len(query) > 100 else query
+    
+    demo = (
+        "**Chashi Bhai (Demo Mode)**\n\n"
+        "• The intelligent LLM backend isn't configured.\n"
+        "• Set the environment variable **GROQ_API_KEY** to enable live answers.\n\n"
+        "**You asked about:**\n"
+        f"• {user_question}\n\n"
+        "**What to do next:**\n"
+        "1. Create a .env file with GROQ_API_KEY=your_key\n"
+        "2. Restart the server\n"
+        "3. Ask again for a live answer"
+    )
+    return demo
+
+async def get_direct_response(query, original_question=None):
+    """Get direct response from LLM without agent complexity (non-blocking, bounded by llm_gate)"""
+    try:
+        llm = get_llm()
+        response = await llm_gate.ainvoke(llm, query)
+        return response.content if hasattr(response, 'content') else str(response)
+    except asyncio.TimeoutError:
+        # No LLM slot freed up in time; let the caller's retry loop report high demand
+        raise
+    except Exception as e:
+        print(f"Direct LLM error (falling back to demo response): {e}")
+        return get_demo_response(query, original_question)
+
+async def stream_direct_response(query, original_question=None):
+    """Streaming variant of get_direct_response: yields answer text as the LLM produces it"""
+    emitted = False
+    try:
+        llm = get_llm()
+        async for text in llm_gate.astream(llm, query):
+            emitted = True
+            yield text
+    except asyncio.TimeoutError:
+        raise
+    except Exception as e:
+        if emitted:
+            raise
+        print(f"Streaming LLM error (falling back to demo response): {e}")
+        yield get_demo_response(query, original_question)
+
+# =================== STATIC RESPONSE CATALOGUE ===================
+
+class StaticReply(str):
+    """English reply rendered from a catalogue template; remembers the template and its values"""
+
+    def __new__(cls, text: str, template_id: str, params: dict):
+        reply = super().__new__(cls, text)
+        reply.template_id = template_id
+        reply.params = params
+        return reply
+
+
+class StaticResponseCatalogue:
+    """Fixed replies (greeting, test, NASA capability overview, express lane and smart
+    shortcuts) pre-translated at startup into the common user languages.
+
+    Template fields such as {location_name} or {lat:.2f} are swapped for __P0__-style
+    placeholders before translation and filled in afterwards, so one translation serves every
+    location. A template or language that is not ready (or lost a placeholder in translation)
+    falls back to translate_back at request time.
+    """
+
+    def __init__(self, templates: Dict[str, str], languages: List[str]):
+        self.templates = templates
+        self.languages = [normalize_lang(lang) for lang in languages]
+        self.translations: Dict[Tuple[str, str], str] = {}
+        self.fields: Dict[str, List[Tuple[str, str]]] = {}
+        self.protected: Dict[str, str] = {}
+        self.served = 0
+        self.fallbacks = 0
+        for template_id, template in templates.items():
+            fields = []
+            parts = []
+            for literal, field_name, spec, _ in string.Formatter().parse(template):
+                parts.append(literal)
+                if field_name is not None:
+                    parts.append(f"__P{len(fields)}__")
+                    fields.append((field_name, spec or ""))
+            self.fields[template_id] = fields
+            self.protected[template_id] = "".join(parts)
+
+    def reply(self, template_id: str, **params) -> StaticReply:
+        """Render a template in English"""
+        return StaticReply(self.templates[template_id].format(**params), template_id, params)
+
+    def localize(self, reply: StaticReply, target_lang: str, **overrides) -> Optional[str]:
+        """Pre-translated text for the reply with its values filled in, or None if not available"""
+        lang = normalize_lang(target_lang)
+        if lang in ["en", "unknown", None]:
+            return str(reply)
+        translated = self.translations.get((reply.template_id, lang))
+        if translated is None:
+            self.fallbacks += 1
+            return None
+        params = dict(reply.params)
+        params.update({name: value for name, value in overrides.items() if value})
+        for i, (name, spec) in enumerate(self.fields[reply.template_id]):
+            translated = translated.replace(f"__P{i}__", format(params[name], spec))
+        self.served += 1
+        return translated
+
+    async def warm(self):
+        """Translate every template into every catalogue language (runs in the background at startup)"""
+        async def warm_one(template_id: str, lang: str):
+            translated, complete = await translate_from_english(self.protected[template_id], lang)
+            placeholders = [f"__P{i}__" for i in range(len(self.fields[template_id]))]
+            if complete and all(placeholder in translated for placeholder in placeholders):
+                self.translations[(template_id, lang)] = translated
+        
+        for lang in self.languages:
+            await asyncio.gather(*(
+                warm_one(template_id, lang) for template_id in self.templates
+                if (template_id, lang) not in self.translations
+            ))
+        print(f"✅ Static response catalogue: {len(self.translations)}/{len(self.templates) * len(self.languages)} translations ready")
+
+    def stats(self) -> dict:
+        return {
+            "templates": len(self.templates),
+            "languages": self.languages,
+            "translations": len(self.translations),
+            "served": self.served,
+            "fallbacks": self.fallbacks
+        }
+
+
+# Express-lane "what is ..." definitions (each becomes an express_define_<term> template)
+EXPRESS_DEFINITIONS = {
+    'nitrogen': '**Nitrogen (N)** - Essential nutrient for plant growth, promotes leafy green development. Found in fertilizers, organic matter, and soil.',
+    'phosphorus': '**Phosphorus (P)** - Key nutrient for root development and flowering. Critical for energy transfer in plants.',
+    'potassium': '**Potassium (K)** - Improves disease resistance and water regulation. Essential for fruit quality and plant health.',
+    'ph': '**pH** - Soil acidity/alkalinity measure. 6.0-7.0 is ideal for most crops. Affects nutrient availability.',
+    'compost': '**Compost** - Decomposed organic matter that improves soil fertility, structure, and water retention.',
+    'irrigation': '**Irrigation** - Artificial water application to crops. Methods include drip, sprinkler, and furrow systems.',
+    'pesticide': '**Pesticide** - Chemical or biological agent used to control pests. Should be used as part of integrated pest management.',
+    'fertilizer': '**Fertilizer** - Substance providing nutrients to plants. Can be organic (manure, compost) or synthetic (NPK blends).'
+}
+
+STATIC_TEMPLATES = {
+    "chat_greeting": """**Chashi Bhai** - Your Expert Agriculture Assistant
+
+Hello! I'm Chashi Bhai, your expert AI assistant for all things farming and agriculture.
+
+**How can I assist you today?**
+
+• Ask about crop management
+• Get advice on soil health
+• Learn about pest control
+• Explore irrigation techniques
+• Discover organic farming methods
+• Get location-based weather insights using NASA data
+
+Feel free to ask me anything related to farming!""",
+    "chat_test": """**Chashi Bhai** - Test Response
+
+This is a test of the **Chashi Bhai** agricultural assistant system.
+
+**Key Features:**
+• Expert agricultural knowledge with **NASA data integration**
+• Location-based personalized recommendations
+• Real-time climate and weather insights
+
+**Agricultural Focus Areas:**
+1. Crop management and planning
+2. Soil health and fertility  
+3. Weather and climate analysis
+
+This system combines **NASA datasets** with agricultural expertise for maximum accuracy.""",
+    "chat_capability": """**Chashi Bhai** - NASA Dataset Capability Overview
+
+**Integrated Datasets:**
+• **POWER**: Climate & weather (temperature, rainfall, humidity, solar radiation)
+• **MODIS**: Vegetation vigor (NDVI, EVI, leaf area index)
+• **LANDSAT**: Field-scale crop condition & water stress indicators
+• **GLDAS**: Soil moisture, evapotranspiration, hydrologic balance
+• **GRACE**: Groundwater and total water storage trends
+
+**How Selection Works:**
+• I parse your question for domain keywords (e.g., 'soil moisture', 'irrigation', 'crop health').
+• Each keyword maps to one or more datasets (internal relevance table).
+• If no specific keyword but the question is agricultural, I may use all datasets for a comprehensive analysis.
+
+**Examples:**
+• 'Soil moisture status?' → GLDAS (+ POWER for recent rain)
+• 'Should I irrigate?' → GLDAS + POWER (+ GRACE if long-term water context inferred)
+• 'Crop health this week?' → MODIS + LANDSAT (+ POWER for weather stress context)
+• 'Groundwater situation?' → GRACE (+ GLDAS if soil layer context needed)
+
+**Attribution Policy:** A single final line lists only the NASA datasets actually used in the answer.
+**Location Personalization:** Your approximate location (IP-based) refines climate, soil moisture, and groundwater context.
+
+Ask a specific farming question now and I'll automatically select the optimal datasets.""",
+    "express_greeting": """**Hello! I'm Chashi Bhai** 🌱
+
+Your expert agricultural assistant for {location_name}.
+
+**Quick Help:**
+• Ask about **crops**, **soil**, **weather**, or **pests**
+• Get **NASA satellite data** insights
+• Receive **location-specific** farming advice
+
+What can I help you with today?""",
+    "express_planting": """**Planting Timing for {location_name}**
+
+**General Guidelines:**
+• **Spring crops**: After last frost date
+• **Summer crops**: Warm soil (60°F+)  
+• **Fall crops**: 10-12 weeks before first frost
+• **Winter crops**: Late summer/early fall
+
+**Local Factors:**
+• Check your specific hardiness zone
+• Monitor soil temperature
+• Consider microclimates
+
+**Need specific crop timing?** Ask about a particular plant!""",
+    "express_harvest": """**Harvest Timing Basics**
+
+**Key Indicators:**
+• **Visual**: Color, size, texture changes
+• **Physical**: Firmness, weight, ease of separation
+• **Timing**: Days to maturity from seed packet
+• **Weather**: Harvest before damaging conditions
+
+**General Tips:**
+• Morning harvest often best
+• Handle gently to avoid damage
+• Process quickly for best quality
+
+**For specific crops**, ask about harvest signs for that plant!""",
+    "shortcut_weather": """**Weather & Climate Information for {location_name}**
+
+🌤️ **Current Agricultural Weather Context:**
+• Location: {location_name} (Lat: {lat:.2f}, Lon: {lon:.2f})
+• For detailed weather forecasts, check local meteorological services
+• NASA POWER data integration provides historical climate patterns
+
+**General Agricultural Weather Guidelines:**
+• **Temperature**: Monitor daily min/max for crop stress indicators
+• **Rainfall**: Track cumulative precipitation for irrigation planning  
+• **Humidity**: High humidity increases disease pressure
+• **Wind**: Strong winds can damage crops and increase water loss
+
+**Seasonal Considerations:**
+• Plan planting dates based on historical temperature patterns
+• Adjust irrigation based on rainfall forecasts
+• Monitor heat stress during peak summer temperatures
+
+For specific weather-based farming advice, please ask about a particular crop or farming activity.""",
+    "shortcut_soil": """**Soil Health & Management for {location_name}**
+
+🌱 **Soil Health Fundamentals:**
+
+**Key Soil Properties:**
+• **pH Level**: 6.0-7.0 ideal for most crops
+• **Organic Matter**: 3-5% optimal for fertility
+• **Drainage**: Proper drainage prevents waterlogging
+• **Nutrient Balance**: N-P-K plus micronutrients
+
+**Soil Testing & Analysis:**
+• Test soil pH annually
+• Check nutrient levels before planting season
+• Monitor organic matter content
+• Assess soil structure and compaction
+
+**Improvement Strategies:**
+• **Organic Matter**: Add compost, manure, cover crops
+• **pH Adjustment**: Lime for acidic soils, sulfur for alkaline
+• **Nutrient Management**: Balanced fertilization program
+• **Erosion Control**: Contour farming, terracing, cover crops
+
+For location-specific soil recommendations, please ask about your specific crop or soil challenge.""",
+    "shortcut_irrigation": """**Irrigation & Water Management for {location_name}**
+
+💧 **Smart Irrigation Principles:**
+
+**Water Requirements by Growth Stage:**
+• **Seedling**: Light, frequent watering
+• **Vegetative**: Moderate, consistent moisture
+• **Flowering/Fruiting**: Increased water needs
+• **Maturity**: Reduced watering
+
+**Irrigation Methods:**
+• **Drip Irrigation**: Most efficient, 90-95% efficiency
+• **Sprinkler**: Good for field crops, 80-85% efficiency
+• **Furrow**: Traditional method, 60-70% efficiency
+
+**Water Management Tips:**
+• **Timing**: Early morning irrigation reduces evaporation
+• **Monitoring**: Check soil moisture at root depth
+• **Mulching**: Reduces water loss by 25-50%
+• **Scheduling**: Based on crop needs and weather forecast
+
+**Drought Management:**
+• Select drought-resistant varieties
+• Improve soil organic matter for water retention
+• Use conservation tillage practices
+• Install efficient irrigation systems
+
+What specific crop or irrigation challenge can I help you with?""",
+    "shortcut_pest": """**Integrated Pest & Disease Management**
+
+🐛 **IPM Strategy Framework:**
+
+**Prevention (Best Defense):**
+• **Crop Rotation**: Break pest life cycles
+• **Resistant Varieties**: Choose disease-resistant cultivars
+• **Soil Health**: Healthy soil = stronger plants
+• **Sanitation**: Remove crop residues and weeds
+
+**Monitoring & Identification:**
+• **Regular Scouting**: Weekly field inspections
+• **Economic Thresholds**: Treat when damage justifies cost
+• **Proper ID**: Identify specific pests/diseases correctly
+• **Weather Monitoring**: Disease pressure varies with conditions
+
+**Control Methods (In Order of Preference):**
+1. **Cultural**: Timing, spacing, water management
+2. **Biological**: Beneficial insects, natural predators
+3. **Mechanical**: Traps, barriers, hand removal
+4. **Chemical**: As last resort, following label instructions
+
+**Common Agricultural Pests:**
+• **Aphids**: Monitor for viral disease transmission
+• **Caterpillars**: Check leaf damage patterns
+• **Fungal Diseases**: Increase with high humidity
+• **Bacterial Issues**: Often spread by water/insects
+
+For specific pest identification and treatment, please describe the symptoms you're seeing.""",
+}
+for _term, _definition in EXPRESS_DEFINITIONS.items():
+    STATIC_TEMPLATES[f"express_define_{_term}"] = _definition + "\n\n**Location:** {location_name}\n**Need more specific advice?** Ask about your particular situation!"
+
+static_catalogue = StaticResponseCatalogue(STATIC_TEMPLATES, STATIC_CATALOGUE_LANGUAGES)
+
+
+async def translate_reply(text: str, target_lang: str, location_name: Optional[str] = None) -> str:
+    """translate_back that serves catalogue replies from memory when their translation is ready"""
+    if isinstance(text, StaticReply) and text.template_id in static_catalogue.templates:
+        localized = static_catalogue.localize(text, target_lang, location_name=location_name)
+        if localized is not None:
+            return localized
+    return await translate_back(text, target_lang)
 
 def get_express_response(query: str, location_name: str, lat: float, lon: float) -> str:
     """Ultra-fast responses for simple queries that bypass LLM entirely (< 50ms processing)"""
@@ -3135,70 +5337,24 @@ def get_express_response(query: str, location_name: str, lat: float, lon: float)
     # Greeting responses (instant)
     greetings = ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening']
     if any(greet in query_lower for greet in greetings):
-        return f"""**Hello! I'm Chashi Bhai** 🌱
-
-Your expert agricultural assistant for {location_name}.
-
-**Quick Help:**
-• Ask about **crops**, **soil**, **weather**, or **pests**
-• Get **NASA satellite data** insights
-• Receive **location-specific** farming advice
-
-What can I help you with today?"""
+        return static_catalogue.reply("express_greeting", location_name=location_name)
 
     # Simple "what is" questions
     if query_lower.startswith('what is'):
         topic = query_lower.replace('what is', '').strip()
         
-        definitions = {
-            'nitrogen': '**Nitrogen (N)** - Essential nutrient for plant growth, promotes leafy green development. Found in fertilizers, organic matter, and soil.',
-            'phosphorus': '**Phosphorus (P)** - Key nutrient for root development and flowering. Critical for energy transfer in plants.',
-            'potassium': '**Potassium (K)** - Improves disease resistance and water regulation. Essential for fruit quality and plant health.',
-            'ph': '**pH** - Soil acidity/alkalinity measure. 6.0-7.0 is ideal for most crops. Affects nutrient availability.',
-            'compost': '**Compost** - Decomposed organic matter that improves soil fertility, structure, and water retention.',
-            'irrigation': '**Irrigation** - Artificial water application to crops. Methods include drip, sprinkler, and furrow systems.',
-            'pesticide': '**Pesticide** - Chemical or biological agent used to control pests. Should be used as part of integrated pest management.',
-            'fertilizer': '**Fertilizer** - Substance providing nutrients to plants. Can be organic (manure, compost) or synthetic (NPK blends).'
-        }
-        
-        for key, definition in definitions.items():
+        for key in EXPRESS_DEFINITIONS:
             if key in topic:
-                return f"{definition}\n\n**Location:** {location_name}\n**Need more specific advice?** Ask about your particular situation!"
+                return static_catalogue.reply(f"express_define_{key}", location_name=location_name)
 
     # Simple timing questions  
     timing_patterns = ['when to', 'when should', 'what time']
     if any(pattern in query_lower for pattern in timing_patterns):
         if 'plant' in query_lower or 'sow' in query_lower:
-            return f"""**Planting Timing for {location_name}**
-
-**General Guidelines:**
-• **Spring crops**: After last frost date
-• **Summer crops**: Warm soil (60°F+)  
-• **Fall crops**: 10-12 weeks before first frost
-• **Winter crops**: Late summer/early fall
-
-**Local Factors:**
-• Check your specific hardiness zone
-• Monitor soil temperature
-• Consider microclimates
-
-**Need specific crop timing?** Ask about a particular plant!"""
+            return static_catalogue.reply("express_planting", location_name=location_name)
 
         if 'harvest' in query_lower:
-            return f"""**Harvest Timing Basics**
-
-**Key Indicators:**
-• **Visual**: Color, size, texture changes
-• **Physical**: Firmness, weight, ease of separation
-• **Timing**: Days to maturity from seed packet
-• **Weather**: Harvest before damaging conditions
-
-**General Tips:**
-• Morning harvest often best
-• Handle gently to avoid damage
-• Process quickly for best quality
-
-**For specific crops**, ask about harvest signs for that plant!"""
+            return static_catalogue.reply("express_harvest")
 
     return None  # No express response available
 
@@ -3254,6 +5410,128 @@ def get_current_season_context() -> dict:
         "year": year
     }
 
+# =================== FULL-RESPONSE CACHE ===================
+
+# Filler words dropped when normalising questions for the response cache.
+# Question words (when/how/what/which/why) are kept because they change the intent.
+RESPONSE_CACHE_STOPWORDS = frozenset([
+    "a", "an", "the", "is", "are", "am", "was", "were", "be", "i", "me", "my", "we", "our",
+    "you", "your", "please", "kindly", "tell", "can", "could", "would", "should", "do", "does",
+    "did", "of", "about", "and", "or", "it", "its", "this", "that", "some", "any", "there",
+    "here", "now", "today", "bhai", "sir"
+])
+
+class ResponseCache:
+    """Cache of generated English answers shared across users and languages.
+
+    Keys combine a normalised question (case, punctuation, whitespace and stopwords
+    removed), a coarse location cell and the current agricultural season, so repeated
+    FAQ-style questions from the same area reuse one LLM answer. The cached text is the
+    pre-translation English reply, so every target language can reuse it.
+    """
+
+    def __init__(self, cache: PerformanceCache, ttl_seconds: int = 1800, cell_degrees: float = 0.5):
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.cell_degrees = cell_degrees
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Lowercase, strip punctuation and stopwords; word order and repeats are kept"""
+        words = re.sub(r"[^\w\s]", " ", query.lower()).split()
+        return " ".join(w for w in words if w not in RESPONSE_CACHE_STOPWORDS)
+
+    def location_cell(self, lat: Optional[float], lon: Optional[float]) -> str:
+        """Snap coordinates to a coarse grid cell (~50 km at the default 0.5°)"""
+        if lat is None or lon is None:
+            return "global"
+        cell = self.cell_degrees
+        return f"{math.floor(lat / cell) * cell:.1f}_{math.floor(lon / cell) * cell:.1f}"
+
+    def make_key(self, query: str, lat: Optional[float], lon: Optional[float]) -> str:
+        season = get_current_season_context()["season_short"]
+        raw = f"{self.normalize_query(query)}|{self.location_cell(lat, lon)}|{season}"
+        return f"response_{hashlib.md5(raw.encode()).hexdigest()}"
+
+    async def get(self, query: str, lat: Optional[float], lon: Optional[float]) -> Optional[dict]:
+        """Return the cached entry ({"text", "nasa_datasets_used", ...}) or None"""
+        entry = await self.cache.aget(self.make_key(query, lat, lon))
+        if entry:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def set(self, query: str, lat: Optional[float], lon: Optional[float], entry: dict):
+        self.cache.set(self.make_key(query, lat, lon), entry, ttl_seconds=self.ttl_seconds)
+        self.stores += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+response_cache = ResponseCache(perf_cache)
+
+def build_source_attribution(response_text: str, nasa_datasets_used: List[str], fao_used: bool, bangladesh_used: bool) -> str:
+    """Build the "Data Sources" footer from the data actually used and the answer's content"""
+    attribution_parts = []
+    
+    # Check for NASA data usage
+    if nasa_datasets_used:
+        attribution_parts.append(f"NASA Satellite ({', '.join(nasa_datasets_used)})")
+    elif any(keyword in response_text.upper() for keyword in ['NASA', 'POWER', 'MODIS', 'SATELLITE']):
+        attribution_parts.append("NASA Agricultural Data")
+    
+    # Check for FAO data usage
+    if fao_used:
+        attribution_parts.append("FAO Standards")
+    elif 'FAO' in response_text.upper():
+        attribution_parts.append("FAO (Food and Agriculture Organization)")
+    
+    # Check for Bangladesh research institute data
+    if bangladesh_used:
+        # Detect which specific institutes are mentioned
+        bd_institutes = []
+        if 'BRRI' in response_text.upper() or 'RICE RESEARCH' in response_text.upper():
+            bd_institutes.append('BRRI')
+        if 'BARI' in response_text.upper() or 'AGRICULTURAL RESEARCH INSTITUTE' in response_text.upper():
+            bd_institutes.append('BARI')
+        if 'BARC' in response_text.upper():
+            bd_institutes.append('BARC')
+        if 'DAE' in response_text.upper():
+            bd_institutes.append('DAE')
+        
+        if bd_institutes:
+            attribution_parts.append(f"Bangladesh Agricultural Research ({', '.join(bd_institutes)})")
+        else:
+            attribution_parts.append("Bangladesh Agricultural Research Institute")
+    elif any(keyword in response_text.upper() for keyword in ['BRRI', 'BARI', 'BARC', 'BANGLADESH']):
+        # Even if bangladesh data wasn't fetched, credit if mentioned
+        bd_institutes = []
+        if 'BRRI' in response_text.upper():
+            bd_institutes.append('BRRI')
+        if 'BARI' in response_text.upper():
+            bd_institutes.append('BARI')
+        if bd_institutes:
+            attribution_parts.append(f"Bangladesh Agricultural Research ({', '.join(bd_institutes)})")
+    
+    # Add modern agriculture methods indicator if detected
+    if any(method in response_text.upper() for method in ['DRIP IRRIGATION', 'PRECISION', 'IOT', 'SENSOR', 'DRONE', 'AUTOMATION']):
+        attribution_parts.append('Modern Agriculture Methods')
+    
+    if attribution_parts:
+        return f"\n\n**Data Sources:** {', '.join(attribution_parts)}"
+    # Fallback if no external data was fetched
+    return f"\n\n**Data Sources:** Integrated Agricultural Knowledge Base"
+
 def get_optimized_prompt(query: str, question_analysis: dict, location_name: str, hybrid_context: str) -> str:
     """
     Generate intelligent prompts powered by HYBRID AI SYSTEM.
@@ -3344,197 +5622,70 @@ def get_smart_shortcut_response(query: str, location_name: str, lat: float, lon:
     
     # Weather/Climate queries
     if any(word in query_lower for word in ['weather', 'temperature', 'rain', 'rainfall', 'climate']):
-        return f"""**Weather & Climate Information for {location_name}**
-
-🌤️ **Current Agricultural Weather Context:**
-• Location: {location_name} (Lat: {lat:.2f}, Lon: {lon:.2f})
-• For detailed weather forecasts, check local meteorological services
-• NASA POWER data integration provides historical climate patterns
-
-**General Agricultural Weather Guidelines:**
-• **Temperature**: Monitor daily min/max for crop stress indicators
-• **Rainfall**: Track cumulative precipitation for irrigation planning  
-• **Humidity**: High humidity increases disease pressure
-• **Wind**: Strong winds can damage crops and increase water loss
-
-**Seasonal Considerations:**
-• Plan planting dates based on historical temperature patterns
-• Adjust irrigation based on rainfall forecasts
-• Monitor heat stress during peak summer temperatures
-
-For specific weather-based farming advice, please ask about a particular crop or farming activity."""
+        return static_catalogue.reply("shortcut_weather", location_name=location_name, lat=lat, lon=lon)
 
     # Soil queries
     elif any(word in query_lower for word in ['soil', 'fertility', 'nutrients', 'pH']):
-        return f"""**Soil Health & Management for {location_name}**
-
-🌱 **Soil Health Fundamentals:**
-
-**Key Soil Properties:**
-• **pH Level**: 6.0-7.0 ideal for most crops
-• **Organic Matter**: 3-5% optimal for fertility
-• **Drainage**: Proper drainage prevents waterlogging
-• **Nutrient Balance**: N-P-K plus micronutrients
-
-**Soil Testing & Analysis:**
-• Test soil pH annually
-• Check nutrient levels before planting season
-• Monitor organic matter content
-• Assess soil structure and compaction
-
-**Improvement Strategies:**
-• **Organic Matter**: Add compost, manure, cover crops
-• **pH Adjustment**: Lime for acidic soils, sulfur for alkaline
-• **Nutrient Management**: Balanced fertilization program
-• **Erosion Control**: Contour farming, terracing, cover crops
-
-For location-specific soil recommendations, please ask about your specific crop or soil challenge."""
+        return static_catalogue.reply("shortcut_soil", location_name=location_name)
 
     # Irrigation queries  
     elif any(word in query_lower for word in ['irrigation', 'water', 'watering', 'drought']):
-        return f"""**Irrigation & Water Management for {location_name}**
-
-💧 **Smart Irrigation Principles:**
-
-**Water Requirements by Growth Stage:**
-• **Seedling**: Light, frequent watering
-• **Vegetative**: Moderate, consistent moisture
-• **Flowering/Fruiting**: Increased water needs
-• **Maturity**: Reduced watering
-
-**Irrigation Methods:**
-• **Drip Irrigation**: Most efficient, 90-95% efficiency
-• **Sprinkler**: Good for field crops, 80-85% efficiency
-• **Furrow**: Traditional method, 60-70% efficiency
-
-**Water Management Tips:**
-• **Timing**: Early morning irrigation reduces evaporation
-• **Monitoring**: Check soil moisture at root depth
-• **Mulching**: Reduces water loss by 25-50%
-• **Scheduling**: Based on crop needs and weather forecast
-
-**Drought Management:**
-• Select drought-resistant varieties
-• Improve soil organic matter for water retention
-• Use conservation tillage practices
-• Install efficient irrigation systems
-
-What specific crop or irrigation challenge can I help you with?"""
+        return static_catalogue.reply("shortcut_irrigation", location_name=location_name)
 
     # Pest/Disease queries
     elif any(word in query_lower for word in ['pest', 'disease', 'insect', 'bug', 'fungus', 'virus']):
-        return f"""**Integrated Pest & Disease Management**
-
-🐛 **IPM Strategy Framework:**
-
-**Prevention (Best Defense):**
-• **Crop Rotation**: Break pest life cycles
-• **Resistant Varieties**: Choose disease-resistant cultivars
-• **Soil Health**: Healthy soil = stronger plants
-• **Sanitation**: Remove crop residues and weeds
-
-**Monitoring & Identification:**
-• **Regular Scouting**: Weekly field inspections
-• **Economic Thresholds**: Treat when damage justifies cost
-• **Proper ID**: Identify specific pests/diseases correctly
-• **Weather Monitoring**: Disease pressure varies with conditions
-
-**Control Methods (In Order of Preference):**
-1. **Cultural**: Timing, spacing, water management
-2. **Biological**: Beneficial insects, natural predators
-3. **Mechanical**: Traps, barriers, hand removal
-4. **Chemical**: As last resort, following label instructions
-
-**Common Agricultural Pests:**
-• **Aphids**: Monitor for viral disease transmission
-• **Caterpillars**: Check leaf damage patterns
-• **Fungal Diseases**: Increase with high humidity
-• **Bacterial Issues**: Often spread by water/insects
-
-For specific pest identification and treatment, please describe the symptoms you're seeing."""
-
-    return None  # No shortcut available
-
-async def get_comprehensive_search_results(query: str) -> dict:
-    """Execute ALL search tools in parallel for maximum information gathering"""
-    search_results = {
-        "wikipedia": None,
-        "arxiv": None,
-        "duckduckgo": None
-    }
-    
-    # Create parallel tasks for all search tools
-    async def search_wikipedia():
-        try:
-            if len(tools) > 0:
-                result = tools[0].run(query)
-                if result and len(result.strip()) > 10:
-                    return result[:500]  # Increased from 200 to 500
-        except Exception as e:
-            print(f"Wikipedia search error: {e}")
-        return None
-    
-    async def search_arxiv():
-        try:
-            if len(tools) > 1:
-                result = tools[1].run(query)
-                if result and len(result.strip()) > 10:
-                    return result[:500]
-        except Exception as e:
-            print(f"Arxiv search error: {e}")
-        return None
-    
-    async def search_duckduckgo():
-        try:
-            if len(tools) > 2:
-                result = tools[2].run(query)
-                if result and len(result.strip()) > 10:
-                    return result[:500]
-        except Exception as e:
-            print(f"DuckDuckGo search error: {e}")
-        return None
+        return static_catalogue.reply("shortcut_pest")
+
+    return None  # No shortcut available
+
+def trim_search_result(result) -> Optional[str]:
+    """Usable search snippet for the LLM prompt, or None"""
+    if isinstance(result, str) and len(result.strip()) > 10:
+        return result.strip()[:500]
+    return None
+
+async def get_comprehensive_search_results(query: str) -> dict:
+    """Execute ALL search tools in parallel (used when the request has not searched already)"""
+    results = await asyncio.gather(
+        search_wikipedia(query),
+        search_arxiv(query),
+        search_duckduckgo(query),
+        return_exceptions=True
+    )
+    search_results = {
+        "wikipedia": trim_search_result(results[0]),
+        "arxiv": trim_search_result(results[1]),
+        "duckduckgo": trim_search_result(results[2])
+    }
     
-    # Execute all searches in parallel
-    try:
-        results = await asyncio.gather(
-            search_wikipedia(),
-            search_arxiv(),
-            search_duckduckgo(),
-            return_exceptions=True
-        )
-        
-        search_results["wikipedia"] = results[0] if not isinstance(results[0], Exception) else None
-        search_results["arxiv"] = results[1] if not isinstance(results[1], Exception) else None
-        search_results["duckduckgo"] = results[2] if not isinstance(results[2], Exception) else None
-        
-        # Log what was found
-        found = [k for k, v in search_results.items() if v]
-        if found:
-            print(f"🔍 Search results from: {', '.join(found)}")
-        else:
-            print("⚠️ No search results obtained")
-            
-    except Exception as e:
-        print(f"Parallel search error: {e}")
+    # Log what was found
+    found = [k for k, v in search_results.items() if v]
+    if found:
+        print(f"🔍 Search results from: {', '.join(found)}")
+    else:
+        print("⚠️ No search results obtained")
     
     return search_results
 
-async def get_search_enhanced_response(query, location_name: str = "your region"):
-    """Use ALL search tools (Wikipedia + Arxiv + DuckDuckGo) + powerful AI for most comprehensive response"""
+async def build_search_enhanced_prompt(query, location_name: str = "your region", search_data: Optional[dict] = None) -> str:
+    """
+    Build the LLM prompt from search results (Wikipedia + Arxiv + DuckDuckGo) plus location rules.
+    Pass the request's search_data to reuse what /chat already fetched; otherwise all tools run.
+    """
     try:
-        # Execute all searches in parallel
-        search_data = await get_comprehensive_search_results(query)
+        if search_data is None:
+            search_data = await get_comprehensive_search_results(query)
         
         search_context = []
         
         # Build comprehensive search context
-        if search_data["wikipedia"]:
+        if search_data.get("wikipedia"):
             search_context.append(f"**Wikipedia Knowledge:** {search_data['wikipedia']}")
         
-        if search_data["arxiv"]:
+        if search_data.get("arxiv"):
             search_context.append(f"**Scientific Research (Arxiv):** {search_data['arxiv']}")
         
-        if search_data["duckduckgo"]:
+        if search_data.get("duckduckgo"):
             search_context.append(f"**Current Information (Web):** {search_data['duckduckgo']}")
         
         # Combine all search results with powerful AI
@@ -3583,19 +5734,32 @@ YOUR LOCATION-SPECIFIC ANSWER (MUST start with "For {location_name}:", 120-180 w
             enhanced_query = query
             print("⚠️ No search results, using direct AI response")
             
-        return get_direct_response(enhanced_query)
+        return enhanced_query
     except Exception as e:
         print(f"Search enhancement error: {e}")
-        return get_direct_response(query)
+        return query
 
+async def get_search_enhanced_response(query, location_name: str = "your region", search_data: Optional[dict] = None):
+    """Use ALL search tools (Wikipedia + Arxiv + DuckDuckGo) + powerful AI for most comprehensive response"""
+    enhanced_query = await build_search_enhanced_prompt(query, location_name, search_data)
+    return await get_direct_response(enhanced_query)
 
 
-@app.post("/chat")
-async def chat(req: ChatRequest, request: Request):
-    # Initialize performance monitoring
-    perf_monitor = PerformanceMonitor()
-    perf_monitor.start()
-    
+
+async def prepare_chat(req: ChatRequest, request: Request, perf_monitor: PerformanceMonitor) -> dict:
+    """
+    Shared first stage of /chat and /chat/stream: resolve_chat_request() then
+    gather_chat_data(). Returns a request context dict; when "canned_text" is set the
+    question has a fixed answer and no LLM call is needed.
+    """
+    ctx = await resolve_chat_request(req, request, perf_monitor)
+    return await gather_chat_data(ctx, perf_monitor)
+
+async def resolve_chat_request(req: ChatRequest, request: Request, perf_monitor: PerformanceMonitor) -> dict:
+    """
+    Translation, user memory, hybrid retrieval and location detection: everything a chat
+    needs before the data-source fetch. Returns the request context dict.
+    """
     print(f"\n{'='*80}")
     print(f"🚀 CHAT ENDPOINT CALLED")
     print(f"📝 User message: '{req.message}'")
@@ -3603,10 +5767,28 @@ async def chat(req: ChatRequest, request: Request):
     
     user_message = req.message
     
-    # Async translation with caching
+    # Generate user ID from IP and session
+    user_ip = request.client.host if request.client else "unknown"
+    user_id = hashlib.md5(f"{user_ip}".encode()).hexdigest()[:16]
+    
+    # Device GPS coordinates (format: "23.8103,90.4125")
+    device_gps = bool(req.location) and ',' in req.location and all(c.isdigit() or c in '.,- ' for c in req.location)
+    
+    async def translate_query():
+        translated = await translate_to_english(user_message)
+        perf_monitor.checkpoint("translation_complete")
+        return translated
+    
+    # Independent I/O starts at once and runs concurrently: translation (with caching), user
+    # memory, IP geolocation and device GPS parsing. Only location extraction from the query
+    # waits for the translated text.
     perf_monitor.checkpoint("start_translation")
-    translated_query, original_lang = await translate_to_english(user_message)
-    perf_monitor.checkpoint("translation_complete")
+    front_io = [translate_query(), rag_system.load_user_memory(user_id), detect_user_location(request)]
+    if device_gps:
+        front_io.append(parse_manual_location(req.location))
+    front_results = await asyncio.gather(*front_io)
+    (translated_query, original_lang), user_memory, (ip_lat, ip_lon, ip_location_name) = front_results[:3]
+    perf_monitor.checkpoint("front_io_complete")
     
     print(f"\n{'='*80}")
     print(f"🌍 LANGUAGE DETECTION RESULT")
@@ -3618,16 +5800,12 @@ async def chat(req: ChatRequest, request: Request):
     print(f"🌍 Original language detected: '{original_lang}'")
     print(f"🔤 Translated query: '{translated_query}'")
     
-    # Generate user ID from IP and session
-    user_ip = request.client.host if request.client else "unknown"
-    user_id = hashlib.md5(f"{user_ip}".encode()).hexdigest()[:16]
-    
     # HYBRID SYSTEM: RAG + Few-Shot Learning (simulated fine-tuning)
     perf_monitor.checkpoint("start_hybrid_retrieval")
     
-    # RAG: Retrieve relevant knowledge
-    retrieved_knowledge = rag_system.retrieve_relevant_knowledge(translated_query, user_id, top_k=2)
-    personalized_context = rag_system.get_personalized_context(user_id)
+    # RAG: Retrieve relevant knowledge (the user memory loaded above is shared by every lookup)
+    retrieved_knowledge = rag_system.retrieve_relevant_knowledge(translated_query, user_id, top_k=2, memory=user_memory)
+    personalized_context = rag_system.get_personalized_context(user_id, memory=user_memory)
     
     # Few-Shot: Get training examples (simulated fine-tuning)
     fewshot_examples = fewshot_system.get_relevant_examples(translated_query, top_k=1)
@@ -3645,13 +5823,10 @@ async def chat(req: ChatRequest, request: Request):
     perf_monitor.checkpoint("start_location_detection")
     extracted_location = extract_location_from_query(translated_query)
     
-    # Get IP-based location for cross-validation and accuracy
-    ip_lat, ip_lon, ip_location_name = await detect_user_location(request)
-    
+    # IP-based location (resolved above) is used for cross-validation and accuracy
     # Priority: 1) Device GPS (cross-validated with IP), 2) Extracted from query, 3) Manual location, 4) IP location
-    if req.location and ',' in req.location and all(c.isdigit() or c in '.,- ' for c in req.location):
-        # Device GPS coordinates (format: "23.8103,90.4125")
-        lat, lon, location_name = await parse_manual_location(req.location)
+    if device_gps:
+        lat, lon, location_name = front_results[3]
         
         # Cross-validate device GPS with IP location for accuracy
         if ip_lat and ip_lon:
@@ -3685,8 +5860,7 @@ async def chat(req: ChatRequest, request: Request):
                 print(f"🌐 Using IP location: {location_name}")
     else:
         # Check if user has stored location in context
-        user_context = rag_system.get_user_context(user_id)
-        stored_location = user_context.get("location")
+        stored_location = user_memory.location
         if stored_location:
             lat, lon, location_name = await parse_manual_location(stored_location)
             print(f"📍 Using stored location from context: {location_name}")
@@ -3707,6 +5881,44 @@ async def chat(req: ChatRequest, request: Request):
             location_name = location_name_english  # Use English version for LLM
     
     perf_monitor.checkpoint("location_detection_complete")
+    
+    ctx = {
+        "user_message": user_message,
+        "translated_query": translated_query,
+        "original_lang": original_lang,
+        "user_id": user_id,
+        "user_memory": user_memory,
+        "retrieved_knowledge": retrieved_knowledge,
+        "personalized_context": personalized_context,
+        "fewshot_examples": fewshot_examples,
+        "lat": lat,
+        "lon": lon,
+        "location_name": location_name,
+        "location_name_original": location_name_original,
+        "canned_text": None,
+        "canned_datasets": [],
+        "data_plan": None,
+        "search_results": {},
+        "cached_entry": None,
+        "nasa_datasets_used": [],
+        "fao_data_text": "",
+        "bangladesh_data_text": "",
+        "prompt": None
+    }
+    return ctx
+
+async def gather_chat_data(ctx: dict, perf_monitor: PerformanceMonitor) -> dict:
+    """
+    Second stage: fixed answers (capability, forecast, greeting), the response cache, the
+    planned data-source fetch and prompt building. Updates and returns `ctx`.
+    """
+    user_message = ctx["user_message"]
+    translated_query = ctx["translated_query"]
+    lat, lon = ctx["lat"], ctx["lon"]
+    location_name = ctx["location_name"]
+    retrieved_knowledge = ctx["retrieved_knowledge"]
+    personalized_context = ctx["personalized_context"]
+    fewshot_examples = ctx["fewshot_examples"]
 
     # Helper: detect meta question about NASA datasets/capabilities
     def is_nasa_capability_question(q: str) -> bool:
@@ -3718,47 +5930,16 @@ async def chat(req: ChatRequest, request: Request):
         return any(t in ql for t in triggers)
 
     if is_nasa_capability_question(translated_query):
-        # Build a structured explanation using current relevance logic
-        lines = ["**Chashi Bhai** - NASA Dataset Capability Overview", ""]
-        lines.append("**Integrated Datasets:**")
-        lines.append("• **POWER**: Climate & weather (temperature, rainfall, humidity, solar radiation)")
-        lines.append("• **MODIS**: Vegetation vigor (NDVI, EVI, leaf area index)")
-        lines.append("• **LANDSAT**: Field-scale crop condition & water stress indicators")
-        lines.append("• **GLDAS**: Soil moisture, evapotranspiration, hydrologic balance")
-        lines.append("• **GRACE**: Groundwater and total water storage trends")
-        lines.append("")
-        lines.append("**How Selection Works:**")
-        lines.append("• I parse your question for domain keywords (e.g., 'soil moisture', 'irrigation', 'crop health').")
-        lines.append("• Each keyword maps to one or more datasets (internal relevance table).")
-        lines.append("• If no specific keyword but the question is agricultural, I may use all datasets for a comprehensive analysis.")
-        lines.append("")
-        lines.append("**Examples:**")
-        lines.append("• 'Soil moisture status?' → GLDAS (+ POWER for recent rain)")
-        lines.append("• 'Should I irrigate?' → GLDAS + POWER (+ GRACE if long-term water context inferred)")
-        lines.append("• 'Crop health this week?' → MODIS + LANDSAT (+ POWER for weather stress context)")
-        lines.append("• 'Groundwater situation?' → GRACE (+ GLDAS if soil layer context needed)")
-        lines.append("")
-        lines.append("**Attribution Policy:** A single final line lists only the NASA datasets actually used in the answer.")
-        lines.append("**Location Personalization:** Your approximate location (IP-based) refines climate, soil moisture, and groundwater context.")
-        lines.append("")
-        lines.append("Ask a specific farming question now and I'll automatically select the optimal datasets.")
-        response_text = "\n".join(lines)
-        translate_lang = await translate_back(response_text, original_lang)
-        formatted_response = format_response(translate_lang)
-        # No datasets were actually queried here, so no attribution line
-        return {
-            "reply": formatted_response,
-            "detectedLang": original_lang,
-            "translatedQuery": translated_query,
-            "userLocation": location_name if location_name else "Location not detected",
-            "nasaDataUsed": []
-        }
+        # Structured explanation of the current relevance logic, served from the catalogue
+        ctx["canned_text"] = static_catalogue.reply("chat_capability")
+        return ctx
 
     # NEW: Early forecast fallback when no GROQ key
     no_llm = not os.getenv("GROQ_API_KEY")
     if no_llm and lat is not None and lon is not None and is_forecast_query(translated_query):
         # Attempt Open-Meteo + optional recent POWER snapshot (reuse existing POWER fetch with shorter window)
-        open_meteo = await fetch_open_meteo_forecast(lat, lon, 5)
+        forecast_key = f"forecast_{lat:.3f}_{lon:.3f}_5"
+        open_meteo = await single_flight.do(forecast_key, lambda: fetch_open_meteo_forecast(lat, lon, 5))
         power_recent = await get_nasa_power_data(lat, lon, days_back=7) if 'get_nasa_power_data' in globals() else None
         parts = ["**Chashi Bhai** - Weather & Farming Outlook"]
         if open_meteo:
@@ -3784,145 +5965,81 @@ async def chat(req: ChatRequest, request: Request):
         # Add dataset attribution BEFORE translation
         if used_datasets:
             response_text += f"\n\n**NASA dataset(s) used:** {', '.join(used_datasets)}"
-        # Translate back to original language FIRST
-        translate_lang = await translate_back(response_text, original_lang)
-        # Then format with HTML
-        formatted_response = format_response(translate_lang)
-        return {
-            "reply": formatted_response,
-            "detectedLang": original_lang,
-            "translatedQuery": translated_query,
-            "userLocation": location_name if location_name else "Location not detected",
-            "nasaDataUsed": used_datasets
-        }
+        ctx["canned_text"] = response_text
+        ctx["canned_datasets"] = used_datasets
+        return ctx
 
     # Quick response for greetings (use word boundaries to avoid false matches)
     import re
     greeting_pattern = r'\b(hi|hello|hey|greetings)\b'
     if re.search(greeting_pattern, translated_query.lower()):
-        response_text = """**Chashi Bhai** - Your Expert Agriculture Assistant
-
-Hello! I'm Chashi Bhai, your expert AI assistant for all things farming and agriculture.
-
-**How can I assist you today?**
-
-• Ask about crop management
-• Get advice on soil health
-• Learn about pest control
-• Explore irrigation techniques
-• Discover organic farming methods
-• Get location-based weather insights using NASA data
-
-Feel free to ask me anything related to farming!"""
-        # Format the response before returning
-        translate_lang = await translate_back(response_text, original_lang)
-        formatted_response = format_response(translate_lang)
-        final_response = formatted_response
-        return {
-            "reply": final_response, 
-            "detectedLang": original_lang, 
-            "translatedQuery": translated_query,
-            "userLocation": location_name if location_name else "Location not detected",
-            "nasaDataUsed": []
-        }
+        ctx["canned_text"] = static_catalogue.reply("chat_greeting")
+        return ctx
 
     # SIMPLE TEST: If the user asks about "test", return a simple formatted response
     if "test" in translated_query.lower():
-        response_text = """**Chashi Bhai** - Test Response
-
-This is a test of the **Chashi Bhai** agricultural assistant system.
-
-**Key Features:**
-• Expert agricultural knowledge with **NASA data integration**
-• Location-based personalized recommendations
-• Real-time climate and weather insights
-
-**Agricultural Focus Areas:**
-1. Crop management and planning
-2. Soil health and fertility  
-3. Weather and climate analysis
-
-This system combines **NASA datasets** with agricultural expertise for maximum accuracy."""
-        # Format the response before returning
-        translate_lang = await translate_back(response_text, original_lang)
-        formatted_response = format_response(translate_lang)
-        final_response = formatted_response
-        return {
-            "reply": final_response, 
-            "detectedLang": original_lang, 
-            "translatedQuery": translated_query,
-            "userLocation": location_name if location_name else "Location not detected",
-            "nasaDataUsed": []
-        }
+        ctx["canned_text"] = static_catalogue.reply("chat_test")
+        return ctx
 
     # Intelligent question analysis
     question_analysis = classify_agricultural_question(translated_query)
     
-    # ALWAYS fetch ALL data sources for maximum accuracy
-    # Use parallel execution for speed
-    relevant_datasets = ["POWER", "MODIS", "GLDAS", "GRACE", "LANDSAT"]  # ALL NASA datasets
+    # Full-response cache: a hit reuses a recent English answer for the same normalised
+    # question, location cell and season, skipping data fetching and the LLM entirely
+    cached_entry = await response_cache.get(translated_query, lat, lon)
+    
+    # Plan the minimal set of data sources this question needs, each with a latency budget
+    data_plan = plan_data_sources(translated_query, question_analysis, lat is not None and lon is not None)
     nasa_data_text = ""
     nasa_datasets_used = []
     fao_data_text = ""
     bangladesh_data_text = ""
     search_data_text = ""  # Wikipedia + DuckDuckGo + Arxiv
+    search_results = {}  # Per-tool snippets, reused by the LLM prompt instead of searching again
     
     # Debug output
     print(f"Chat Debug: Query='{translated_query}'")
     print(f"Chat Debug: Question type={question_analysis.get('primary_type')}, Complexity={question_analysis.get('complexity')}")
     print(f"Chat Debug: Location lat={lat}, lon={lon}, name='{location_name}'")
-    print(f"🚀 FAST MODE: Fetching ALL data sources in parallel for best accuracy")
-    
-    # Fetch ALL data sources in parallel if location is available
-    if lat is not None and lon is not None:
+    print(f"🗺️ Fetch plan: {[source['name'] for source in data_plan['sources']]} (cost {data_plan['cost']}, skipped {data_plan['skipped']})")
+    
+    # Fetch the planned data sources in parallel
+    if cached_entry:
+        nasa_datasets_used = list(cached_entry.get("nasa_datasets_used", []))
+        data_plan = None
+        print("🟢 Response cache HIT - skipping data source fetch")
+    elif data_plan["sources"]:
         try:
-            print(f"🚀 Starting PARALLEL fetch of ALL data sources (NASA + FAO + Bangladesh)")
-            
-            # Create parallel tasks for ALL data sources
-            parallel_tasks = []
-            task_names = []
+            print(f"🚀 Starting PARALLEL fetch of {len(data_plan['sources'])} planned data sources")
             
-            # NASA datasets - always fetch primary ones
-            for dataset in relevant_datasets:
-                if dataset == "POWER":
-                    parallel_tasks.append(get_nasa_power_data_cached(lat, lon))
-                    task_names.append("NASA-POWER")
-                elif dataset == "MODIS":
-                    parallel_tasks.append(get_nasa_modis_data_cached(lat, lon))
-                    task_names.append("NASA-MODIS")
-                elif dataset == "LANDSAT":
-                    parallel_tasks.append(get_nasa_landsat_data_cached(lat, lon))
-                    task_names.append("NASA-LANDSAT")
-                elif dataset == "GLDAS":
-                    parallel_tasks.append(get_nasa_gldas_data_cached(lat, lon))
-                    task_names.append("NASA-GLDAS")
-                elif dataset == "GRACE":
-                    parallel_tasks.append(get_nasa_grace_data_cached(lat, lon))
-                    task_names.append("NASA-GRACE")
-            
-            # FAO data - always fetch
-            parallel_tasks.append(fetch_fao_food_safety_data("BGD"))
-            task_names.append("FAO")
-            
-            # Bangladesh research data - always fetch
-            # Determine topic from query
+            # Bangladesh research topic from the query
             topic = "general"
             if "rice" in translated_query.lower() or "ধান" in user_message.lower():
                 topic = "rice"
             elif any(veg in translated_query.lower() for veg in ["vegetable", "potato", "tomato", "cabbage"]) or "সবজি" in user_message.lower():
                 topic = "vegetables"
-            parallel_tasks.append(fetch_bangladesh_agri_data(topic))
-            task_names.append(f"Bangladesh-{topic}")
             
-            # Search sources - Wikipedia, DuckDuckGo, Arxiv - ALWAYS fetch
-            parallel_tasks.append(search_wikipedia(translated_query))
-            task_names.append("Wikipedia")
-            parallel_tasks.append(search_duckduckgo(translated_query))
-            task_names.append("DuckDuckGo")
-            parallel_tasks.append(search_arxiv(translated_query))
-            task_names.append("Arxiv")
+            source_fetchers = {
+                "NASA-POWER": lambda: get_nasa_power_data_cached(lat, lon),
+                "NASA-MODIS": lambda: get_nasa_modis_data_cached(lat, lon),
+                "NASA-LANDSAT": lambda: get_nasa_landsat_data_cached(lat, lon),
+                "NASA-GLDAS": lambda: get_nasa_gldas_data_cached(lat, lon),
+                "NASA-GRACE": lambda: get_nasa_grace_data_cached(lat, lon),
+                "FAO": lambda: fetch_fao_food_safety_data("BGD"),
+                "Bangladesh": lambda: fetch_bangladesh_agri_data(topic),
+                "Wikipedia": lambda: search_wikipedia(translated_query),
+                "DuckDuckGo": lambda: search_duckduckgo(translated_query),
+                "Arxiv": lambda: search_arxiv(translated_query)
+            }
+            
+            # Create parallel tasks for the planned sources, each bounded by its budget
+            parallel_tasks = []
+            task_names = []
+            for source in data_plan["sources"]:
+                parallel_tasks.append(run_planned_source(source, source_fetchers[source["name"]]()))
+                task_names.append(f"Bangladesh-{topic}" if source["name"] == "Bangladesh" else source["name"])
             
-            # Execute ALL data sources in parallel with timeout
+            # Execute planned data sources in parallel within their latency budgets
             if parallel_tasks:
                 start_time = time.time()
                 all_results = await asyncio.gather(*parallel_tasks, return_exceptions=True)
@@ -3936,6 +6053,11 @@ This system combines **NASA datasets** with agricultural expertise for maximum a
                 
                 for i, result in enumerate(all_results):
                     task_name = task_names[i]
+                    source = data_plan["sources"][i]
+                    if isinstance(result, Exception):
+                        source["status"] = "error"
+                    else:
+                        result, source["status"], source["ms"] = result
                     
                     if task_name.startswith("NASA-"):
                         dataset_name = task_name.replace("NASA-", "")
@@ -3964,6 +6086,7 @@ This system combines **NASA datasets** with agricultural expertise for maximum a
                             print(f"⚠️ Bangladesh data unavailable")
                     
                     elif task_name in ["Wikipedia", "DuckDuckGo", "Arxiv"]:
+                        search_results[task_name.lower()] = trim_search_result(result)
                         if not isinstance(result, Exception) and result and len(result.strip()) > 50:
                             if not search_data_text:
                                 search_data_text = f"\n\n**WEB SEARCH RESULTS:**\n"
@@ -4089,125 +6212,141 @@ This system combines **NASA datasets** with agricultural expertise for maximum a
     print(f"📝 Final hybrid prompt size: {len(prompt)} chars")
     print("🚀 Hybrid AI prompt ready for LLM processing")
 
-    # ========== SMART RESPONSE OPTIMIZATION ==========
+    ctx.update({
+        "question_analysis": question_analysis,
+        "data_plan": data_plan,
+        "search_results": search_results,
+        "cached_entry": cached_entry,
+        "nasa_datasets_used": nasa_datasets_used,
+        "fao_data_text": fao_data_text,
+        "bangladesh_data_text": bangladesh_data_text,
+        "prompt": prompt
+    })
+    return ctx
+
+
+def lookup_prebuilt_answer(ctx: dict) -> Optional[str]:
+    """Answer from the response cache, the express lane or the smart shortcuts, if one applies"""
+    cached_entry = ctx["cached_entry"]
+    if cached_entry:
+        print("🟢 Cache HIT for complete response")
+        return cached_entry["text"]
     
-    # Check for cached responses first (for identical queries)
-    perf_monitor.checkpoint("start_llm_processing")
-    query_cache_key = f"response_{hashlib.md5((translated_query + str(nasa_datasets_used)).encode()).hexdigest()}"
-    cached_response = perf_cache.get(query_cache_key, ttl_seconds=1800)  # 30 minute cache
+    print("🔴 Cache MISS for response, generating...")
+    translated_query, location_name = ctx["translated_query"], ctx["location_name"]
     
-    if cached_response:
-        print("🟢 Cache HIT for complete response")
-        response_text = cached_response
-        perf_monitor.checkpoint("llm_processing_complete")
-    else:
-        print("🔴 Cache MISS for response, generating...")
-        
-        # EXPRESS LANE: Ultra-fast responses for simple queries (bypass LLM entirely)
-        response_text = get_express_response(translated_query, location_name, lat, lon)
-        
-        if not response_text:
-            # SMART SHORTCUTS: Pre-built expert responses (bypass LLM for common topics)
-            response_text = get_smart_shortcut_response(translated_query, location_name, lat, lon)
-        
-        if not response_text:
-            # Use full LLM processing with ALL search tools + powerful AI
-            max_retries = 2
-            for attempt in range(max_retries):
-                try:
-                    # ALWAYS use search-enhanced response for maximum accuracy
-                    # This combines Wikipedia + Arxiv + DuckDuckGo + Powerful AI (LLaMA 3.3 70B)
-                    print(f"🚀 Using comprehensive search + AI for location: {location_name} (attempt {attempt + 1})")
-                    response_text = await get_search_enhanced_response(translated_query, location_name)
-                    
-                    # Check if we got a demo mode response (no GROQ API key)
-                    if "Demo Mode" in response_text:
-                        break  # Keep demo mode response
-                    elif response_text and len(response_text.strip()) > 10:
-                        print(f"✅ Got comprehensive response: {len(response_text)} chars")
-                        break
-                    else:
-                        response_text = "I'm sorry, I'm having trouble processing your request right now. Please try rephrasing your question."
-                        break
-                    
-                except Exception as e:
-                    print(f"⚠ Error (attempt {attempt + 1}/{max_retries}): {str(e)[:100]}...")
-                    if attempt < max_retries - 1:
-                        time.sleep(0.5)  # Very short delay
-                    else:
-                        response_text = "I'm sorry, I'm experiencing high demand right now. Please try again in a moment."
-        
-        # Cache the generated response (before attribution to allow reuse across different dataset combinations)
-        if response_text and not "Demo Mode" in response_text and not "I'm sorry" in response_text:
-            base_response_key = f"base_response_{hashlib.md5(translated_query.encode()).hexdigest()}"
-            perf_cache.set(base_response_key, response_text)
-            print("💾 Cached generated response for future use")
-        
-        perf_monitor.checkpoint("llm_processing_complete")
+    # EXPRESS LANE: Ultra-fast responses for simple queries (bypass LLM entirely)
+    response_text = get_express_response(translated_query, location_name, ctx["lat"], ctx["lon"])
+    
+    if not response_text:
+        # SMART SHORTCUTS: Pre-built expert responses (bypass LLM for common topics)
+        response_text = get_smart_shortcut_response(translated_query, location_name, ctx["lat"], ctx["lon"])
+    
+    return response_text
 
-    # Add comprehensive data source attribution BEFORE translation
-    attribution_parts = []
+
+def chat_answer_flags(ctx: dict) -> tuple:
+    """(fao_used, bangladesh_used) for attribution, taken from the cache entry on a hit"""
+    cached_entry = ctx["cached_entry"]
+    if cached_entry:
+        return cached_entry.get("fao_used", False), cached_entry.get("bangladesh_used", False)
+    return bool(ctx["fao_data_text"]), bool(ctx["bangladesh_data_text"])
+
+
+def remember_chat_answer(ctx: dict, response_text: str):
+    """Cache the English answer before attribution and translation so any language can reuse it"""
+    if ctx["cached_entry"] or isinstance(response_text, StaticReply):
+        return  # Already cached, or a catalogue reply that costs nothing to rebuild
+    if response_text and not "Demo Mode" in response_text and not "I'm sorry" in response_text:
+        fao_used, bangladesh_used = chat_answer_flags(ctx)
+        response_cache.set(ctx["translated_query"], ctx["lat"], ctx["lon"], {
+            "text": response_text,
+            "nasa_datasets_used": ctx["nasa_datasets_used"],
+            "fao_used": fao_used,
+            "bangladesh_used": bangladesh_used
+        })
+        print("💾 Cached generated response for future use")
+
+
+def chat_location_display(ctx: dict) -> str:
+    """Original (e.g. Bengali) location name for the frontend"""
+    location_name_original = ctx["location_name_original"]
+    return ensure_utf8(location_name_original) if location_name_original else "Location not detected"
+
+
+@app.post("/chat")
+async def chat(req: ChatRequest, request: Request):
+    # Initialize performance monitoring
+    perf_monitor = PerformanceMonitor()
+    perf_monitor.start()
     
-    # Check for NASA data usage
-    if nasa_datasets_used:
-        attribution_parts.append(f"NASA Satellite ({', '.join(nasa_datasets_used)})")
-    elif any(keyword in response_text.upper() for keyword in ['NASA', 'POWER', 'MODIS', 'SATELLITE']):
-        attribution_parts.append("NASA Agricultural Data")
+    ctx = await prepare_chat(req, request, perf_monitor)
+    translated_query = ctx["translated_query"]
+    original_lang = ctx["original_lang"]
+    location_name = ctx["location_name"]
+    nasa_datasets_used = ctx["nasa_datasets_used"]
     
-    # Check for FAO data usage
-    if fao_data_text:
-        attribution_parts.append("FAO Standards")
-    elif 'FAO' in response_text.upper():
-        attribution_parts.append("FAO (Food and Agriculture Organization)")
+    if ctx["canned_text"] is not None:
+        translate_lang = await translate_reply(ctx["canned_text"], original_lang)
+        formatted_response = format_response(translate_lang)
+        return {
+            "reply": formatted_response,
+            "detectedLang": original_lang,
+            "translatedQuery": translated_query,
+            "userLocation": location_name if location_name else "Location not detected",
+            "nasaDataUsed": ctx["canned_datasets"]
+        }
+
+    # ========== SMART RESPONSE OPTIMIZATION ==========
     
-    # Check for Bangladesh research institute data
-    if bangladesh_data_text:
-        # Detect which specific institutes are mentioned
-        bd_institutes = []
-        if 'BRRI' in response_text.upper() or 'RICE RESEARCH' in response_text.upper():
-            bd_institutes.append('BRRI')
-        if 'BARI' in response_text.upper() or 'AGRICULTURAL RESEARCH INSTITUTE' in response_text.upper():
-            bd_institutes.append('BARI')
-        if 'BARC' in response_text.upper():
-            bd_institutes.append('BARC')
-        if 'DAE' in response_text.upper():
-            bd_institutes.append('DAE')
-        
-        if bd_institutes:
-            attribution_parts.append(f"Bangladesh Agricultural Research ({', '.join(bd_institutes)})")
-        else:
-            attribution_parts.append("Bangladesh Agricultural Research Institute")
-    elif any(keyword in response_text.upper() for keyword in ['BRRI', 'BARI', 'BARC', 'BANGLADESH']):
-        # Even if bangladesh_data_text wasn't fetched, credit if mentioned
-        bd_institutes = []
-        if 'BRRI' in response_text.upper():
-            bd_institutes.append('BRRI')
-        if 'BARI' in response_text.upper():
-            bd_institutes.append('BARI')
-        if bd_institutes:
-            attribution_parts.append(f"Bangladesh Agricultural Research ({', '.join(bd_institutes)})")
+    # Reuse the cached answer, express lane or shortcut before falling back to the LLM
+    perf_monitor.checkpoint("start_llm_processing")
     
-    # Add modern agriculture methods indicator if detected
-    modern_methods = []
-    if any(method in response_text.upper() for method in ['DRIP IRRIGATION', 'PRECISION', 'IOT', 'SENSOR', 'DRONE', 'AUTOMATION']):
-        modern_methods.append('Modern Agriculture Methods')
-    if modern_methods:
-        attribution_parts.extend(modern_methods)
+    response_text = lookup_prebuilt_answer(ctx)
     
-    if attribution_parts:
-        dataset_attribution = f"\n\n**Data Sources:** {', '.join(attribution_parts)}"
-        response_text += dataset_attribution
-    else:
-        # Fallback if no external data was fetched
-        dataset_attribution = f"\n\n**Data Sources:** Integrated Agricultural Knowledge Base"
-        response_text += dataset_attribution
+    if not response_text:
+        # Use full LLM processing with ALL search tools + powerful AI
+        max_retries = 2
+        for attempt in range(max_retries):
+            try:
+                # ALWAYS use search-enhanced response for maximum accuracy
+                # This combines Wikipedia + Arxiv + DuckDuckGo + Powerful AI (LLaMA 3.3 70B)
+                print(f"🚀 Using comprehensive search + AI for location: {location_name} (attempt {attempt + 1})")
+                response_text = await get_search_enhanced_response(translated_query, location_name, ctx["search_results"])
+                
+                # Check if we got a demo mode response (no GROQ API key)
+                if "Demo Mode" in response_text:
+                    break  # Keep demo mode response
+                elif response_text and len(response_text.strip()) > 10:
+                    print(f"✅ Got comprehensive response: {len(response_text)} chars")
+                    break
+                else:
+                    response_text = "I'm sorry, I'm having trouble processing your request right now. Please try rephrasing your question."
+                    break
+                
+            except Exception as e:
+                print(f"⚠ Error (attempt {attempt + 1}/{max_retries}): {str(e)[:100]}...")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(0.5)  # Very short delay, without blocking other chats
+                else:
+                    response_text = "I'm sorry, I'm experiencing high demand right now. Please try again in a moment."
+    
+    remember_chat_answer(ctx, response_text)
+    perf_monitor.checkpoint("llm_processing_complete")
+
+    # Add comprehensive data source attribution BEFORE translation
+    fao_used, bangladesh_used = chat_answer_flags(ctx)
+    attribution = build_source_attribution(response_text, nasa_datasets_used, fao_used, bangladesh_used)
     
-    # Translate back to original language FIRST with async and caching
+    # Translate back to original language FIRST (catalogue replies come pre-translated)
     perf_monitor.checkpoint("start_translation_back")
     print(f"🔄 MAIN FLOW: About to translate back to '{original_lang}'")
     print(f"📄 Response before translation: {response_text[:200]}...")
     
-    translated_response = await translate_back(response_text, original_lang)
+    translated_response = await translate_reply(response_text, original_lang, ctx["location_name_original"])
+    if attribution:
+        translated_response += await translate_back(attribution, original_lang)
+    response_text += attribution
     perf_monitor.checkpoint("translation_back_complete")
     
     print(f"✅ MAIN FLOW: Translation completed, length: {len(translated_response)}")
@@ -4229,16 +6368,16 @@ This system combines **NASA datasets** with agricultural expertise for maximum a
     
     # Update RAG user context after successful response (with Mem0 storage)
     rag_system.update_user_context(
-        user_id, 
+        ctx["user_id"], 
         translated_query, 
-        location_name_original if 'location_name_original' in locals() else None,
+        ctx["location_name_original"],
         response=response_text  # Store response summary in Mem0
     )
     
     # Ensure all text fields are properly UTF-8 encoded
     final_response = ensure_utf8(final_response)
     # Use original Bengali location name for frontend display
-    location_display = ensure_utf8(location_name_original) if location_name_original else "Location not detected"
+    location_display = chat_location_display(ctx)
     
     # Create response with explicit UTF-8 encoding
     response_data = {
@@ -4247,6 +6386,7 @@ This system combines **NASA datasets** with agricultural expertise for maximum a
         "translatedQuery": ensure_utf8(translated_query),
         "userLocation": location_display,
         "nasaDataUsed": nasa_datasets_used,
+        "dataPlan": ctx["data_plan"],
         "performanceMs": int(perf_summary['total_time'] * 1000)
     }
     
@@ -4258,6 +6398,199 @@ This system combines **NASA datasets** with agricultural expertise for maximum a
 
 
 
+# ==================== STREAMING CHAT (SERVER-SENT EVENTS) ====================
+# Events: "meta" once the question is understood, "delta" for each piece of answer text in the
+# user's language, "error" if generation breaks off midway, "attribution" for the data-source
+# block, then "done" with the formatted reply.
+
+_STREAM_BOUNDARY_REGEX = re.compile(r'(?<!\d)[.!?।]\s+|\n')
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Encode one server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def replay_text(text: str):
+    """Async source for answers that are already complete (canned, cached, express, shortcut)"""
+    yield text
+
+
+async def translate_stream(chunks, target_lang: str, min_chars: int = STREAM_TRANSLATE_MIN_CHARS):
+    """
+    Yield (english, translated) pieces from a stream of English text chunks. English passes
+    through token by token. Other languages are cut at sentence or line boundaries: the first
+    sentence goes out alone for a fast first paint, later ones are grouped into pieces of at
+    least `min_chars`. Each piece is translated in a background task while the next chunks are
+    read, and pieces are yielded in answer order as their translations finish.
+    """
+    normalized_lang = normalize_lang(target_lang) or "en"
+    if normalized_lang in ["en", "unknown"]:
+        async for chunk in chunks:
+            yield chunk, chunk
+        return
+    
+    async def translate_piece(piece: str) -> str:
+        core = piece.strip()
+        if not core:
+            return piece
+        lead = piece[:len(piece) - len(piece.lstrip())]
+        trail = piece[len(piece.rstrip()):]
+        return lead + await translate_back(core, target_lang) + trail
+    
+    pending = deque()  # (english piece, translation task) in answer order
+    buffer = ""
+    started = False
+    try:
+        async for chunk in chunks:
+            buffer += chunk
+            end = 0
+            for match in _STREAM_BOUNDARY_REGEX.finditer(buffer):
+                end = match.end()
+            if end and (end >= min_chars or not started):
+                piece, buffer = buffer[:end], buffer[end:]
+                pending.append((piece, asyncio.create_task(translate_piece(piece))))
+                started = True
+            while pending and pending[0][1].done():
+                piece, task = pending.popleft()
+                yield piece, task.result()
+        if buffer:
+            pending.append((buffer, asyncio.create_task(translate_piece(buffer))))
+        while pending:
+            piece, task = pending.popleft()
+            yield piece, await task
+    finally:
+        # Client disconnected or generation failed: don't leave translations running
+        for _, task in pending:
+            task.cancel()
+
+
+async def reply_pieces(text: str, target_lang: str, location_name: Optional[str] = None):
+    """(english, translated) pieces for a complete reply; catalogue replies are served whole from memory"""
+    if isinstance(text, StaticReply):
+        localized = static_catalogue.localize(text, target_lang, location_name=location_name)
+        if localized is not None:
+            yield text, localized
+            return
+    async for pair in translate_stream(replay_text(text), target_lang):
+        yield pair
+
+
+async def chat_event_stream(req: ChatRequest, request: Request):
+    perf_monitor = PerformanceMonitor()
+    perf_monitor.start()
+    
+    # First byte goes out before any upstream call
+    yield sse_event("status", {"stage": "received"})
+    
+    # meta follows translation and location detection; the data-source fetch runs after it
+    ctx = await resolve_chat_request(req, request, perf_monitor)
+    translated_query = ctx["translated_query"]
+    original_lang = ctx["original_lang"]
+    location_name = ctx["location_name"]
+    yield sse_event("meta", {
+        "detectedLang": original_lang,
+        "translatedQuery": ensure_utf8(translated_query),
+        "userLocation": chat_location_display(ctx)
+    })
+    
+    ctx = await gather_chat_data(ctx, perf_monitor)
+    canned = ctx["canned_text"] is not None
+    
+    # Canned replies report the English location name, like the non-streaming endpoint
+    if canned:
+        location_display = location_name if location_name else "Location not detected"
+    else:
+        location_display = chat_location_display(ctx)
+    
+    perf_monitor.checkpoint("start_llm_processing")
+    # A complete English answer (canned, cached or prebuilt) keeps its own type, so catalogue
+    # replies stay recognisable as StaticReply after streaming
+    complete_reply = None
+    if canned:
+        complete_reply = ctx["canned_text"]
+        pieces = reply_pieces(complete_reply, original_lang)
+    else:
+        complete_reply = lookup_prebuilt_answer(ctx)
+        if complete_reply:
+            pieces = reply_pieces(complete_reply, original_lang, ctx["location_name_original"])
+        else:
+            print(f"🚀 Streaming comprehensive search + AI for location: {location_name}")
+            enhanced_query = await build_search_enhanced_prompt(translated_query, location_name, ctx["search_results"])
+            pieces = translate_stream(stream_direct_response(enhanced_query), original_lang)
+    
+    english_parts = []
+    translated_parts = []
+    # A stream that breaks off must not be cached or remembered as if it were a complete answer
+    stream_failed = False
+    truncated = False
+    try:
+        async for english, translated in pieces:
+            if not english_parts:
+                perf_monitor.checkpoint("first_token")
+            english_parts.append(english)
+            translated_parts.append(translated)
+            yield sse_event("delta", {"text": translated})
+    except Exception as e:
+        print(f"⚠ Streaming error: {str(e)[:100]}...")
+        stream_failed = True
+        truncated = bool(english_parts)
+        if truncated:
+            yield sse_event("error", {"message": "Answer generation stopped before it was complete"})
+        else:
+            fallback = "I'm sorry, I'm experiencing high demand right now. Please try again in a moment."
+            english_parts.append(fallback)
+            translated_parts.append(await translate_back(fallback, original_lang))
+            yield sse_event("delta", {"text": translated_parts[-1]})
+    perf_monitor.checkpoint("llm_processing_complete")
+    
+    response_text = complete_reply if complete_reply else "".join(english_parts)
+    translated_response = "".join(translated_parts)
+    nasa_datasets_used = ctx["canned_datasets"] if canned else ctx["nasa_datasets_used"]
+    
+    if not canned:
+        if not stream_failed:
+            remember_chat_answer(ctx, response_text)
+        fao_used, bangladesh_used = chat_answer_flags(ctx)
+        attribution = build_source_attribution(response_text, nasa_datasets_used, fao_used, bangladesh_used)
+        if attribution:
+            attribution = "\n\n" + await translate_back(attribution.strip(), original_lang)
+            translated_response += attribution
+            yield sse_event("attribution", {"text": attribution})
+        
+        if not stream_failed:
+            rag_system.update_user_context(
+                ctx["user_id"],
+                translated_query,
+                ctx["location_name_original"],
+                response=response_text
+            )
+    
+    perf_summary = perf_monitor.get_summary()
+    print(f"⚡ STREAM PERFORMANCE: first token {perf_summary['checkpoints'].get('first_token', 0):.2f}s, total {perf_summary['total_time']:.2f}s")
+    
+    yield sse_event("done", {
+        "reply": ensure_utf8(format_response(translated_response)),
+        "detectedLang": original_lang,
+        "translatedQuery": ensure_utf8(translated_query),
+        "userLocation": location_display,
+        "nasaDataUsed": nasa_datasets_used,
+        "dataPlan": ctx["data_plan"],
+        "truncated": truncated,
+        "performanceMs": int(perf_summary['total_time'] * 1000)
+    })
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """Same pipeline as /chat, streamed as server-sent events so the answer renders as it is generated"""
+    return StreamingResponse(
+        chat_event_stream(req, request),
+        media_type="text/event-stream; charset=utf-8",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/favicon.ico")
 async def favicon():
     file_path = os.path.join(os.path.dirname(__file__), "favicon.ico")
@@ -4269,6 +6602,35 @@ async def favicon():
 async def health():
     return {"status": "ok", "app": "Chashi Bhai"}
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime performance counters for caches and upstream request coalescing"""
+    cache_stats = perf_cache.stats()
+    return {
+        "cache": cache_stats,
+        "translationCache": {
+            "digest": STABLE_DIGEST_ALGORITHM,
+            "shared": perf_cache.l2 is not None and "trans" in perf_cache.l2_namespaces,
+            "trans": cache_stats["namespaces"].get("trans"),
+            "tm": cache_stats["namespaces"].get("tm")
+        },
+        "responseCache": response_cache.stats(),
+        "singleFlight": single_flight.stats(),
+        "llm": llm_gate.stats(),
+        "toolPool": tool_pool.stats(),
+        "translation": translation_service.stats(),
+        "translationMemory": translation_memory.stats(),
+        "staticCatalogue": static_catalogue.stats(),
+        "knowledgeIndex": rag_system.index.stats(),
+        "knowledgeCorpus": knowledge_corpus.stats(),
+        "gazetteer": gazetteer.stats(),
+        "nominatim": nominatim_limiter.stats(),
+        "vectorMemory": memory_writer.stats() if memory_writer is not None else None,
+        "userContexts": user_context_store.stats(),
+        "ipRanges": ip_range_resolver.stats(),
+        "geolocation": geo_racer.stats()
+    }
+
 @app.get("/debug")
 async def debug():
     """Debug endpoint to check environment variables"""
@@ -4337,33 +6699,33 @@ async def test_nasa_debug():
             "success": False
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, headers=headers)
+        client = http_clients.get(NASA_POWER_BASE_URL)
+        response = await client.get(url, headers=headers, timeout=30.0)
             
-            result["http_status"] = response.status_code
-            result["response_headers"] = dict(response.headers)
+        result["http_status"] = response.status_code
+        result["response_headers"] = dict(response.headers)
             
-            if response.status_code == 200:
-                data = response.json()
-                result["success"] = True
-                result["data_keys"] = list(data.keys()) if data else []
+        if response.status_code == 200:
+            data = response.json()
+            result["success"] = True
+            result["data_keys"] = list(data.keys()) if data else []
                 
-                if data and "properties" in data and "parameter" in data["properties"]:
-                    result["nasa_parameters"] = list(data["properties"]["parameter"].keys())
-                    result["valid_structure"] = True
-                    # Sample one day of data
-                    first_param_name = list(data["properties"]["parameter"].keys())[0]
-                    first_param_data = data["properties"]["parameter"][first_param_name]
-                    result["sample_data"] = {
-                        first_param_name: dict(list(first_param_data.items())[:3])  # First 3 days
-                    }
-                else:
-                    result["valid_structure"] = False
-                    result["error"] = "Invalid data structure"
-                    result["data_sample"] = str(data)[:500] if data else "No data"
+            if data and "properties" in data and "parameter" in data["properties"]:
+                result["nasa_parameters"] = list(data["properties"]["parameter"].keys())
+                result["valid_structure"] = True
+                # Sample one day of data
+                first_param_name = list(data["properties"]["parameter"].keys())[0]
+                first_param_data = data["properties"]["parameter"][first_param_name]
+                result["sample_data"] = {
+                    first_param_name: dict(list(first_param_data.items())[:3])  # First 3 days
+                }
             else:
-                result["error"] = f"HTTP {response.status_code}"
-                result["response_text"] = response.text[:500]
+                result["valid_structure"] = False
+                result["error"] = "Invalid data structure"
+                result["data_sample"] = str(data)[:500] if data else "No data"
+        else:
+            result["error"] = f"HTTP {response.status_code}"
+            result["response_text"] = response.text[:500]
                 
         return result
         
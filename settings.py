@@ -43,3 +43,198 @@ BARC_API_URL = "http://www.barc.gov.bd"  # Bangladesh Agricultural Research Coun
 DAE_API_URL = "http://www.dae.gov.bd"    # Department of Agricultural Extension
 BRRI_API_URL = "http://www.brri.gov.bd"  # Bangladesh Rice Research Institute
 BARI_API_URL = "http://www.bari.gov.bd"  # Bangladesh Agricultural Research Institute
+
+# Upstream HTTP connection pooling (one shared keep-alive client per upstream host)
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10"))
+HTTP_POOL_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+HTTP_DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "10"))
+
+# Per-host request timeouts in seconds. Override with e.g.
+# HTTP_HOST_TIMEOUTS="power.larc.nasa.gov=20,api.open-meteo.com=6"
+HTTP_HOST_TIMEOUTS = {
+    "power.larc.nasa.gov": 15.0,
+    "cmr.earthdata.nasa.gov": 15.0,
+    "api.nasa.gov": 15.0,
+    "api.open-meteo.com": 10.0,
+    "api.weather.com": 10.0,
+    "nominatim.openstreetmap.org": 10.0,
+    "geocode.maps.co": 10.0,
+    "ip-api.com": 8.0,
+    "ipapi.co": 8.0,
+    "ipinfo.io": 8.0,
+    "ipwhois.app": 8.0,
+    "api.ipgeolocation.io": 8.0,
+    "ip-api.io": 8.0,
+    "www.googleapis.com": 8.0,
+    "maps.googleapis.com": 8.0,
+}
+for _item in os.getenv("HTTP_HOST_TIMEOUTS", "").split(","):
+    if "=" in _item:
+        _host, _timeout = _item.split("=", 1)
+        try:
+            HTTP_HOST_TIMEOUTS[_host.strip().lower()] = float(_timeout)
+        except ValueError:
+            pass
+
+# In-memory cache bounds, applied per key namespace (the key prefix before the first "_")
+CACHE_DEFAULT_MAX_ENTRIES = int(os.getenv("CACHE_DEFAULT_MAX_ENTRIES", "1000"))
+CACHE_DEFAULT_MAX_BYTES = int(os.getenv("CACHE_DEFAULT_MAX_BYTES", str(8 * 1024 * 1024)))
+CACHE_SWEEP_INTERVAL = float(os.getenv("CACHE_SWEEP_INTERVAL", "60"))
+
+# (max entries, approximate max bytes) per namespace. Override with e.g.
+# CACHE_NAMESPACE_LIMITS="nasa=500:16777216,tb=1000:8388608"
+CACHE_NAMESPACE_LIMITS = {
+    "nasa": (1000, 32 * 1024 * 1024),
+    "trans": (5000, 4 * 1024 * 1024),
+    "tm": (50000, 16 * 1024 * 1024),
+    "response": (1000, 8 * 1024 * 1024),
+    "location": (10000, 2 * 1024 * 1024),
+    "search": (2000, 4 * 1024 * 1024),
+    "umem": (10000, 4 * 1024 * 1024),
+    "geocode": (20000, 4 * 1024 * 1024),
+}
+for _item in os.getenv("CACHE_NAMESPACE_LIMITS", "").split(","):
+    if "=" in _item and ":" in _item:
+        _namespace, _limits = _item.split("=", 1)
+        _entries, _bytes = _limits.split(":", 1)
+        try:
+            CACHE_NAMESPACE_LIMITS[_namespace.strip()] = (int(_entries), int(_bytes))
+        except ValueError:
+            pass
+
+# Optional persistent second cache tier: a local SQLite file that survives restarts and is
+# shared by all uvicorn workers on the same host. Set CACHE_L2_PATH="" to disable.
+CACHE_L2_PATH = os.getenv("CACHE_L2_PATH", ".cache/l2_cache.sqlite3").strip()
+# Namespaces written through to the L2 tier (per-IP locations stay in memory only)
+CACHE_L2_NAMESPACES = [n.strip() for n in os.getenv("CACHE_L2_NAMESPACES", "nasa,trans,tm,response,fao,bd,search,geocode").split(",") if n.strip()]
+# L2 writes are queued in memory and flushed in one transaction every CACHE_L2_FLUSH_INTERVAL
+# seconds by a background task, off the event loop; beyond CACHE_L2_BUFFER_MAX queued entries
+# the oldest are dropped (they remain in the memory tier)
+CACHE_L2_FLUSH_INTERVAL = float(os.getenv("CACHE_L2_FLUSH_INTERVAL", "1"))
+CACHE_L2_BUFFER_MAX = int(os.getenv("CACHE_L2_BUFFER_MAX", "10000"))
+
+# LLM calls: maximum Groq requests in flight per worker, and how long a chat may wait for a slot
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "20"))
+
+# Data-source planner: (latency budget in seconds, cost weight) per source fetched by /chat.
+# A source that misses its budget is dropped from the answer; the plan stops adding optional
+# sources once their summed cost would exceed DATA_SOURCE_MAX_COST. Override with e.g.
+# DATA_SOURCE_BUDGETS="NASA-GRACE=4:3,Arxiv=3:2"
+DATA_SOURCE_BUDGETS = {
+    "NASA-POWER": (6.0, 2),
+    "NASA-MODIS": (4.0, 1),
+    "NASA-LANDSAT": (4.0, 1),
+    "NASA-GLDAS": (4.0, 1),
+    "NASA-GRACE": (4.0, 2),
+    "FAO": (4.0, 1),
+    "Bangladesh": (3.0, 1),
+    "Wikipedia": (4.0, 1),
+    "DuckDuckGo": (4.0, 2),
+    "Arxiv": (5.0, 3),
+}
+for _item in os.getenv("DATA_SOURCE_BUDGETS", "").split(","):
+    if "=" in _item and ":" in _item:
+        _source, _budget = _item.split("=", 1)
+        _seconds, _cost = _budget.split(":", 1)
+        try:
+            DATA_SOURCE_BUDGETS[_source.strip()] = (float(_seconds), int(_cost))
+        except ValueError:
+            pass
+DATA_SOURCE_MAX_COST = int(os.getenv("DATA_SOURCE_MAX_COST", "8"))
+
+# Blocking langchain tools (Wikipedia/Arxiv/DuckDuckGo .run) execute on a bounded thread pool
+TOOL_EXECUTOR_MAX_WORKERS = int(os.getenv("TOOL_EXECUTOR_MAX_WORKERS", "8"))
+TOOL_DEFAULT_TIMEOUT = float(os.getenv("TOOL_DEFAULT_TIMEOUT", "6"))
+# Per-tool timeouts in seconds. Override with e.g. TOOL_TIMEOUTS="arxiv=10,wikipedia=4"
+TOOL_TIMEOUTS = {
+    "wikipedia": 6.0,
+    "duckduckgo": 6.0,
+    "arxiv": 8.0,
+}
+for _item in os.getenv("TOOL_TIMEOUTS", "").split(","):
+    if "=" in _item:
+        _tool, _timeout = _item.split("=", 1)
+        try:
+            TOOL_TIMEOUTS[_tool.strip().lower()] = float(_timeout)
+        except ValueError:
+            pass
+
+# Translation service: worker threads for the synchronous translator, per-call deadline, and the
+# largest newline-joined batch sent in one request (Google's web endpoint accepts up to 5000 chars)
+TRANSLATION_MAX_WORKERS = int(os.getenv("TRANSLATION_MAX_WORKERS", "8"))
+TRANSLATION_TIMEOUT = float(os.getenv("TRANSLATION_TIMEOUT", "8"))
+TRANSLATION_BATCH_CHARS = int(os.getenv("TRANSLATION_BATCH_CHARS", "4500"))
+# Streamed replies in other languages: after the first sentence, completed sentences are grouped
+# until at least STREAM_TRANSLATE_MIN_CHARS characters and translated in one call while the
+# LLM keeps generating
+STREAM_TRANSLATE_MIN_CHARS = int(os.getenv("STREAM_TRANSLATE_MIN_CHARS", "400"))
+
+# Languages the static response catalogue (greeting, shortcuts, capability answers) is
+# pre-translated into at startup
+STATIC_CATALOGUE_LANGUAGES = [l.strip() for l in os.getenv("STATIC_CATALOGUE_LANGUAGES", "bn,hi,ar").split(",") if l.strip()]
+
+# On-disk knowledge corpus (knowledge/*.json) compiled into a memory-mapped index file that
+# every worker maps read-only; sources are polled every KNOWLEDGE_RELOAD_INTERVAL seconds (0 disables)
+KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", "knowledge").strip()
+KNOWLEDGE_INDEX_PATH = os.getenv("KNOWLEDGE_INDEX_PATH", ".cache/knowledge.idx").strip()
+KNOWLEDGE_RELOAD_INTERVAL = float(os.getenv("KNOWLEDGE_RELOAD_INTERVAL", "5"))
+
+# Offline place gazetteer (knowledge/gazetteer.json): fuzzy matches need a trigram similarity of
+# at least GAZETTEER_MIN_SIMILARITY; GPS coordinates are named after the nearest place within
+# GAZETTEER_REVERSE_MAX_KM kilometres
+GAZETTEER_MIN_SIMILARITY = float(os.getenv("GAZETTEER_MIN_SIMILARITY", "0.55"))
+GAZETTEER_REVERSE_MAX_KM = float(os.getenv("GAZETTEER_REVERSE_MAX_KM", "40"))
+
+# Remote geocoding (Nominatim, then geocode.maps.co) for places outside the gazetteer: results
+# are cached per normalised place name for GEOCODE_CACHE_TTL seconds, failures for
+# GEOCODE_NEGATIVE_TTL. Nominatim calls are spaced NOMINATIM_MIN_INTERVAL seconds apart per
+# worker (its usage policy allows one per second); a call that would queue for longer than
+# NOMINATIM_MAX_WAIT seconds skips Nominatim and goes straight to the fallback.
+GEOCODE_CACHE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", str(30 * 86400)))
+GEOCODE_NEGATIVE_TTL = int(os.getenv("GEOCODE_NEGATIVE_TTL", "900"))
+NOMINATIM_MIN_INTERVAL = float(os.getenv("NOMINATIM_MIN_INTERVAL", "1.0"))
+NOMINATIM_MAX_WAIT = float(os.getenv("NOMINATIM_MAX_WAIT", "5"))
+
+# Few-shot example selection: vocabulary size of the precomputed TF-IDF matrix
+FEWSHOT_MAX_FEATURES = int(os.getenv("FEWSHOT_MAX_FEATURES", "4096"))
+
+# Long-term vector memory: persistent local Chroma store (set CHROMA_PERSIST_DIR="" for an
+# in-memory store) fed by a write-behind buffer flushed in batches by a background task
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", ".cache/chroma").strip()
+MEMORY_FLUSH_INTERVAL = float(os.getenv("MEMORY_FLUSH_INTERVAL", "2"))
+MEMORY_FLUSH_BATCH = int(os.getenv("MEMORY_FLUSH_BATCH", "64"))
+MEMORY_BUFFER_MAX = int(os.getenv("MEMORY_BUFFER_MAX", "5000"))
+
+# Per-user context (query history, interests, usual location): LRU-bounded in memory, dropped
+# after USER_CONTEXT_IDLE_TTL seconds without interaction, optionally persisted in the L2 tier
+USER_CONTEXT_MAX_USERS = int(os.getenv("USER_CONTEXT_MAX_USERS", "10000"))
+USER_CONTEXT_IDLE_TTL = int(os.getenv("USER_CONTEXT_IDLE_TTL", str(30 * 86400)))
+USER_CONTEXT_PERSIST = os.getenv("USER_CONTEXT_PERSIST", "true").lower() == "true"
+# Seconds a user's recalled vector memory (interests, location) is reused before re-querying Chroma
+USER_MEMORY_TTL = int(os.getenv("USER_MEMORY_TTL", "60"))
+
+# Offline IP-range geolocation, consulted before the remote IP providers. IP_RANGES_PATH is a CSV
+# in DB-IP "IP to City Lite" format (ip_start,ip_end,continent,country,region,city,lat,lon) or
+# CIDR rows (cidr,city,region,country,lat,lon); optionally re-downloaded (.csv or .csv.gz) from
+# IP_RANGES_URL every IP_RANGES_REFRESH_INTERVAL seconds. IP_RANGES_COUNTRIES limits which
+# countries are kept in memory (empty keeps all). Prefixes resolved by the remote providers
+# (/24 for IPv4, /48 for IPv6) are learned and reused for IP_LEARNED_PREFIX_TTL seconds.
+IP_RANGES_PATH = os.getenv("IP_RANGES_PATH", "data/ip_ranges.csv").strip()
+IP_RANGES_URL = os.getenv("IP_RANGES_URL", "").strip()
+IP_RANGES_REFRESH_INTERVAL = float(os.getenv("IP_RANGES_REFRESH_INTERVAL", str(24 * 3600)))
+IP_RANGES_COUNTRIES = [c.strip().upper() for c in os.getenv("IP_RANGES_COUNTRIES", "").split(",") if c.strip()]
+IP_LEARNED_PREFIX_TTL = int(os.getenv("IP_LEARNED_PREFIX_TTL", str(7 * 86400)))
+IP_LEARNED_MAX_PREFIXES = int(os.getenv("IP_LEARNED_MAX_PREFIXES", "50000"))
+
+# Remote IP geolocation racing: the GEO_IMMEDIATE_PROVIDERS best-ranked providers start at once,
+# each further provider only after another GEO_HEDGE_DELAY seconds without an acceptable answer.
+# The race ends at the first answer with confidence >= GEO_ACCEPT_CONFIDENCE, or when two
+# providers agree within GEO_AGREEMENT_DEGREES, or after GEO_RACE_TIMEOUT seconds.
+GEO_IMMEDIATE_PROVIDERS = int(os.getenv("GEO_IMMEDIATE_PROVIDERS", "2"))
+GEO_HEDGE_DELAY = float(os.getenv("GEO_HEDGE_DELAY", "0.3"))
+GEO_ACCEPT_CONFIDENCE = float(os.getenv("GEO_ACCEPT_CONFIDENCE", "0.9"))
+GEO_AGREEMENT_DEGREES = float(os.getenv("GEO_AGREEMENT_DEGREES", "0.1"))
+GEO_RACE_TIMEOUT = float(os.getenv("GEO_RACE_TIMEOUT", "8"))